@@ -14,12 +14,16 @@
 #    under the License.
 
 import base64
+import datetime
 import hashlib
 import hmac
 import json
 import os
+import random
+import time
 import uuid
-from collections.abc import Generator, Sequence
+import weakref
+from collections.abc import Callable, Generator, Sequence
 from typing import Any, TypeVar, overload
 
 from oslo_utils import uuidutils
@@ -89,7 +93,7 @@ def generate_hmac(data: bytes | str, hmac_key: bytes | str) -> str:
 
 
 def signed_pack(
-    data: dict[str, str], hmac_key: str | None
+    data: dict[str, Any], hmac_key: str | None
 ) -> tuple[bytes, str | None]:
     """Pack and sign data with hmac_key."""
     raw_data = base64.urlsafe_b64encode(binary_encode(json.dumps(data)))
@@ -175,6 +179,53 @@ def import_modules_from_package(package: str) -> None:
             __import__(module_name)
 
 
+# NOTE: Own generator instance, so that random.seed() calls of the
+#       application don't make span ids predictable or repeated.
+_span_id_random = random.Random()  # noqa: S311
+_span_id_prefix = ""
+
+
+def _reset_span_ids() -> None:
+    global _span_id_prefix
+    _span_id_random.seed(os.urandom(16))
+    prefix = f"{int.from_bytes(os.urandom(8), 'big'):016x}"
+    _span_id_prefix = f"{prefix[:8]}-{prefix[8:12]}-{prefix[12:]}-"
+
+
+_reset_span_ids()
+# NOTE: Forked children must not generate the same ids as their parent.
+os.register_at_fork(after_in_child=_reset_span_ids)
+
+
+def register_at_fork(method: Callable[[], None]) -> None:
+    """Calls a bound method in the children forked while its object lives.
+
+    Used to reset the locks, threads, buffers and connections inherited
+    from the parent process, e.g. by the workers of pre-fork WSGI servers.
+    Only a weak reference to the object is kept.
+    """
+    ref = weakref.WeakMethod(method)
+
+    def after_in_child() -> None:
+        reinit = ref()
+        if reinit is not None:
+            reinit()
+
+    os.register_at_fork(after_in_child=after_in_child)
+
+
+def generate_span_id() -> str:
+    """Generates a unique id for a trace point, cheaper than a uuid4.
+
+    Ids are formatted like uuids, so they can be mixed with uuid base ids
+    and parsed by shorten_id() and uuid_to_int128(). The high 64 bits are
+    random per process and the low 64 bits, which are used as 64-bit (W3C,
+    OpenTelemetry) span ids by shorten_id(), are random per id and never 0.
+    """
+    low = f"{_span_id_random.getrandbits(64) or 1:016x}"
+    return f"{_span_id_prefix}{low[:4]}-{low[4:]}"
+
+
 def shorten_id(span_id: str | int) -> int:
     """Convert from uuid4 to 64 bit id for OpenTracing"""
     int64_max = (1 << 64) - 1
@@ -198,3 +249,31 @@ def uuid_to_int128(span_uuid: str | int) -> int:
         # Return a new short id for this
         span_int = uuid_to_int128(uuidutils.generate_uuid())
     return span_int
+
+
+#: Format of the legacy string "timestamp" of trace point payloads.
+TIMESTAMP_FORMAT = "%Y-%m-%dT%H:%M:%S.%f"
+
+_EPOCH = datetime.datetime(1970, 1, 1)
+
+
+# NOTE: Trace point timestamps are taken from the wall clock, so they follow
+#       its adjustments and can be compared between hosts and processes.
+#       Durations measured in a process are taken from the monotonic
+#       performance counter instead, see time.perf_counter_ns().
+def timestamp_ns() -> int:
+    """Returns the current time in nanoseconds since the epoch (UTC)."""
+    return time.time_ns()
+
+
+def format_timestamp(ns: int) -> str:
+    """Formats a timestamp_ns() value as a legacy "timestamp" string."""
+    dt = _EPOCH + datetime.timedelta(microseconds=ns // 1000)
+    return dt.isoformat(timespec="microseconds")
+
+
+def parse_timestamp(timestamp: str) -> int:
+    """Parses a legacy "timestamp" string into nanoseconds since the epoch."""
+    delta = datetime.datetime.strptime(timestamp, TIMESTAMP_FORMAT) - _EPOCH
+    seconds = delta.days * 86400 + delta.seconds
+    return seconds * 1_000_000_000 + delta.microseconds * 1000
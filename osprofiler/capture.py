@@ -0,0 +1,222 @@
+# Copyright 2026 OpenStack Foundation.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Bounded formatting of the arguments and results captured by trace().
+
+Captured values are wrapped into LazyRepr and only formatted when the
+notification that contains them is sent, so calls whose notifications are
+dropped (e.g. by notifier.TailSamplingNotifier) never format them.
+"""
+
+from collections.abc import Callable
+import itertools
+import reprlib
+from typing import Any
+
+
+_formatters: dict[type, Callable[[Any], str]] = {}
+
+_SCALARS = (str, int, float, bool, type(None))
+_CONTAINERS = (tuple, list, dict)
+# NOTE: Types whose builtin repr() is used as is when it fits the limits,
+#       i.e. those without a formatter registered for them or for one of
+#       their base classes.
+_plain_scalars: frozenset[type] = frozenset(_SCALARS)
+_plain_containers: frozenset[type] = frozenset(_CONTAINERS)
+
+
+def _plain(types: tuple[type, ...]) -> frozenset[type]:
+    return frozenset(
+        cls
+        for cls in types
+        if not any(base in _formatters for base in cls.__mro__)
+    )
+
+
+def _update_plain_types() -> None:
+    global _plain_scalars, _plain_containers
+    _plain_scalars = _plain(_SCALARS)
+    _plain_containers = _plain(_CONTAINERS)
+
+
+def register_formatter(cls: type, formatter: Callable[[Any], str]) -> None:
+    """Registers how captured values of a type are formatted.
+
+    The formatter of the closest registered base class is used for
+    subclasses. Its result is truncated to the max_length of the Formatter.
+
+    >>  capture.register_formatter(Instance, lambda i: f"<Instance {i.id}>")
+
+    :param cls: type of the values
+    :param formatter: callable returning the text of a value
+    """
+    _formatters[cls] = formatter
+    _update_plain_types()
+
+
+def unregister_formatter(cls: type) -> None:
+    """Removes the formatter registered for a type, if any."""
+    _formatters.pop(cls, None)
+    _update_plain_types()
+
+
+class Formatter(reprlib.Repr):
+    """Formats captured values with bounded size and cost.
+
+    :param max_length: maximum length of the text of a value, longer texts
+                       are truncated
+    :param max_depth: maximum nesting level of containers, deeper ones are
+                      shown as "[...]"
+    :param max_items: maximum number of items shown per container
+    """
+
+    def __init__(
+        self, max_length: int = 1000, max_depth: int = 5, max_items: int = 50
+    ) -> None:
+        super().__init__()
+        for name, value in (
+            ("max_length", max_length),
+            ("max_depth", max_depth),
+            ("max_items", max_items),
+        ):
+            if value < 1:
+                raise ValueError(f"{name} should be a positive number")
+        self.max_length = max_length
+        self.maxlevel = max_depth
+        self.maxtuple = self.maxlist = self.maxarray = max_items
+        self.maxdict = self.maxset = self.maxfrozenset = max_items
+        self.maxdeque = max_items
+        self.maxstring = self.maxlong = self.maxother = max_length
+
+    def format(self, value: Any) -> str:
+        """Returns the text of a value."""
+        text = self._plain_repr(value)
+        if text is not None:
+            return text
+        return self._truncate(self.repr(value))
+
+    def _plain_repr(self, value: Any) -> str | None:
+        # NOTE: Most captured values are scalars or short tuples and dicts
+        #       of scalars (the args and kwargs of the traced calls), whose
+        #       builtin repr() is the same as the one of reprlib as long as
+        #       it isn't truncated, and a lot cheaper.
+        plain = _plain_scalars
+        cls = type(value)
+        if cls in plain:
+            pass
+        elif cls not in _plain_containers:
+            return None
+        elif cls is tuple or cls is list:
+            if len(value) > self.maxtuple or len(value) > self.maxlist:
+                return None
+            for item in value:
+                if type(item) not in plain:
+                    return None
+        elif cls is dict:
+            if len(value) > self.maxdict:
+                return None
+            for key, item in value.items():
+                if type(key) not in plain or type(item) not in plain:
+                    return None
+        text = repr(value)
+        if len(text) > self.max_length:
+            return None
+        return text
+
+    def _truncate(self, text: str) -> str:
+        if len(text) > self.max_length:
+            return text[: max(self.max_length - 3, 0)] + "..."
+        return text
+
+    def repr1(self, x: Any, level: int) -> str:
+        if _formatters:
+            for cls in type(x).__mro__:
+                formatter = _formatters.get(cls)
+                if formatter is not None:
+                    try:
+                        return self._truncate(formatter(x))
+                    except Exception:
+                        break
+        return super().repr1(x, level)
+
+    def repr_dict(self, x: dict[Any, Any], level: int) -> str:
+        # NOTE: Unlike reprlib, keep the insertion order of kwargs.
+        if not x:
+            return "{}"
+        if level <= 0:
+            return "{...}"
+        pieces = [
+            f"{self.repr1(key, level - 1)}: {self.repr1(value, level - 1)}"
+            for key, value in itertools.islice(x.items(), self.maxdict)
+        ]
+        if len(x) > self.maxdict:
+            pieces.append("...")
+        return "{" + ", ".join(pieces) + "}"
+
+
+class LazyRepr:
+    """Captured value, formatted by the current Formatter on first use.
+
+    Compares equal to its text.
+    """
+
+    __slots__ = ("_value", "_text")
+
+    def __init__(self, value: Any) -> None:
+        self._value = value
+        self._text: str | None = None
+
+    def __str__(self) -> str:
+        if self._text is None:
+            self._text = get().format(self._value)
+            # NOTE: Don't keep the captured object alive.
+            self._value = None
+        return self._text
+
+    def __repr__(self) -> str:
+        return repr(str(self))
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, LazyRepr):
+            other = str(other)
+        if isinstance(other, str):
+            return str(self) == other
+        return NotImplemented
+
+    def __hash__(self) -> int:
+        return hash(str(self))
+
+
+def resolve(info: dict[str, Any]) -> None:
+    """Replaces the LazyRepr values of an info dict by their text."""
+    for key, value in info.items():
+        if isinstance(value, LazyRepr):
+            info[key] = str(value)
+        elif isinstance(value, dict):
+            resolve(value)
+
+
+__formatter = Formatter()
+
+
+def set(formatter: Formatter) -> None:
+    """Sets the formatter of captured values."""
+    global __formatter
+    __formatter = formatter
+
+
+def get() -> Formatter:
+    """Returns the formatter of captured values."""
+    return __formatter
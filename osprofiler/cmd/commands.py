@@ -176,10 +176,12 @@ class TraceCommands(BaseCommand):
         next_id = [0]
 
         def _create_node(info: dict[str, Any]) -> str:
-            time_taken = info["finished"] - info["started"]
+            time_taken = round(info["finished"] - info["started"], 3)
             service = info["service"] + ":" if "service" in info else ""
             name = info["name"]
             label = f"{service}{name} - {time_taken} ms"
+            if "cpu" in info:
+                label = "{} (cpu {} ms)".format(label, info["cpu"])
 
             if name == "wsgi":
                 req = info["meta.raw_payload.wsgi-start"]["info"]["request"]
@@ -13,7 +13,6 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
-import datetime
 import logging
 from typing import Any
 from urllib import parse as urlparse
@@ -82,16 +81,27 @@ class Driver:
         self.service = service
         self.host = host
         self.result: dict[str, Any] = {}
-        self.started_at: datetime.datetime | None = None
-        self.finished_at: datetime.datetime | None = None
+        # NOTE: Times in nanoseconds since the epoch.
+        self.started_at: int | None = None
+        self.finished_at: int | None = None
         # Last trace started time
-        self.last_started_at: datetime.datetime | None = None
+        self.last_started_at: int | None = None
 
         profiler_config = kwargs.get("conf", {}).get("profiler", {})
         if hasattr(profiler_config, "filter_error_trace"):
             self.filter_error_trace = profiler_config.filter_error_trace
         else:
             self.filter_error_trace = False
+        _utils.register_at_fork(self.after_fork)
+
+    def after_fork(self) -> None:
+        """This method is called in the child processes forked from this one.
+
+        Pre-fork servers (uWSGI, gunicorn, mod_wsgi) often create the driver
+        in their master process. Drivers holding connections or threads must
+        override this method to drop them, without closing them as they are
+        still used by the parent, and to reconnect on first use.
+        """
 
     def notify(self, info: dict[str, Any], **kwargs: Any) -> None:
         """This method will be called on each notifier.notify() call.
@@ -108,12 +118,29 @@ class Driver:
                       "trace_id" - uuid of current element in trace
                       With parent_id and trace_id it's quite simple to build
                       tree of trace elements, which simplify analyze of trace.
+                      Notifications of the profiler are read-only
+                      records.TraceRecord mappings, info.copy() returns
+                      them as a dict that can be modified and serialized.
         """
         raise NotImplementedError(
             f"{self.get_name()}: This method is either not supported "
             "or has to be overridden"
         )
 
+    def notify_batch(
+        self, events: list[dict[str, Any]], **kwargs: Any
+    ) -> None:
+        """Send a batch of notifications at once.
+
+        Drivers whose backend supports bulk writes should override this
+        method, by default every event is passed to notify() one by one.
+
+        :param events: list of payloads, each of them in the format
+                       described in notify()
+        """
+        for info in events:
+            self.notify(info, **kwargs)
+
     def get_report(self, base_id: str) -> dict[str, Any]:
         """Forms and returns report composed from the stored notifications.
 
@@ -155,6 +182,48 @@ class Driver:
             "or has to be overridden"
         )
 
+    @staticmethod
+    def _is_error(info: dict[str, Any]) -> bool:
+        """Returns True if the notification reports an exception."""
+        for key in ("info", "stop_info"):
+            if (info.get(key) or {}).get("etype") is not None:
+                return True
+        return False
+
+    @staticmethod
+    def _split_span_record(
+        record: dict[str, Any],
+    ) -> tuple[dict[str, Any], dict[str, Any]]:
+        """Returns the start and stop notifications of a span record.
+
+        Span records (<name>-span) are sent instead of the <name>-start and
+        <name>-stop notifications when profiler.set_notification_format()
+        is set to "spans".
+        """
+        op = record["name"][: -len("-span")]
+        start = {
+            key: value
+            for key, value in record.items()
+            if key not in ("duration_ns", "stop_info", "local_root")
+        }
+        start["name"] = f"{op}-start"
+        stop = dict(start, name=f"{op}-stop")
+        start_ns = record.get("timestamp_ns")
+        if start_ns is None:
+            start_ns = _utils.parse_timestamp(record["timestamp"])
+        stop_ns = start_ns + record.get("duration_ns", 0)
+        stop["timestamp_ns"] = stop_ns
+        stop["timestamp"] = _utils.format_timestamp(stop_ns)
+        stop_info = dict(record.get("stop_info") or {})
+        host = (record.get("info") or {}).get("host")
+        if host is not None:
+            stop_info["host"] = host
+        if stop_info:
+            stop["info"] = stop_info
+        else:
+            stop.pop("info", None)
+        return start, stop
+
     @staticmethod
     def _build_tree(nodes: dict[str, Any]) -> list[dict[str, Any]]:
         """Builds the tree (forest) data structure based on the list of nodes.
@@ -209,10 +278,31 @@ class Driver:
         :param host: host name or FQDN
         :param timestamp: Unicode-style timestamp matching the pattern
                           "%Y-%m-%dT%H:%M:%S.%f" , e.g. 2016-04-18T17:42:10.77
+                          Only parsed if raw_payload has no "timestamp_ns"
+                          (sent by older releases).
         :param raw_payload: raw notification without any filtering, with all
                             fields included
         """
-        ts = datetime.datetime.strptime(timestamp, "%Y-%m-%dT%H:%M:%S.%f")
+        if name.endswith("-span") and raw_payload:
+            # NOTE: Some drivers (e.g. SQLAlchemy) store the name and the
+            #       timestamp apart from the rest of the record.
+            record = {"name": name, "timestamp": timestamp, **raw_payload}
+            for event in self._split_span_record(record):
+                self._append_results(
+                    trace_id,
+                    parent_id,
+                    event["name"],
+                    project,
+                    service,
+                    host,
+                    event["timestamp"],
+                    event,
+                )
+            return
+
+        ts = raw_payload.get("timestamp_ns") if raw_payload else None
+        if ts is None:
+            ts = _utils.parse_timestamp(timestamp)
         if trace_id not in self.result:
             self.result[trace_id] = {
                 "info": {
@@ -233,8 +323,36 @@ class Driver:
             if raw_payload and "info" in raw_payload:
                 exc = raw_payload["info"].get("etype", "None")
                 self.result[trace_id]["info"]["exception"] = exc
+                if "cpu" in raw_payload["info"]:
+                    # NOTE: See profiler.set_resource_usage().
+                    cpu = raw_payload["info"]["cpu"]
+                    self.result[trace_id]["info"]["cpu"] = cpu["cpu_ns"]
+                    self.result[trace_id]["info"]["self_cpu"] = cpu[
+                        "self_cpu_ns"
+                    ]
+                if "counters" in raw_payload["info"]:
+                    # NOTE: See profiler.add_counter().
+                    self.result[trace_id]["info"]["counters"] = raw_payload[
+                        "info"
+                    ]["counters"]
+                if "memory" in raw_payload["info"]:
+                    # NOTE: See profiler.set_memory_tracking().
+                    memory = raw_payload["info"]["memory"]
+                    info = self.result[trace_id]["info"]
+                    info["memory_allocated"] = memory["allocated"]
+                    info["memory_process_peak"] = memory["process_peak"]
         else:
             self.result[trace_id]["info"]["started"] = ts
+            if raw_payload and "aggregated" in raw_payload.get("info", {}):
+                # NOTE: Summary of calls of a hot trace point, see
+                #       profiler.set_aggregation().
+                aggregated = raw_payload["info"]["aggregated"]
+                self.result[trace_id]["info"]["aggregated"] = aggregated[
+                    "count"
+                ]
+            if raw_payload and "gc" in raw_payload.get("info", {}):
+                # NOTE: Garbage collection, see osprofiler.gctrace.
+                self.result[trace_id]["info"]["gc"] = raw_payload["info"]["gc"]
             if not self.last_started_at or self.last_started_at < ts:
                 self.last_started_at = ts
 
@@ -250,15 +368,23 @@ class Driver:
         :returns: full profiling report
         """
 
-        def msec(dt: datetime.timedelta) -> int:
-            # NOTE(boris-42): Unfortunately this is the simplest way that works
-            # in py26 and py27
-            microsec = (
-                dt.microseconds + (dt.seconds + dt.days * 24 * 3600) * 1e6
-            )
-            return int(microsec / 1000.0)
+        def msec(ns: int) -> float:
+            # Milliseconds with microsecond precision.
+            return ns // 1000 / 1000
 
         stats: dict[str, Any] = {}
+        # NOTE: Durations are summed in microseconds, float milliseconds
+        #       would accumulate rounding errors.
+        durations: dict[str, int] = {}
+        # NOTE: CPU and self CPU times, of the trace points that recorded
+        #       them.
+        cpu_times: dict[str, list[int]] = {}
+        # NOTE: Allocated bytes and highest peak, of the trace points that
+        #       recorded them.
+        memory: dict[str, list[int]] = {}
+        # NOTE: Durations of the garbage collections. A collection pauses
+        #       the process, it is recorded by each of its traced threads.
+        gc_pauses: dict[tuple[Any, ...], int] = {}
 
         for r in self.result.values():
             # NOTE(boris-42): We are not able to guarantee that the backend
@@ -270,20 +396,52 @@ class Driver:
                 r["info"]["finished"] = r["info"]["started"]
 
             op_type = r["info"]["name"]
-            op_started = msec(r["info"]["started"] - self.started_at)
-            op_finished = msec(r["info"]["finished"] - self.started_at)
-            duration = op_finished - op_started
+            op_started = r["info"]["started"] - self.started_at
+            op_finished = r["info"]["finished"] - self.started_at
 
-            r["info"]["started"] = op_started
-            r["info"]["finished"] = op_finished
+            r["info"]["started"] = msec(op_started)
+            r["info"]["finished"] = msec(op_finished)
 
             if op_type not in stats:
-                stats[op_type] = {"count": 1, "duration": duration}
-            else:
-                stats[op_type]["count"] += 1
-                stats[op_type]["duration"] += duration
-
-        return {
+                stats[op_type] = {"count": 0}
+                durations[op_type] = 0
+            stats[op_type]["count"] += r["info"].get("aggregated", 1)
+            durations[op_type] += op_finished // 1000 - op_started // 1000
+
+            if "cpu" in r["info"]:
+                cpu_ns = r["info"]["cpu"]
+                self_cpu_ns = r["info"]["self_cpu"]
+                r["info"]["cpu"] = msec(cpu_ns)
+                r["info"]["self_cpu"] = msec(self_cpu_ns)
+                times = cpu_times.setdefault(op_type, [0, 0])
+                times[0] += cpu_ns // 1000
+                times[1] += self_cpu_ns // 1000
+
+            if "gc" in r["info"]:
+                gc = r["info"]["gc"]
+                key = (r["info"]["host"], gc["pid"], gc["collection"])
+                gc_pauses[key] = op_finished // 1000 - op_started // 1000
+
+            if "counters" in r["info"]:
+                counters = stats[op_type].setdefault("counters", {})
+                for name, value in r["info"]["counters"].items():
+                    counters[name] = counters.get(name, 0) + value
+
+            if "memory_allocated" in r["info"]:
+                totals = memory.setdefault(op_type, [0, 0])
+                totals[0] += r["info"]["memory_allocated"]
+                totals[1] = max(totals[1], r["info"]["memory_process_peak"])
+
+        for op_type, duration in durations.items():
+            stats[op_type]["duration"] = duration / 1000
+        for op_type, (cpu, self_cpu) in cpu_times.items():
+            stats[op_type]["cpu"] = cpu / 1000
+            stats[op_type]["self_cpu"] = self_cpu / 1000
+        for op_type, (allocated, peak) in memory.items():
+            stats[op_type]["memory_allocated"] = allocated
+            stats[op_type]["memory_process_peak"] = peak
+
+        report: dict[str, Any] = {
             "info": {
                 "name": "total",
                 "started": 0,
@@ -299,3 +457,6 @@ class Driver:
             "children": self._build_tree(self.result),
             "stats": stats,
         }
+        if gc_pauses:
+            report["info"]["gc"] = sum(gc_pauses.values()) / 1000
+        return report
@@ -56,6 +56,7 @@ class ElasticsearchDriver(base.Driver):
             parser.urlparse(self.connection_str)._replace(scheme="http")
         )
         self.conf = conf
+        self.client_url = client_url
         self.client = Elasticsearch(client_url)
         self.index_name = index_name
         self.index_name_error = "osprofiler-notifications-error"
@@ -64,6 +65,12 @@ class ElasticsearchDriver(base.Driver):
     def get_name(cls) -> str:
         return "elasticsearch"
 
+    def after_fork(self) -> None:
+        """Replaces the client shared with the parent process."""
+        from elasticsearch import Elasticsearch
+
+        self.client = Elasticsearch(self.client_url)
+
     def notify(self, info: dict[str, Any], **kwargs: Any) -> None:
         """Send notifications to Elasticsearch.
 
@@ -87,12 +94,45 @@ class ElasticsearchDriver(base.Driver):
             body=info,
         )
 
-        if (
-            self.filter_error_trace
-            and info.get("info", {}).get("etype") is not None
-        ):
+        if self.filter_error_trace and self._is_error(info):
             self.notify_error_trace(info)
 
+    def notify_batch(
+        self, events: list[dict[str, Any]], **kwargs: Any
+    ) -> None:
+        """Send a batch of notifications with one Elasticsearch _bulk call.
+
+        :param events: list of payloads in the format described in notify()
+        """
+        doc_type = self.conf.profiler.es_doc_type
+        body: list[dict[str, Any]] = []
+        for info in events:
+            info = info.copy()
+            info["project"] = self.project
+            info["service"] = self.service
+            body.append(
+                {"index": {"_index": self.index_name, "_type": doc_type}}
+            )
+            body.append(info)
+
+            if self.filter_error_trace and self._is_error(info):
+                body.append(
+                    {
+                        "index": {
+                            "_index": self.index_name_error,
+                            "_type": doc_type,
+                        }
+                    }
+                )
+                body.append(
+                    {
+                        "base_id": info["base_id"],
+                        "timestamp": info["timestamp"],
+                    }
+                )
+        if body:
+            self.client.bulk(body=body)
+
     def notify_error_trace(self, info: dict[str, Any]) -> None:
         """Store base_id and timestamp of error trace to a separate index."""
         self.client.index(  # type: ignore[call-arg]
@@ -84,7 +84,16 @@ class LogInsightDriver(base.Driver):
 
     def notify(self, info: dict[str, Any], **kwargs: Any) -> None:
         """Send trace to Log Insight server."""
+        self._client.send_event(self._create_event(info))
 
+    def notify_batch(
+        self, events: list[dict[str, Any]], **kwargs: Any
+    ) -> None:
+        """Send traces to Log Insight server with one ingest request."""
+        if events:
+            self._client.send_events([self._create_event(e) for e in events])
+
+    def _create_event(self, info: dict[str, Any]) -> dict[str, Any]:
         trace = info.copy()
         trace["project"] = self.project
         trace["service"] = self.service
@@ -102,8 +111,7 @@ class LogInsightDriver(base.Driver):
             _create_field("name", trace["name"]),
             _create_field("trace", json.dumps(trace)),
         ]
-
-        self._client.send_event(event)
+        return event
 
     def get_report(self, base_id: str) -> dict[str, Any]:
         """Retrieves and parses trace data from Log Insight.
@@ -268,9 +276,11 @@ class LogInsightClient:
         LOG.debug("Established session %s.", self._trunc_session_id())
 
     def send_event(self, event: dict[str, Any]) -> None:
-        events = {"events": [event]}
+        self.send_events([event])
+
+    def send_events(self, events: list[dict[str, Any]]) -> None:
         self._send_request(
-            "post", "http", self.EVENTS_INGEST_PATH, body=events
+            "post", "http", self.EVENTS_INGEST_PATH, body={"events": events}
         )
 
     def query_events(self, params: dict[str, str]) -> Any:
@@ -114,6 +114,7 @@ class Messaging(base.Driver):
                         current active user and tenant.
         """
 
+        info = info.copy()
         info["project"] = self.project
         info["service"] = self.service
         self.client.info(
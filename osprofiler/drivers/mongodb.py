@@ -54,6 +54,15 @@ class MongoDB(base.Driver):
     def get_name(cls) -> str:
         return "mongodb"
 
+    def after_fork(self) -> None:
+        """Replaces the client shared with the parent process."""
+        from pymongo import MongoClient
+
+        # NOTE: MongoClient is not fork-safe, a new one is needed in each
+        #       child process. It connects on first use.
+        client: Any = MongoClient(self.connection_str, connect=False)
+        self.db = client[self.db.name]
+
     def notify(self, info: dict[str, Any], **kwargs: Any) -> None:
         """Send notifications to MongoDB.
 
@@ -72,12 +81,31 @@ class MongoDB(base.Driver):
         data["service"] = self.service
         self.db.profiler.insert_one(data)
 
-        if (
-            self.filter_error_trace
-            and data.get("info", {}).get("etype") is not None
-        ):
+        if self.filter_error_trace and self._is_error(data):
             self.notify_error_trace(data)
 
+    def notify_batch(
+        self, events: list[dict[str, Any]], **kwargs: Any
+    ) -> None:
+        """Send a batch of notifications to MongoDB with insert_many().
+
+        :param events: list of payloads in the format described in notify()
+        """
+        documents: list[dict[str, Any]] = []
+        for info in events:
+            data = info.copy()
+            data["project"] = self.project
+            data["service"] = self.service
+            documents.append(data)
+        if not documents:
+            return
+        self.db.profiler.insert_many(documents, ordered=False)
+
+        if self.filter_error_trace:
+            for data in documents:
+                if self._is_error(data):
+                    self.notify_error_trace(data)
+
     def notify_error_trace(self, data: dict[str, Any]) -> None:
         """Store base_id and timestamp of error trace to a separate db."""
         self.db.profiler_error.update(
@@ -12,7 +12,6 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
-import collections
 from typing import Any
 from urllib import parse as parser
 
@@ -79,7 +78,9 @@ class OTLP(base.Driver):
             BatchSpanProcessor(exporter)
         )
 
-        self.spans: collections.deque[Any] = collections.deque()
+        # NOTE: Spans started by start events, by trace id. Span handles
+        #       (see profiler.start_span()) may finish in any order.
+        self.spans: dict[str, Any] = {}
 
     def _get_service_name(
         self, conf: cfg.ConfigOpts, project: str | None, service: str | None
@@ -93,6 +94,12 @@ class OTLP(base.Driver):
     def get_name(cls) -> str:
         return "otlp"
 
+    def after_fork(self) -> None:
+        """Forgets the spans started by the parent process."""
+        # NOTE: BatchSpanProcessor restarts its export thread and empties
+        #       its queue in the child process on its own.
+        self.spans.clear()
+
     def _kind(self, name: str) -> Any:
         if "wsgi" in name:
             return self.trace_api.SpanKind.SERVER
@@ -114,70 +121,103 @@ class OTLP(base.Driver):
             return "REQUESTS_{}_{}".format(
                 info["requests"]["method"], info["requests"]["hostname"]
             )
-        return str(payload["name"]).rstrip("-start")
+        name = str(payload["name"])
+        for suffix in ("-span", "-start"):
+            if name.endswith(suffix):
+                return name[: -len(suffix)]
+        return name
 
     def notify(self, info: dict[str, Any], **kwargs: Any) -> None:
         payload = info
-        if payload["name"].endswith("start"):
-            ctx = None
-            trace_id = utils.uuid_to_int128(payload["base_id"])
-            if payload["base_id"] != payload["parent_id"]:
-                # only non-root spans should have a parent span and context
-                parent = self.trace_api.SpanContext(
-                    trace_id=trace_id,
-                    span_id=utils.shorten_id(payload["parent_id"]),
-                    is_remote=False,
-                    trace_flags=self.trace_api.TraceFlags(
-                        self.trace_api.TraceFlags.SAMPLED
-                    ),
-                )
-
-                ctx = self.trace_api.set_span_in_context(
-                    self.trace_api.NonRecordingSpan(parent)
-                )
-
-            # OTLP Tracing span
-            span = self.tracer.start_span(
-                name=self._name(payload),
-                kind=self._kind(payload['name']),
-                attributes=self.create_span_tags(payload),
-                context=ctx,
+        if payload["name"].endswith("-span"):
+            # Completed span record, see profiler.set_notification_format()
+            span = self._start_span(payload)
+            self._finish_span(
+                span,
+                payload.get("stop_info") or {},
+                payload["timestamp_ns"] + payload.get("duration_ns", 0),
+            )
+        elif payload["name"].endswith("start"):
+            self.spans[payload["trace_id"]] = self._start_span(payload)
+        else:
+            span = self.spans.pop(payload["trace_id"], None)
+            if span is None:
+                # NOTE: e.g. started by the parent of a forked process.
+                return
+            self._finish_span(
+                span,
+                payload.get("info", {}),
+                payload.get("timestamp_ns"),
             )
 
-            span._context = self.trace_api.SpanContext(  # type: ignore[attr-defined]
+    def _start_span(self, payload: dict[str, Any]) -> Any:
+        ctx = None
+        trace_id = utils.uuid_to_int128(payload["base_id"])
+        if payload["base_id"] != payload["parent_id"]:
+            # only non-root spans should have a parent span and context
+            parent = self.trace_api.SpanContext(
                 trace_id=trace_id,
-                span_id=utils.shorten_id(payload["trace_id"]),
-                is_remote=span.context.is_remote,  # type: ignore[attr-defined]
-                trace_flags=span.context.trace_flags,  # type: ignore[attr-defined]
-                trace_state=span.context.trace_state,  # type: ignore[attr-defined]
+                span_id=utils.shorten_id(payload["parent_id"]),
+                is_remote=False,
+                trace_flags=self.trace_api.TraceFlags(
+                    self.trace_api.TraceFlags.SAMPLED
+                ),
             )
 
-            self.spans.append(span)
-        else:
-            span = self.spans.pop()
-
-            # Store result of db call and function call
-            for call in ("db", "function"):
-                if payload.get("info", {}).get(call, {}).get("result"):
-                    span.set_attribute(
-                        "result", payload["info"][call]["result"]
-                    )
-            # Store result of requests
-            if payload.get("info", {}).get("requests"):
-                span.set_attribute(
-                    "status_code", payload["info"]["requests"]["status_code"]
-                )
-            # Span error tag and log
-            if payload["info"].get("etype"):
-                span.set_attribute("error", True)
-                span.add_event(
-                    "log",
-                    {
-                        "error.kind": payload["info"]["etype"],
-                        "message": payload["info"]["message"],
-                    },
-                )
-            span.end()
+            ctx = self.trace_api.set_span_in_context(
+                self.trace_api.NonRecordingSpan(parent)
+            )
+
+        # OTLP Tracing span
+        span = self.tracer.start_span(
+            name=self._name(payload),
+            kind=self._kind(payload['name']),
+            attributes=self.create_span_tags(payload),
+            context=ctx,
+            # NOTE: Not the time of notify(), which may be delayed by
+            #       asynchronous or batched notifications.
+            start_time=payload.get("timestamp_ns"),
+        )
+
+        span._context = self.trace_api.SpanContext(  # type: ignore[attr-defined]
+            trace_id=trace_id,
+            span_id=utils.shorten_id(payload["trace_id"]),
+            is_remote=span.context.is_remote,  # type: ignore[attr-defined]
+            trace_flags=span.context.trace_flags,  # type: ignore[attr-defined]
+            trace_state=span.context.trace_state,  # type: ignore[attr-defined]
+        )
+        return span
+
+    def _finish_span(
+        self, span: Any, info: dict[str, Any], end_time: int | None
+    ) -> None:
+        # Store result of db call and function call
+        for call in ("db", "function"):
+            if info.get(call, {}).get("result"):
+                span.set_attribute("result", info[call]["result"])
+        # Store result of requests
+        if info.get("requests"):
+            span.set_attribute("status_code", info["requests"]["status_code"])
+        # Events and counters, see profiler.add_event() and add_counter()
+        for event in info.get("events", ()):
+            span.add_event(
+                event["name"],
+                _attributes(event.get("attrs", {})),
+                timestamp=event.get("timestamp_ns"),
+            )
+        for name, value in info.get("counters", {}).items():
+            span.set_attribute(f"counter.{name}", value)
+        # Span error tag and log
+        if info.get("etype"):
+            span.set_attribute("error", True)
+            span.add_event(
+                "log",
+                {
+                    "error.kind": info["etype"],
+                    "message": info.get("message") or "",
+                },
+            )
+        span.end(end_time=end_time)
 
     def get_report(self, base_id: str) -> dict[str, Any]:
         return self._parse_results()
@@ -228,3 +268,13 @@ class OTLP(base.Driver):
             tags["name"] = info["function"]["name"]
 
         return tags
+
+
+def _attributes(attrs: dict[str, Any]) -> dict[str, Any]:
+    """Returns attrs with the values OpenTelemetry doesn't take as JSON."""
+    return {
+        key: value
+        if isinstance(value, (str, bool, int, float))
+        else jsonutils.dumps(value)
+        for key, value in attrs.items()
+    }
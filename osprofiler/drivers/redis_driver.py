@@ -65,6 +65,14 @@ class Redis(base.Driver):
     def get_name(cls) -> str:
         return "redis"
 
+    def after_fork(self) -> None:
+        """Replaces the client shared with the parent process."""
+        from redis import Redis as _Redis
+
+        # NOTE: Connections are opened on first use. The ones of the parent
+        #       are only closed, not shut down, when the old client is gone.
+        self.db = _Redis.from_url(self.connection_str)
+
     def notify(self, info: dict[str, Any], **kwargs: Any) -> None:
         """Send notifications to Redis.
 
@@ -84,19 +92,35 @@ class Redis(base.Driver):
         key = self.namespace_opt + data["base_id"]
         self.db.lpush(key, jsonutils.dumps(data))
 
-        if (
-            self.filter_error_trace
-            and data.get("info", {}).get("etype") is not None
-        ):
+        if self.filter_error_trace and self._is_error(data):
             self.notify_error_trace(data)
 
-    def notify_error_trace(self, data: dict[str, Any]) -> None:
+    def notify_batch(
+        self, events: list[dict[str, Any]], **kwargs: Any
+    ) -> None:
+        """Send a batch of notifications to Redis in one round trip.
+
+        :param events: list of payloads in the format described in notify()
+        """
+        pipe = self.db.pipeline(transaction=False)
+        for info in events:
+            data = info.copy()
+            data["project"] = self.project
+            data["service"] = self.service
+            pipe.lpush(
+                self.namespace_opt + data["base_id"], jsonutils.dumps(data)
+            )
+            if self.filter_error_trace and self._is_error(data):
+                self.notify_error_trace(data, db=pipe)
+        pipe.execute()
+
+    def notify_error_trace(self, data: dict[str, Any], db: Any = None) -> None:
         """Store base_id and timestamp of error trace to a separate key."""
         key = self.namespace_error + data["base_id"]
         value = jsonutils.dumps(
             {"base_id": data["base_id"], "timestamp": data["timestamp"]}
         )
-        self.db.set(key, value)
+        (db or self.db).set(key, value)
 
     def list_traces(
         self, fields: set[str] | None = None
@@ -239,14 +263,17 @@ class RedisSentinel(Redis, base.Driver):
             )
 
         self.conf = conf
+        self.db = self._master_for(Sentinel)
+
+    def _master_for(self, sentinel_cls: Any) -> Any:
         socket_timeout = self.conf.profiler.socket_timeout
         parsed_url = parser.urlparse(self.connection_str)
-        sentinel = Sentinel(  # type: ignore[no-untyped-call]
+        sentinel = sentinel_cls(
             [(parsed_url.hostname, int(parsed_url.port))],  # type: ignore[arg-type]
             password=parsed_url.password,
             socket_timeout=socket_timeout,
         )
-        self.db = sentinel.master_for(  # type: ignore[no-untyped-call]
+        return sentinel.master_for(
             self.conf.profiler.sentinel_service_name,
             socket_timeout=socket_timeout,
         )
@@ -254,3 +281,9 @@ class RedisSentinel(Redis, base.Driver):
     @classmethod
     def get_name(cls) -> str:
         return "redissentinel"
+
+    def after_fork(self) -> None:
+        """Replaces the client shared with the parent process."""
+        from redis.sentinel import Sentinel
+
+        self.db = self._master_for(Sentinel)
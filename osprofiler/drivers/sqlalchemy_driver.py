@@ -66,6 +66,7 @@ class SQLAlchemyDriver(base.Driver):
                 Column("data", JSON),
             )
 
+        self._conn: Any = None
         # we don't want to kill any service that does use osprofiler
         try:
             self._engine = create_engine(connection_str)
@@ -84,40 +85,68 @@ class SQLAlchemyDriver(base.Driver):
     def get_name(cls) -> str:
         return "sqlalchemy"
 
+    def after_fork(self) -> None:
+        """Drops the connections shared with the parent process."""
+        # NOTE: close=False leaves the connections of the parent open, see
+        #       "Using Connection Pools with Multiprocessing or os.fork()" in
+        #       the SQLAlchemy documentation.
+        if hasattr(self, "_engine"):
+            self._engine.dispose(close=False)
+        self._conn = None
+
+    def _connection(self) -> Any:
+        """Returns the connection, opened on first use after a fork."""
+        if self._conn is None:
+            self._conn = self._engine.connect()
+        return self._conn
+
     def notify(
         self, info: dict[str, Any], context: Any = None, **kwargs: Any
     ) -> None:
         """Write a notification the the database"""
-        data = info.copy()
-        base_id = data.pop("base_id", None)
-        timestamp = data.pop("timestamp", None)
-        parent_id = data.pop("parent_id", None)
-        trace_id = data.pop("trace_id", None)
-        project = data.pop("project", self.project)
-        host = data.pop("host", self.host)
-        service = data.pop("service", self.service)
-        name = data.pop("name", None)
-
+        row = self._to_row(info)
         try:
-            ins = self._data_table.insert().values(
-                timestamp=timestamp,
-                base_id=base_id,
-                parent_id=parent_id,
-                trace_id=trace_id,
-                project=project,
-                service=service,
-                host=host,
-                name=name,
-                data=jsonutils.dumps(data),
-            )
-            self._conn.execute(ins)
+            ins = self._data_table.insert().values(**row)
+            with self._engine.begin() as conn:
+                conn.execute(ins)
         except Exception:
             LOG.exception(
                 "Can not store osprofiler tracepoint %s (base id %s)",
-                trace_id,
-                base_id,
+                row["trace_id"],
+                row["base_id"],
             )
 
+    def notify_batch(
+        self, events: list[dict[str, Any]], context: Any = None, **kwargs: Any
+    ) -> None:
+        """Write a batch of notifications with a single executemany call"""
+        rows = [self._to_row(info) for info in events]
+        if not rows:
+            return
+        try:
+            with self._engine.begin() as conn:
+                conn.execute(self._data_table.insert(), rows)
+        except Exception:
+            LOG.exception(
+                "Can not store %d osprofiler tracepoints (base ids %s)",
+                len(rows),
+                ", ".join(sorted({str(row["base_id"]) for row in rows})),
+            )
+
+    def _to_row(self, info: dict[str, Any]) -> dict[str, Any]:
+        data = info.copy()
+        return {
+            "base_id": data.pop("base_id", None),
+            "timestamp": data.pop("timestamp", None),
+            "parent_id": data.pop("parent_id", None),
+            "trace_id": data.pop("trace_id", None),
+            "project": data.pop("project", self.project),
+            "host": data.pop("host", self.host),
+            "service": data.pop("service", self.service),
+            "name": data.pop("name", None),
+            "data": jsonutils.dumps(data),
+        }
+
     def list_traces(
         self, fields: set[str] | None = None
     ) -> list[dict[str, Any]]:
@@ -128,11 +157,12 @@ class SQLAlchemyDriver(base.Driver):
                 "To use this command, you should install 'SQLAlchemy'"
             )
         fields = set(fields or self.default_trace_fields)
-        stmt = select([self._data_table])
+        stmt = select(self._data_table)
         seen_ids: set[str] = set()
         result: list[dict[str, Any]] = []
-        traces = self._conn.execute(stmt).fetchall()
+        traces = self._connection().execute(stmt).fetchall()
         for trace in traces:
+            trace = trace._mapping
             if trace["base_id"] not in seen_ids:
                 seen_ids.add(trace["base_id"])
                 result.append(
@@ -151,11 +181,12 @@ class SQLAlchemyDriver(base.Driver):
             raise exc.CommandError(
                 "To use this command, you should install 'SQLAlchemy'"
             )
-        stmt = select([self._data_table]).where(
+        stmt = select(self._data_table).where(
             self._data_table.c.base_id == base_id
         )
-        results = self._conn.execute(stmt).fetchall()
-        for n in results:
+        results = self._connection().execute(stmt).fetchall()
+        for row in results:
+            n = row._mapping
             timestamp = n["timestamp"]
             trace_id = n["trace_id"]
             parent_id = n["parent_id"]
@@ -0,0 +1,133 @@
+# Copyright 2026 OpenStack Foundation.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Attribution of garbage collector pauses to trace points.
+
+A garbage collection pauses every thread of the process. When enabled, each
+collection that happens while traces are active is recorded, with a
+gc.callbacks hook, in the trace point running in each traced thread. It is
+sent as a "gc" child trace point with the generation, the number of
+collected and uncollectable objects and the duration of the collection when
+that trace point stops:
+
+>>  from osprofiler import gctrace
+>>  gctrace.set_enabled(True)
+
+The hook is only installed while a trace is active in some thread.
+"""
+
+import gc
+import itertools
+import os
+import threading
+import time
+from typing import Any
+
+from osprofiler import _utils as utils
+
+_enabled = False
+_lock = threading.Lock()
+# NOTE: Profiler of the trace running in each thread, by thread id.
+_profilers: dict[int, Any] = {}
+_collections = itertools.count(1)
+# NOTE: Wall-clock and monotonic times the running collection started at.
+_started = [0, 0]
+
+
+def set_enabled(enabled: bool) -> None:
+    """Records the garbage collections in the active traces.
+
+    :param enabled: True to record them
+    """
+    global _enabled
+    with _lock:
+        _enabled = enabled
+        if not enabled:
+            _profilers.clear()
+            _uninstall()
+
+
+def is_enabled() -> bool:
+    """Returns True if garbage collections are recorded."""
+    return _enabled
+
+
+def track(profiler: Any) -> None:
+    """Records the garbage collections in the current thread's trace."""
+    ident = threading.get_ident()
+    if not _enabled or _profilers.get(ident) is profiler:
+        return
+    with _lock:
+        if _enabled:
+            _profilers[ident] = profiler
+            if _callback not in gc.callbacks:
+                gc.callbacks.append(_callback)
+
+
+def untrack(profiler: Any) -> None:
+    """Stops recording the garbage collections for profiler."""
+    ident = threading.get_ident()
+    with _lock:
+        if _profilers.get(ident) is profiler:
+            del _profilers[ident]
+            if not _profilers:
+                _uninstall()
+
+
+def _after_fork() -> None:
+    global _lock
+    _lock = threading.Lock()
+    # NOTE: Only the thread that forked exists in the child.
+    ident = threading.get_ident()
+    for other in list(_profilers):
+        if other != ident:
+            del _profilers[other]
+    if not _profilers:
+        _uninstall()
+
+
+os.register_at_fork(after_in_child=_after_fork)
+
+
+def _uninstall() -> None:
+    if _callback in gc.callbacks:
+        gc.callbacks.remove(_callback)
+
+
+def _callback(phase: str, info: dict[str, Any]) -> None:
+    if phase == "start":
+        _started[0] = utils.timestamp_ns()
+        _started[1] = time.perf_counter_ns()
+        return
+    duration_ns = time.perf_counter_ns() - _started[1]
+    gc_info = {
+        "generation": info["generation"],
+        "collected": info["collected"],
+        "uncollectable": info["uncollectable"],
+        # NOTE: Identifies the collection, recorded by every traced thread.
+        "pid": os.getpid(),
+        "collection": next(_collections),
+    }
+    # NOTE: Other threads don't run during the collection, the dicts are
+    #       not modified meanwhile. No lock is taken here: the collection
+    #       may have been triggered by an allocation of a thread holding it.
+    for profiler in list(_profilers.values()):
+        try:
+            trace_id = profiler._trace_stack[-1]
+        except IndexError:
+            continue
+        profiler._gc_pauses.setdefault(trace_id, []).append(
+            (_started[0], duration_ns, gc_info)
+        )
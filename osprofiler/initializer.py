@@ -17,8 +17,14 @@ from typing import Any
 
 from oslo_config import cfg
 
+from osprofiler import capture
+from osprofiler import gctrace
 from osprofiler import notifier
+from osprofiler import profiler
 from osprofiler import requests
+from osprofiler import sampling
+from osprofiler import stacksampler
+from osprofiler import tracepoints
 from osprofiler import web
 
 
@@ -50,7 +56,82 @@ def init_from_conf(
         conf=conf,
         **kwargs,
     )
+    if conf.profiler.notification_batch_size > 1:
+        _notifier = notifier.BatchNotifier(
+            _notifier,
+            batch_size=conf.profiler.notification_batch_size,
+            batch_interval=conf.profiler.notification_batch_interval,
+        )
+    if conf.profiler.async_notification:
+        _notifier = notifier.AsyncNotifier(
+            _notifier,
+            queue_size=conf.profiler.async_queue_size,
+            workers=conf.profiler.async_workers,
+            overflow_policy=conf.profiler.async_overflow_policy,
+        )
+    if conf.profiler.tail_sampling:
+        # NOTE: Outermost, so that trace durations are measured when the
+        #       trace points happen and not when they are delivered.
+        _notifier = notifier.TailSamplingNotifier(
+            _notifier,
+            min_duration=conf.profiler.tail_sampling_min_duration,
+            max_trace_events=conf.profiler.tail_sampling_max_trace_events,
+            max_events=conf.profiler.tail_sampling_max_events,
+        )
     notifier.set(_notifier)
+    sampler = None
+    if (
+        conf.profiler.sampling_rate < 1
+        or conf.profiler.sampling_max_per_second
+        or conf.profiler.sampling_path_rates
+    ):
+        sampler = sampling.Sampler(
+            rate=conf.profiler.sampling_rate,
+            max_per_second=conf.profiler.sampling_max_per_second,
+            path_rates=conf.profiler.sampling_path_rates,
+        )
+    sampling.set(sampler)
+    profiler.set_id_generator(conf.profiler.id_generator)
+    profiler.set_notification_format(conf.profiler.notification_format)
+    profiler.set_trace_limits(
+        max_spans=conf.profiler.trace_max_spans,
+        max_bytes=conf.profiler.trace_max_bytes,
+        max_depth=conf.profiler.trace_max_depth,
+    )
+    profiler.set_aggregation(
+        min_calls=conf.profiler.aggregate_min_calls,
+        max_duration=conf.profiler.aggregate_max_duration,
+    )
+    profiler.set_resource_usage(conf.profiler.resource_usage)
+    profiler.set_memory_tracking(
+        conf.profiler.memory_tracking,
+        top_sites=conf.profiler.memory_top_sites,
+    )
+    gctrace.set_enabled(conf.profiler.trace_gc)
+    stack_sampler = None
+    if conf.profiler.stack_sampling_interval:
+        stack_sampler = stacksampler.StackSampler(
+            interval=conf.profiler.stack_sampling_interval,
+            max_overhead=conf.profiler.stack_sampling_max_overhead,
+        )
+    stacksampler.set(stack_sampler)
+    capture.set(
+        capture.Formatter(
+            max_length=conf.profiler.capture_max_length,
+            max_depth=conf.profiler.capture_max_depth,
+            max_items=conf.profiler.capture_max_items,
+        )
+    )
+    tracepoints.set_disabled(conf.profiler.disabled_trace_points)
+    conf.register_mutate_hook(_mutate_disabled_trace_points)
     web.enable(conf.profiler.hmac_keys)
     if conf.profiler.trace_requests:
         requests.enable()
+
+
+def _mutate_disabled_trace_points(
+    conf: cfg.ConfigOpts, fresh: dict[tuple[str | None, str], Any]
+) -> None:
+    """Applies a reloaded disabled_trace_points option."""
+    if ("profiler", "disabled_trace_points") in fresh:
+        tracepoints.set_disabled(conf.profiler.disabled_trace_points)
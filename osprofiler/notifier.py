@@ -13,11 +13,20 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
-from collections.abc import Callable
+import atexit
+import builtins
+import collections
+from collections.abc import Callable, Mapping
 import logging
+import queue
+import threading
+import time
 from typing import Any
 
+from osprofiler import _utils as utils
 from osprofiler.drivers import base
+from osprofiler import records
+from osprofiler import stats
 
 
 LOG = logging.getLogger(__name__)
@@ -29,17 +38,41 @@ def _noop_notifier(info: dict[str, Any], context: Any = None) -> None:
 
 # NOTE(boris-42): By default we are using noop notifier.
 __notifier: Callable[..., None] = _noop_notifier
+__notifier_accepts_records = True
+__notifier_defers_formatting = True
+__notifier_stats = ("notify_latency.noop", "notify_errors.noop")
 __notifier_cache: dict[
     str, Callable[..., None]
 ] = {}  # map: connection-string -> notifier
 
 
-def notify(info: dict[str, Any]) -> None:
+def notify(info: Mapping[str, Any]) -> None:
     """Passes the profiling info to the notifier callable.
 
-    :param info: dictionary with profiling information
+    :param info: dictionary or records.TraceRecord with profiling
+                 information. Records are converted to dictionaries unless
+                 the notifier is a driver, possibly wrapped into the
+                 notifiers of this module, or a TailSamplingNotifier, which
+                 converts the records it sends. Their captured values (see
+                 capture.LazyRepr) are formatted here, unless the notifier
+                 is a TailSamplingNotifier, which formats the records it
+                 keeps.
     """
-    __notifier(info)
+    if isinstance(info, records.TraceRecord):
+        if not __notifier_accepts_records:
+            info = info.copy()
+        elif not __notifier_defers_formatting:
+            info.resolve()
+    if __notifier is _noop_notifier:
+        return
+    started = time.perf_counter()
+    try:
+        __notifier(info)
+    except Exception:
+        stats.incr(__notifier_stats[1])
+        stats.incr("events_dropped.notify_error")
+        raise
+    stats.observe(__notifier_stats[0], time.perf_counter() - started)
 
 
 def get() -> Callable[..., None]:
@@ -54,8 +87,36 @@ def set(notifier: Callable[..., None]) -> None:
     one argument "info". "info" - is dictionary of values that contains
     profiling information.
     """
-    global __notifier
+    global __notifier, __notifier_accepts_records
+    global __notifier_defers_formatting, __notifier_stats
     __notifier = notifier
+    name = _notifier_name(notifier)
+    __notifier_stats = (f"notify_latency.{name}", f"notify_errors.{name}")
+    __notifier_accepts_records = _accepts_records(notifier)
+    # NOTE: Captured values are formatted in the traced thread, unless the
+    #       notifier may drop the record, then it formats the ones it sends.
+    __notifier_defers_formatting = notifier is _noop_notifier or isinstance(
+        notifier, TailSamplingNotifier
+    )
+
+
+def _notifier_name(notifier: Callable[..., None]) -> str:
+    """Returns the name of a notifier in the stats."""
+    driver = getattr(notifier, "__self__", None)
+    if isinstance(driver, base.Driver):
+        return driver.get_name()
+    return getattr(notifier, "__name__", type(notifier).__name__)
+
+
+def _accepts_records(notifier: Callable[..., None]) -> bool:
+    while isinstance(notifier, (AsyncNotifier, BatchNotifier)):
+        notifier = notifier.notifier
+    if notifier is _noop_notifier or isinstance(
+        notifier, TailSamplingNotifier
+    ):
+        # NOTE: TailSamplingNotifier converts the records it sends.
+        return True
+    return isinstance(getattr(notifier, "__self__", None), base.Driver)
 
 
 def create(
@@ -91,3 +152,484 @@ def create(
 
 def clear_notifier_cache() -> None:
     __notifier_cache.clear()
+
+
+class AsyncNotifier:
+    """Notifier that moves notifications out of the request thread.
+
+    Payloads are put into a bounded in-process queue and sent to the wrapped
+    notifier by one or more background worker threads, so the caller never
+    waits for the storage backend network round trip.
+
+    >>  _notifier = notifier.create("redis://127.0.0.1:6379", ...)
+    >>  notifier.set(notifier.AsyncNotifier(_notifier, queue_size=10000))
+
+    :param notifier: notifier callable the payloads are delivered to
+    :param queue_size: maximum number of payloads waiting for delivery
+    :param workers: number of background threads draining the queue
+    :param overflow_policy: what to do when the queue is full:
+                            "drop_newest" - discard the new payload (default),
+                            "drop_oldest" - discard the oldest queued payload,
+                            "block" - wait until there is room in the queue.
+    """
+
+    OVERFLOW_POLICIES = ("drop_newest", "drop_oldest", "block")
+
+    #: How often (seconds) idle workers flush a buffering notifier.
+    idle_flush_interval = 1.0
+
+    def __init__(
+        self,
+        notifier: Callable[..., None],
+        queue_size: int = 10000,
+        workers: int = 1,
+        overflow_policy: str = "drop_newest",
+    ) -> None:
+        if overflow_policy not in self.OVERFLOW_POLICIES:
+            raise ValueError(
+                f"Unknown overflow policy '{overflow_policy}', expected one "
+                f"of: {', '.join(self.OVERFLOW_POLICIES)}"
+            )
+        if workers < 1:
+            raise ValueError("At least one worker is required")
+
+        self.notifier = notifier
+        self.workers = workers
+        self.overflow_policy = overflow_policy
+        self.dropped = 0
+        self._queue: queue.Queue[dict[str, Any] | None] = queue.Queue(
+            maxsize=max(queue_size, 0)
+        )
+        self._threads: list[threading.Thread] = []
+        self._lock = threading.Lock()
+        self._stopped = False
+        self._stats_name = _notifier_name(notifier)
+        stats.get().register_gauge("queue_depth", self.qsize)
+        atexit.register(self.shutdown)
+        utils.register_at_fork(self._after_fork)
+
+    def _after_fork(self) -> None:
+        # NOTE: The workers don't exist in a forked child and the queued
+        #       payloads are delivered by the parent. Workers are started
+        #       again by the first notification.
+        self._queue = queue.Queue(maxsize=self._queue.maxsize)
+        self._threads = []
+        self._lock = threading.Lock()
+
+    def __call__(self, info: dict[str, Any], context: Any = None) -> None:
+        if self._stopped:
+            # NOTE: Nobody will drain the queue anymore, deliver in place.
+            self.notifier(info)
+            return
+        if len(self._threads) < self.workers:
+            self._start_workers()
+
+        if self.overflow_policy == "block":
+            self._queue.put(info)
+            return
+
+        while True:
+            try:
+                self._queue.put_nowait(info)
+                return
+            except queue.Full:
+                if self.overflow_policy == "drop_newest":
+                    self.dropped += 1
+                    stats.incr("events_dropped.async_queue_full")
+                    return
+            # drop_oldest: make room and retry
+            try:
+                self._queue.get_nowait()
+            except queue.Empty:
+                continue
+            self._queue.task_done()
+            self.dropped += 1
+            stats.incr("events_dropped.async_queue_full")
+
+    def _start_workers(self) -> None:
+        with self._lock:
+            while len(self._threads) < self.workers:
+                thread = threading.Thread(
+                    target=self._worker,
+                    name=f"osprofiler-notifier-{len(self._threads)}",
+                    daemon=True,
+                )
+                thread.start()
+                self._threads.append(thread)
+
+    def _worker(self) -> None:
+        while True:
+            try:
+                info = self._queue.get(timeout=self.idle_flush_interval)
+            except queue.Empty:
+                # NOTE: Let a buffering notifier (e.g. BatchNotifier) send
+                # what it has accumulated while there is no traffic.
+                self._flush_notifier(0)
+                continue
+            try:
+                if info is None:
+                    return
+                started = time.perf_counter()
+                self.notifier(info)
+                stats.observe(
+                    f"notify_latency.{self._stats_name}",
+                    time.perf_counter() - started,
+                )
+            except Exception:
+                LOG.exception("Failed to send osprofiler notification")
+                stats.incr(f"notify_errors.{self._stats_name}")
+                stats.incr("events_dropped.notify_error")
+            finally:
+                self._queue.task_done()
+
+    def qsize(self) -> int:
+        """Returns the number of payloads waiting for delivery."""
+        return self._queue.qsize()
+
+    def flush(self, timeout: float | None = None) -> bool:
+        """Wait until all queued payloads are delivered.
+
+        :param timeout: maximum number of seconds to wait, None means forever
+        :returns: True if the queue was drained, False on timeout
+        """
+        if not self._threads:
+            return self._flush_notifier(timeout)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._queue.all_tasks_done:
+            while self._queue.unfinished_tasks:
+                remaining = None
+                if deadline is not None:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        return False
+                self._queue.all_tasks_done.wait(remaining)
+        remaining = None
+        if deadline is not None:
+            remaining = max(deadline - time.monotonic(), 0)
+        return self._flush_notifier(remaining)
+
+    def _flush_notifier(self, timeout: float | None) -> bool:
+        _flush = getattr(self.notifier, "flush", None)
+        if _flush is None:
+            return True
+        try:
+            return bool(_flush(timeout))
+        except Exception:
+            LOG.exception("Failed to flush osprofiler notifications")
+            return False
+
+    def shutdown(self, timeout: float | None = 5.0) -> None:
+        """Deliver queued payloads and stop the worker threads.
+
+        Called automatically at interpreter exit. Payloads sent after
+        shutdown are delivered synchronously.
+
+        :param timeout: maximum number of seconds to wait for the queue
+                        to drain
+        """
+        if self._stopped:
+            return
+        if not self._threads:
+            # NOTE: Nothing was ever queued, so there is nothing to drain.
+            self._stopped = True
+            self._flush_notifier(timeout)
+            return
+        self.flush(timeout)
+        self._stopped = True
+        for _ in self._threads:
+            try:
+                self._queue.put_nowait(None)
+            except queue.Full:
+                break
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+
+class BatchNotifier:
+    """Notifier that coalesces payloads and sends them in batches.
+
+    Payloads are buffered until either ``batch_size`` of them accumulated or
+    the oldest one is ``batch_interval`` seconds old, then they are sent
+    with one call. If the wrapped notifier is the notify() method of a
+    driver, the driver's notify_batch() bulk path is used.
+
+    >>  _notifier = notifier.create("redis://127.0.0.1:6379", ...)
+    >>  notifier.set(notifier.BatchNotifier(_notifier, batch_size=100))
+
+    The age of the buffer is checked when a new payload arrives, so on its
+    own a quiet service keeps the last payloads until flush() is called (it
+    is called at interpreter exit). Wrap it into AsyncNotifier to have idle
+    batches flushed from the background.
+
+    :param notifier: notifier callable (usually Driver.notify)
+    :param batch_size: maximum number of payloads sent with one call
+    :param batch_interval: maximum age in seconds of a buffered payload
+    """
+
+    def __init__(
+        self,
+        notifier: Callable[..., None],
+        batch_size: int = 100,
+        batch_interval: float = 1.0,
+    ) -> None:
+        if batch_size < 1:
+            raise ValueError("Batch size should be a positive number")
+        self.notifier = notifier
+        self.batch_size = batch_size
+        self.batch_interval = batch_interval
+        driver = getattr(notifier, "__self__", None)
+        if isinstance(driver, base.Driver):
+            self._notify_batch: Callable[[list[dict[str, Any]]], None] = (
+                driver.notify_batch
+            )
+        else:
+            self._notify_batch = self._notify_each
+        self._buffer: list[dict[str, Any]] = []
+        self._buffer_started = 0.0
+        self._lock = threading.Lock()
+        self._stats_name = _notifier_name(notifier)
+        atexit.register(self.flush)
+        utils.register_at_fork(self._after_fork)
+
+    def _after_fork(self) -> None:
+        # NOTE: The buffered payloads are sent by the parent.
+        self._buffer = []
+        self._lock = threading.Lock()
+
+    def __call__(self, info: dict[str, Any], context: Any = None) -> None:
+        now = time.monotonic()
+        with self._lock:
+            if not self._buffer:
+                self._buffer_started = now
+            self._buffer.append(info)
+            if (
+                len(self._buffer) < self.batch_size
+                and now - self._buffer_started < self.batch_interval
+            ):
+                return
+            batch, self._buffer = self._buffer, []
+        self._send(batch)
+
+    def _notify_each(self, events: list[dict[str, Any]]) -> None:
+        for info in events:
+            self.notifier(info)
+
+    def _send(self, batch: list[dict[str, Any]]) -> None:
+        started = time.perf_counter()
+        try:
+            self._notify_batch(batch)
+        except Exception:
+            LOG.exception(
+                "Failed to send a batch of %d osprofiler notifications",
+                len(batch),
+            )
+            stats.incr(f"notify_errors.{self._stats_name}")
+            stats.incr("events_dropped.notify_error", len(batch))
+        else:
+            stats.observe(
+                f"notify_latency.{self._stats_name}",
+                time.perf_counter() - started,
+            )
+
+    def flush(self, timeout: float | None = None) -> bool:
+        """Send all buffered payloads.
+
+        :param timeout: unused, present for compatibility with other
+                        buffering notifiers
+        :returns: True
+        """
+        with self._lock:
+            batch, self._buffer = self._buffer, []
+        if batch:
+            self._send(batch)
+        return True
+
+
+class _TraceBuffer:
+    """Events of one trace buffered by TailSamplingNotifier."""
+
+    def __init__(self, started: float) -> None:
+        self.started = started
+        self.events: list[dict[str, Any]] = []
+        # NOTE: builtins.set, set() is shadowed by this module's set().
+        self.open_spans: builtins.set[str] = builtins.set()
+        self.keep = False
+
+
+#: Info key that makes TailSamplingNotifier keep a trace, e.g.
+#: profiler.start("audit", info={notifier.FORCE_SAMPLE: True}).
+FORCE_SAMPLE = "force_sample"
+
+
+class TailSamplingNotifier:
+    """Notifier that only sends traces that are slow or failed.
+
+    Payloads are buffered in memory per trace (base_id). When all trace
+    points that this process started for a trace are stopped, the trace is
+    sent to the wrapped notifier if it took at least ``min_duration``
+    seconds, if a stop payload reports an error (``etype``), or if a payload
+    has a true ``force_sample`` info flag. Otherwise the buffered payloads
+    are dropped. Span records (see profiler.set_notification_format()) are
+    handled the same way, the trace is finished with the record flagged as
+    ``local_root``.
+
+    >>  _notifier = notifier.create("redis://127.0.0.1:6379", ...)
+    >>  notifier.set(notifier.TailSamplingNotifier(_notifier, 0.5))
+
+    Memory is bounded: a trace with more than ``max_trace_events`` payloads
+    is kept (its buffer is sent and later payloads are passed through), and
+    while ``max_events`` payloads are buffered in total, new traces are
+    dropped. Traces not finished after ``trace_timeout`` seconds are
+    dropped.
+
+    :param notifier: notifier callable the kept traces are delivered to
+    :param min_duration: duration in seconds from which a trace is kept
+    :param max_trace_events: maximum number of buffered payloads per trace
+    :param max_events: maximum number of buffered payloads in total
+    :param trace_timeout: maximum age in seconds of a buffered trace
+    """
+
+    def __init__(
+        self,
+        notifier: Callable[..., None],
+        min_duration: float = 1.0,
+        max_trace_events: int = 1000,
+        max_events: int = 100000,
+        trace_timeout: float = 300.0,
+    ) -> None:
+        self.notifier = notifier
+        self.min_duration = min_duration
+        self.max_trace_events = max_trace_events
+        self.max_events = max_events
+        self.trace_timeout = trace_timeout
+        #: Number of traces sent to the wrapped notifier.
+        self.kept = 0
+        #: Number of traces dropped.
+        self.dropped = 0
+        #: Number of payloads dropped because max_events was reached.
+        self.overflowed = 0
+        self._traces: collections.OrderedDict[str, _TraceBuffer] = (
+            collections.OrderedDict()
+        )
+        self._buffered = 0
+        self._lock = threading.Lock()
+        self._accepts_records = _accepts_records(notifier)
+        utils.register_at_fork(self._after_fork)
+
+    def _after_fork(self) -> None:
+        # NOTE: The buffered traces are finished by the parent.
+        self._traces = collections.OrderedDict()
+        self._buffered = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, info: dict[str, Any], context: Any = None) -> None:
+        to_send = self._add(info, time.monotonic())
+        for event in to_send:
+            if isinstance(event, records.TraceRecord):
+                if self._accepts_records:
+                    event.resolve()
+                else:
+                    event = event.copy()
+            self.notifier(event)
+
+    def _add(self, info: dict[str, Any], now: float) -> list[dict[str, Any]]:
+        base_id = info.get("base_id")
+        name = info.get("name", "")
+        if base_id is None:
+            return [info]
+        with self._lock:
+            trace = self._traces.get(base_id)
+            if trace is None:
+                self._expire(now)
+                if self._buffered >= self.max_events:
+                    self.overflowed += 1
+                    stats.incr("events_dropped.tail_sampling_overflow")
+                    return []
+                trace = self._traces[base_id] = _TraceBuffer(now)
+
+            # NOTE: Span records (<name>-span) are only sent when trace
+            #       points stop, the trace is finished with the record of
+            #       the first trace point started by this process.
+            local_root = None
+            if name.endswith("-start"):
+                trace.open_spans.add(info.get("trace_id", ""))
+            elif name.endswith("-stop"):
+                trace.open_spans.discard(info.get("trace_id", ""))
+            elif name.endswith("-span"):
+                local_root = bool(info.get("local_root"))
+            for key in ("info", "stop_info"):
+                event_info = info.get(key) or {}
+                if event_info.get("etype") or event_info.get(FORCE_SAMPLE):
+                    trace.keep = True
+
+            finished = not trace.open_spans and local_root is not False
+            if not trace.keep or finished:
+                trace.events.append(info)
+                self._buffered += 1
+            elif trace.events:
+                # NOTE: Already decided to keep it, no need to buffer.
+                return self._release(base_id, trace, finished) + [info]
+            else:
+                return [info]
+
+            if finished:
+                if local_root:
+                    duration = info.get("duration_ns", 0) / 1e9
+                else:
+                    duration = now - trace.started
+                if duration >= self.min_duration:
+                    trace.keep = True
+                return self._release(base_id, trace, True)
+            if len(trace.events) >= self.max_trace_events:
+                trace.keep = True
+                return self._release(base_id, trace, False)
+            return []
+
+    def _release(
+        self, base_id: str, trace: _TraceBuffer, finished: bool
+    ) -> list[dict[str, Any]]:
+        events, trace.events = trace.events, []
+        self._buffered -= len(events)
+        if finished:
+            del self._traces[base_id]
+            if trace.keep:
+                self.kept += 1
+            else:
+                self.dropped += 1
+        if trace.keep:
+            return events
+        stats.incr("events_dropped.tail_sampling", len(events))
+        return []
+
+    def _expire(self, now: float) -> None:
+        while self._traces:
+            base_id, trace = next(iter(self._traces.items()))
+            if now - trace.started < self.trace_timeout:
+                return
+            self._release(base_id, trace, True)
+
+    def flush(self, timeout: float | None = None) -> bool:
+        """Flush the wrapped notifier.
+
+        Unfinished traces stay buffered, as the decision to keep them can't
+        be taken yet.
+        """
+        _flush = getattr(self.notifier, "flush", None)
+        if _flush is None:
+            return True
+        return bool(_flush(timeout))
+
+
+def flush(timeout: float | None = None) -> bool:
+    """Wait until the current notifier has delivered buffered payloads.
+
+    Does nothing (and returns True) if the notifier doesn't buffer.
+
+    :param timeout: maximum number of seconds to wait, None means forever
+    :returns: True if everything was delivered, False on timeout
+    """
+    _flush = getattr(__notifier, "flush", None)
+    if _flush is None:
+        return True
+    return bool(_flush(timeout))
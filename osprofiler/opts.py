@@ -185,6 +185,388 @@ Possible values:
 """,
 )
 
+_async_notification_opt = cfg.BoolOpt(
+    "async_notification",
+    default=False,
+    help="""
+Send trace points to the storage backend from background threads.
+
+When enabled, notifications are put into a bounded in-process queue and
+delivered by worker threads, so requests don't wait for the backend.
+
+Default value is False.
+
+Possible values:
+
+* True: Enables asynchronous notifications.
+* False: Notifications are sent synchronously by the traced code.
+""",
+)
+
+_async_queue_size_opt = cfg.IntOpt(
+    "async_queue_size",
+    default=10000,
+    min=0,
+    help="""
+Maximum number of notifications waiting for delivery when
+``async_notification`` is enabled. 0 means unbounded.
+""",
+)
+
+_async_workers_opt = cfg.IntOpt(
+    "async_workers",
+    default=1,
+    min=1,
+    help="""
+Number of background threads delivering notifications when
+``async_notification`` is enabled.
+""",
+)
+
+_async_overflow_policy_opt = cfg.StrOpt(
+    "async_overflow_policy",
+    default="drop_newest",
+    choices=[
+        ("drop_newest", "Discard the notification that doesn't fit."),
+        ("drop_oldest", "Discard the oldest queued notification."),
+        ("block", "Wait until there is room in the queue."),
+    ],
+    help="""
+What to do with a notification when the asynchronous queue is full.
+""",
+)
+
+_notification_batch_size_opt = cfg.IntOpt(
+    "notification_batch_size",
+    default=1,
+    min=1,
+    help="""
+Maximum number of notifications sent to the storage backend with one bulk
+write. Notifications are coalesced until this many are buffered or the oldest
+one is ``notification_batch_interval`` seconds old.
+
+Default value is 1 (every notification is sent on its own).
+""",
+)
+
+_notification_batch_interval_opt = cfg.FloatOpt(
+    "notification_batch_interval",
+    default=1.0,
+    min=0,
+    help="""
+Maximum time in seconds a notification is buffered when
+``notification_batch_size`` is greater than 1.
+""",
+)
+
+_sampling_rate_opt = cfg.FloatOpt(
+    "sampling_rate",
+    default=1.0,
+    min=0,
+    max=1,
+    help="""
+Probability of recording a trace started on this node.
+
+The sampling decision is taken once, where the trace starts, and is carried
+to the other services in the signed trace headers, so that a trace is either
+recorded by all services or by none of them.
+
+Default value is 1.0 (every trace is recorded).
+""",
+)
+
+_sampling_max_per_second_opt = cfg.FloatOpt(
+    "sampling_max_per_second",
+    default=0,
+    min=0,
+    help="""
+Maximum number of traces started on this node that are recorded per second.
+
+Default value is 0 (no limit).
+""",
+)
+
+_sampling_path_rates_opt = cfg.DictOpt(
+    "sampling_path_rates",
+    default={},
+    help="""
+Sampling rates of traces started by requests to specific paths, overriding
+``sampling_rate``. Keys are shell-style wildcard patterns, the first matching
+pattern is used.
+
+Example: ``sampling_path_rates = /healthcheck*:0,/v2.1/servers*:0.1``
+""",
+)
+
+_tail_sampling_opt = cfg.BoolOpt(
+    "tail_sampling",
+    default=False,
+    help="""
+Only send traces that are slow or failed.
+
+When enabled, trace points are buffered in memory per trace until all trace
+points started by this service for the trace are stopped. The trace is then
+sent if it lasted at least ``tail_sampling_min_duration`` seconds, if it
+recorded an error, or if a trace point has a true ``force_sample`` info flag.
+Otherwise it is dropped.
+
+Default value is False.
+""",
+)
+
+_tail_sampling_min_duration_opt = cfg.FloatOpt(
+    "tail_sampling_min_duration",
+    default=1.0,
+    min=0,
+    help="""
+Duration in seconds from which a trace is kept when ``tail_sampling`` is
+enabled.
+""",
+)
+
+_tail_sampling_max_trace_events_opt = cfg.IntOpt(
+    "tail_sampling_max_trace_events",
+    default=1000,
+    min=1,
+    help="""
+Maximum number of trace points buffered per trace when ``tail_sampling`` is
+enabled. Larger traces are kept.
+""",
+)
+
+_tail_sampling_max_events_opt = cfg.IntOpt(
+    "tail_sampling_max_events",
+    default=100000,
+    min=1,
+    help="""
+Maximum number of trace points buffered in total when ``tail_sampling`` is
+enabled. While the limit is reached, new traces are dropped.
+""",
+)
+
+_id_generator_opt = cfg.StrOpt(
+    "id_generator",
+    default="uuid",
+    choices=[
+        ("uuid", "Random uuid4 ids."),
+        (
+            "fast",
+            "Uuid formatted ids made of a random per process prefix and a "
+            "random 64-bit suffix, several times cheaper to generate.",
+        ),
+    ],
+    help="""
+How ids of traces and trace points started on this node are generated.
+
+Both generators produce unique ids in the uuid format, so nodes using
+different generators can be part of the same trace.
+""",
+)
+
+_notification_format_opt = cfg.StrOpt(
+    "notification_format",
+    default="events",
+    choices=[
+        (
+            "events",
+            "A <name>-start notification when a trace point starts and a "
+            "<name>-stop one when it stops.",
+        ),
+        (
+            "spans",
+            "A single <name>-span record with the start time, duration and "
+            "info of the trace point, sent when it stops.",
+        ),
+    ],
+    help="""
+How trace points are sent to the notifier.
+
+``spans`` halves the number of notifications and of stored documents. All
+drivers report traces made of both formats, but traces sent as span records
+can't be read by older releases.
+""",
+)
+
+_capture_max_length_opt = cfg.IntOpt(
+    "capture_max_length",
+    default=1000,
+    min=1,
+    help="""
+Maximum length of the arguments, keyword arguments and result of traced
+functions recorded in trace points (see ``hide_args`` and ``hide_result``
+of ``profiler.trace()``). Longer texts are truncated.
+""",
+)
+
+_capture_max_depth_opt = cfg.IntOpt(
+    "capture_max_depth",
+    default=5,
+    min=1,
+    help="""
+Maximum nesting level of the containers recorded in the arguments and result
+of traced functions. The arguments tuple is the first level.
+""",
+)
+
+_capture_max_items_opt = cfg.IntOpt(
+    "capture_max_items",
+    default=50,
+    min=1,
+    help="""
+Maximum number of items recorded per container in the arguments and result
+of traced functions.
+""",
+)
+
+_trace_max_spans_opt = cfg.IntOpt(
+    "trace_max_spans",
+    default=0,
+    min=0,
+    help="""
+Maximum number of trace points recorded by a request in this service, 0 for
+no limit. Further trace points are counted but not sent, and a ``truncated``
+trace point reports how many were left out.
+
+This protects the storage backend from runaway requests, e.g. one issuing
+thousands of SQL statements.
+""",
+)
+
+_trace_max_bytes_opt = cfg.IntOpt(
+    "trace_max_bytes",
+    default=0,
+    min=0,
+    help="""
+Maximum size, in characters, of the info of the trace points recorded by a
+request in this service, 0 for no limit. Once reached, further trace points
+are counted but not sent.
+""",
+)
+
+_trace_max_depth_opt = cfg.IntOpt(
+    "trace_max_depth",
+    default=0,
+    min=0,
+    help="""
+Maximum nesting level of the trace points recorded by a request in this
+service, 0 for no limit. Deeper trace points are counted but not sent.
+""",
+)
+
+_aggregate_min_calls_opt = cfg.IntOpt(
+    "aggregate_min_calls",
+    default=0,
+    min=0,
+    help="""
+Number of calls of a traced function recorded under the same parent trace
+point before its calls are aggregated, 0 to never aggregate them.
+
+Calls of a function that is both called more than this under a parent trace
+point and faster on average than ``aggregate_max_duration`` are only counted
+and timed: a single trace point, marked as aggregated in the reports, is sent
+with their number and total duration when the parent trace point stops.
+""",
+)
+
+_aggregate_max_duration_opt = cfg.FloatOpt(
+    "aggregate_max_duration",
+    default=0.0001,
+    min=0,
+    help="""
+Average duration, in seconds, under which the calls of a traced function may
+be aggregated. See ``aggregate_min_calls``.
+""",
+)
+
+_resource_usage_opt = cfg.BoolOpt(
+    "resource_usage",
+    default=False,
+    help="""
+Record the CPU time and the context switches of the thread during each trace
+point, and the part of the CPU time not spent in its child trace points.
+Reports show them next to the durations: a trace point much longer than its
+CPU time was blocked, e.g. on I/O, a lock or the GIL, rather than computing.
+
+Per-thread user and system CPU times and context switches are only available
+on Linux.
+""",
+)
+
+_memory_tracking_opt = cfg.BoolOpt(
+    "memory_tracking",
+    default=False,
+    help="""
+Record, with tracemalloc, the memory allocated during each trace point and
+its peak. Reports show them next to the durations. tracemalloc slows down
+every memory allocation of the process and traces the whole process, so the
+allocations of concurrent requests are counted too, and the peaks are only
+reliable when requests are handled one at a time: enable it to track down
+memory spikes rather than permanently.
+""",
+)
+
+_memory_top_sites_opt = cfg.IntOpt(
+    "memory_top_sites",
+    default=0,
+    min=0,
+    help="""
+Number of source lines allocating the most memory recorded for the outermost
+trace point of each sampled trace in this service, e.g. the request, when
+``memory_tracking`` is enabled. 0 to not record them. Each trace then takes
+two snapshots of the allocated memory, which is slow with many objects.
+""",
+)
+
+_trace_gc_opt = cfg.BoolOpt(
+    "trace_gc",
+    default=False,
+    help="""
+Record the garbage collections that happen during a trace, as ``gc`` trace
+points with their generation, duration and number of collected objects,
+children of the trace point running in each traced thread. Reports total the
+time spent in garbage collections per trace, to tell GC pauses from slow
+code.
+""",
+)
+
+_stack_sampling_interval_opt = cfg.FloatOpt(
+    "stack_sampling_interval",
+    default=0,
+    min=0,
+    help="""
+Seconds between two samples of the stacks of the threads running a sampled
+trace, 0 to disable the stack sampler. The samples are counted per trace
+point, and sent in its stop info as collapsed stacks, to show where the code
+that isn't traced spends the time. E.g. 0.01 for 100 samples per second.
+""",
+)
+
+_stack_sampling_max_overhead_opt = cfg.FloatOpt(
+    "stack_sampling_max_overhead",
+    default=0.01,
+    min=0,
+    max=1,
+    help="""
+Maximum share of the time the stack sampler may spend taking samples, the
+interval between samples grows when they are too expensive. 0 for no limit.
+""",
+)
+
+_disabled_trace_points_opt = cfg.ListOpt(
+    "disabled_trace_points",
+    default=[],
+    mutable=True,
+    help="""
+Trace points not recorded, by name (e.g. ``db``), qualified function name
+(e.g. ``nova.compute.manager.ComputeManager.build_and_run_instance``) or
+shell-style pattern of them (e.g. ``nova.db.*``). Children of a disabled
+trace point are attached to its parent.
+
+This option is re-read when the configuration files are reloaded, e.g. on
+SIGHUP, so expensive trace points can be turned off without a restart.
+""",
+)
+
 _PROFILER_OPTS: list[cfg.Opt] = [
     _enabled_opt,
     _trace_sqlalchemy_opt,
@@ -197,6 +579,36 @@ _PROFILER_OPTS: list[cfg.Opt] = [
     _socket_timeout_opt,
     _sentinel_service_name_opt,
     _filter_error_trace,
+    _async_notification_opt,
+    _async_queue_size_opt,
+    _async_workers_opt,
+    _async_overflow_policy_opt,
+    _notification_batch_size_opt,
+    _notification_batch_interval_opt,
+    _sampling_rate_opt,
+    _sampling_max_per_second_opt,
+    _sampling_path_rates_opt,
+    _tail_sampling_opt,
+    _tail_sampling_min_duration_opt,
+    _tail_sampling_max_trace_events_opt,
+    _tail_sampling_max_events_opt,
+    _id_generator_opt,
+    _notification_format_opt,
+    _capture_max_length_opt,
+    _capture_max_depth_opt,
+    _capture_max_items_opt,
+    _trace_max_spans_opt,
+    _trace_max_bytes_opt,
+    _trace_max_depth_opt,
+    _aggregate_min_calls_opt,
+    _aggregate_max_duration_opt,
+    _resource_usage_opt,
+    _memory_tracking_opt,
+    _memory_top_sites_opt,
+    _trace_gc_opt,
+    _stack_sampling_interval_opt,
+    _stack_sampling_max_overhead_opt,
+    _disabled_trace_points_opt,
 ]
 
 cfg.CONF.register_opts(_PROFILER_OPTS, group=_profiler_opt_group)
@@ -13,21 +13,44 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+from __future__ import annotations
+
 import collections
-from collections.abc import Callable
+from collections.abc import Callable, Iterator, Mapping
+from concurrent import futures
+import contextlib
+import contextvars
+import copy
 import functools
 import inspect
 import socket
+import sys
 import threading
+import time
+import tracemalloc
 import types
-from typing import Any, ParamSpec, TypeVar, cast
+from typing import Any, ParamSpec, TypeVar, TYPE_CHECKING, cast
+
+if TYPE_CHECKING:
+    import asyncio
+
+try:
+    import resource
+except ImportError:
+    resource = None  # type: ignore[assignment]
 
 from oslo_utils import reflection
-from oslo_utils import timeutils
 from oslo_utils import uuidutils
 
 from osprofiler import _utils as utils
+from osprofiler import capture
+from osprofiler import gctrace
 from osprofiler import notifier
+from osprofiler import records
+from osprofiler import sampling
+from osprofiler import stacksampler
+from osprofiler import stats
+from osprofiler import tracepoints
 
 
 P = ParamSpec("P")
@@ -35,11 +58,340 @@ R = TypeVar("R")
 T = TypeVar("T", bound=type)
 
 # NOTE(boris-42): Thread safe storage for profiler instances.
-__local_ctx = threading.local()
+# NOTE: A context variable rather than a thread local, so that the profiler
+#       follows the execution context into asyncio tasks and into work
+#       submitted with submit()/run_in_executor().
+__local_ctx: contextvars.ContextVar[_Profiler | None] = contextvars.ContextVar(
+    "osprofiler_profiler", default=None
+)
+# NOTE: Bound once, traced functions look the profiler up on every call.
+_get_profiler = __local_ctx.get
+
+
+def _get_owner() -> tuple[int, Any]:
+    """Returns the identity of the current thread and asyncio task."""
+    task = None
+    asyncio = sys.modules.get("asyncio")
+    if asyncio is not None and asyncio._get_running_loop() is not None:
+        task = asyncio.current_task()
+    return threading.get_ident(), task
 
 
 def clean() -> None:
-    __local_ctx.profiler = None
+    __local_ctx.set(None)
+
+
+def _generate_uuid() -> str:
+    return str(uuidutils.generate_uuid())
+
+
+#: Trace point id generators, selected with set_id_generator().
+ID_GENERATORS: dict[str, Callable[[], str]] = {
+    "uuid": _generate_uuid,
+    "fast": utils.generate_span_id,
+}
+
+_generate_id: Callable[[], str] = _generate_uuid
+
+
+#: Notification formats, selected with set_notification_format().
+NOTIFICATION_FORMATS = ("events", "spans")
+
+_span_records = False
+
+
+def set_notification_format(name: str) -> None:
+    """Select how trace points are sent to the notifier.
+
+    :param name: "events" - a <name>-start notification when the trace point
+                 starts and a <name>-stop one when it stops (default),
+                 "spans" - a single <name>-span record when the trace point
+                 stops, with its start time, duration, start info and stop
+                 info.
+    """
+    global _span_records
+    if name not in NOTIFICATION_FORMATS:
+        raise ValueError(
+            f"Unknown notification format '{name}', expected one of: "
+            f"{', '.join(NOTIFICATION_FORMATS)}"
+        )
+    _span_records = name == "spans"
+
+
+def set_id_generator(name: str) -> None:
+    """Select how ids of new traces and trace points are generated.
+
+    :param name: "uuid" - random uuid4 (default), "fast" - uuid formatted
+                 ids made of a random per process prefix and a cheap random
+                 64-bit suffix, see osprofiler._utils.generate_span_id()
+    """
+    global _generate_id
+    try:
+        _generate_id = ID_GENERATORS[name]
+    except KeyError:
+        raise ValueError(
+            f"Unknown id generator '{name}', expected one of: "
+            f"{', '.join(ID_GENERATORS)}"
+        )
+
+
+_aggregate_min_calls = 0
+_aggregate_max_duration_ns = 0
+
+
+def set_aggregation(min_calls: int = 0, max_duration: float = 0.0001) -> None:
+    """Aggregate the calls of traced functions that are too hot.
+
+    When a function traced with trace(), trace_cls() or TracedMeta is called
+    more than min_calls times as the child of the same trace point while
+    the moving average of its duration is below max_duration, its next
+    calls are not sent as trace points. They are counted and timed, and a
+    single trace point with an "aggregated" info (number of calls, total
+    duration and errors) is sent when the parent trace point stops. The
+    trace points started by the aggregated calls aren't sent.
+
+    :param min_calls: number of calls per parent trace point recorded
+                      before aggregating, 0 disables the aggregation
+    :param max_duration: average duration in seconds under which calls are
+                         aggregated
+    """
+    global _aggregate_min_calls, _aggregate_max_duration_ns
+    if min_calls < 0 or max_duration < 0:
+        raise ValueError("min_calls and max_duration should not be negative")
+    _aggregate_min_calls = min_calls
+    _aggregate_max_duration_ns = int(max_duration * 1e9)
+
+
+class _Aggregate:
+    """Calls of a traced function aggregated under a parent trace point."""
+
+    __slots__ = ("calls", "count", "started_ns", "duration_ns", "errors")
+
+    def __init__(self) -> None:
+        #: Calls under the parent, recorded or aggregated.
+        self.calls = 0
+        self.count = 0
+        self.started_ns = 0
+        self.duration_ns = 0
+        self.errors: dict[str, int] = {}
+
+    def add(
+        self,
+        trace_point: tracepoints.TracePoint,
+        duration_ns: int,
+        error: Exception | None,
+    ) -> None:
+        if not self.count:
+            self.started_ns = utils.timestamp_ns() - duration_ns
+        self.count += 1
+        self.duration_ns += duration_ns
+        if error is not None:
+            etype = reflection.get_class_name(error)
+            self.errors[etype] = self.errors.get(etype, 0) + 1
+        trace_point.observe(duration_ns)
+
+
+def _aggregate(trace_point: tracepoints.TracePoint) -> _Aggregate | None:
+    """Returns where to add a call of a trace point if it is aggregated."""
+    profiler = get()
+    if profiler is None:
+        return None
+    return profiler._aggregate(trace_point)
+
+
+_resource_usage = False
+# NOTE: Per-thread resource usage is only available on Linux.
+_RUSAGE_THREAD: int | None = getattr(resource, "RUSAGE_THREAD", None)
+
+
+def set_resource_usage(enabled: bool) -> None:
+    """Record the resources used by the thread during each trace point.
+
+    The stop info of the trace points gets a "cpu" dict: the CPU time of the
+    thread ("cpu_ns"), the part of it not spent in child trace points of the
+    same thread ("self_cpu_ns") and, on Linux, the user and system CPU time
+    ("user_ns", "sys_ns") and the context switches ("voluntary_switches",
+    "involuntary_switches"). A trace point with a wall-clock duration much
+    longer than its CPU time was blocked: on I/O, on a lock or on the GIL.
+
+    :param enabled: True to record the resource usage
+    """
+    global _resource_usage
+    _resource_usage = enabled
+
+
+def _resource_usage_sample() -> list[int]:
+    """Returns the resource usage counters of the current thread."""
+    # NOTE: The last item sums the CPU time of the child trace points.
+    if _RUSAGE_THREAD is None:
+        return [time.thread_time_ns(), 0]
+    usage = resource.getrusage(_RUSAGE_THREAD)
+    return [
+        time.thread_time_ns(),
+        round(usage.ru_utime * 1e9),
+        round(usage.ru_stime * 1e9),
+        usage.ru_nvcsw,
+        usage.ru_nivcsw,
+        0,
+    ]
+
+
+def _resource_usage_info(sample: list[int]) -> dict[str, int]:
+    """Returns the resources used since a sample was taken."""
+    current = _resource_usage_sample()
+    cpu_ns = current[0] - sample[0]
+    info = {"cpu_ns": cpu_ns, "self_cpu_ns": cpu_ns - sample[-1]}
+    if len(sample) > 2:
+        info["user_ns"] = current[1] - sample[1]
+        info["sys_ns"] = current[2] - sample[2]
+        info["voluntary_switches"] = current[3] - sample[3]
+        info["involuntary_switches"] = current[4] - sample[4]
+    return info
+
+
+_memory_tracking = False
+_memory_top_sites = 0
+# NOTE: True when set_memory_tracking() started tracemalloc.
+_tracemalloc_started = False
+
+
+def set_memory_tracking(enabled: bool, top_sites: int = 0) -> None:
+    """Record the memory allocated during each trace point.
+
+    Uses tracemalloc, which is started if it isn't tracing yet. The stop info
+    of the trace points gets a "memory" dict: the bytes allocated and not
+    freed ("allocated", negative when more was freed) and the highest
+    allocated memory above the one at the start ("process_peak").
+    tracemalloc traces the whole process, so allocations of concurrent
+    requests are counted too. Its peak is also a single one for the whole
+    process, reset by each trace point that starts: with concurrent
+    requests, the process_peak of a trace point may miss the peak reached
+    before another trace point started, so it's only reliable when
+    requests are handled one at a time.
+
+    :param enabled: True to record the memory allocations
+    :param top_sites: number of lines allocating the most memory recorded
+                      in the "top_sites" of the memory info of the outermost
+                      trace point of a trace in this process, 0 to not
+                      record them. Each of these trace points takes two
+                      snapshots of the allocated memory, which is slow with
+                      many allocated objects.
+    """
+    global _memory_tracking, _memory_top_sites, _tracemalloc_started
+    if top_sites < 0:
+        raise ValueError(f"top_sites should not be negative: {top_sites}")
+    if enabled and not tracemalloc.is_tracing():
+        tracemalloc.start()
+        _tracemalloc_started = True
+    elif not enabled and _tracemalloc_started:
+        tracemalloc.stop()
+        _tracemalloc_started = False
+    _memory_tracking = enabled
+    _memory_top_sites = top_sites if enabled else 0
+
+
+def _memory_sample(parent: list[int] | None) -> list[int]:
+    """Returns the current traced memory and resets the peak."""
+    current, peak = tracemalloc.get_traced_memory()
+    if parent is not None:
+        # NOTE: The peak is reset for the new trace point, its parent keeps
+        #       the one reached so far.
+        parent[1] = max(parent[1], peak)
+    tracemalloc.reset_peak()
+    return [current, current]
+
+
+def _memory_info(
+    sample: list[int], parent: list[int] | None
+) -> dict[str, Any]:
+    """Returns the memory allocated since a sample was taken."""
+    current, peak = tracemalloc.get_traced_memory()
+    peak = max(sample[1], peak)
+    if parent is not None:
+        parent[1] = max(parent[1], peak)
+    tracemalloc.reset_peak()
+    return {
+        "allocated": current - sample[0],
+        "process_peak": peak - sample[0],
+    }
+
+
+def _top_sites(
+    start: tracemalloc.Snapshot, limit: int
+) -> list[dict[str, Any]]:
+    """Returns the lines that allocated the most since a snapshot."""
+    snapshot = tracemalloc.take_snapshot().filter_traces(
+        [tracemalloc.Filter(False, tracemalloc.__file__)]
+    )
+    sites: list[dict[str, Any]] = []
+    for stat in snapshot.compare_to(start, "lineno"):
+        if stat.size_diff <= 0:
+            continue
+        frame = stat.traceback[0]
+        sites.append(
+            {
+                "site": f"{frame.filename}:{frame.lineno}",
+                "size": stat.size_diff,
+                "count": stat.count_diff,
+            }
+        )
+    sites.sort(key=lambda site: site["size"], reverse=True)
+    return sites[:limit]
+
+
+_max_spans = 0
+_max_bytes = 0
+_max_depth = 0
+
+#: Maximum number of events recorded by add_event() in a trace point.
+MAX_EVENTS = 128
+
+
+def set_trace_limits(
+    max_spans: int = 0, max_bytes: int = 0, max_depth: int = 0
+) -> None:
+    """Bound the number and size of the trace points of a trace.
+
+    Limits apply to the trace points recorded by a profiler, i.e. to the
+    part of a trace done by a request in this process. Past a limit, new
+    trace points are counted but not sent (nor their children), and a
+    "truncated" trace point with the number of trace points left out per
+    limit is sent as a child of the outermost one when it stops.
+
+    :param max_spans: maximum number of trace points, 0 for no limit
+    :param max_bytes: maximum size of the info of the trace points, new
+                      trace points aren't sent once it is reached, 0 for no
+                      limit. Measuring it formats the captured arguments and
+                      results in the traced thread.
+    :param max_depth: maximum nesting level of trace points, the outermost
+                      one being the first level, 0 for no limit
+    """
+    global _max_spans, _max_bytes, _max_depth
+    for name, value in (
+        ("max_spans", max_spans),
+        ("max_bytes", max_bytes),
+        ("max_depth", max_depth),
+    ):
+        if value < 0:
+            raise ValueError(f"{name} should not be negative")
+    _max_spans, _max_bytes, _max_depth = max_spans, max_bytes, max_depth
+
+
+def _info_size(info: dict[str, Any]) -> int:
+    size = 0
+    for key, value in info.items():
+        size += len(key)
+        if isinstance(value, dict):
+            size += _info_size(value)
+        else:
+            size += len(str(value))
+    return size
+
+
+def _is_recording() -> bool:
+    """Returns True if trace points of the current context are sent."""
+    profiler = _get_profiler()
+    return profiler is not None and profiler.sampled is not False
 
 
 def _ensure_no_multiple_traced(
@@ -59,7 +411,8 @@ def init(
     hmac_key: str,
     base_id: str | None = None,
     parent_id: str | None = None,
-) -> "_Profiler":
+    sampled: bool | None = None,
+) -> _Profiler:
     """Init profiler instance for current thread.
 
     You should call profiler.init() before using osprofiler.
@@ -68,21 +421,74 @@ def init(
     :param hmac_key: secret key to sign trace information.
     :param base_id: Used to bind all related traces.
     :param parent_id: Used to build tree of traces.
+    :param sampled: Sampling decision of the trace. If None, the decision is
+                    taken by the configured sampler (see
+                    osprofiler.sampling), if any. Trace points of a trace
+                    that is not sampled are not sent, but the decision is
+                    still propagated to other services.
     :returns: Profiler instance
     """
-    if get() is None:
-        __local_ctx.profiler = _Profiler(
-            hmac_key, base_id=base_id, parent_id=parent_id
+    profiler = get()
+    if profiler is None:
+        if sampled is None:
+            sampled = sampling.should_sample()
+        profiler = _Profiler(
+            hmac_key, base_id=base_id, parent_id=parent_id, sampled=sampled
         )
-    return cast("_Profiler", __local_ctx.profiler)
+        __local_ctx.set(profiler)
+    return profiler
 
 
-def get() -> "_Profiler | None":
+def get() -> _Profiler | None:
     """Get profiler instance.
 
+    A profiler inherited from another thread or asyncio task (e.g. by an
+    asyncio task spawned from a traced one) is copied on first use, so that
+    every concurrent task has its own stack of trace points.
+
     :returns: Profiler instance or None if profiler wasn't inited.
     """
-    return getattr(__local_ctx, "profiler", None)
+    profiler = __local_ctx.get()
+    if profiler is not None:
+        owner = _get_owner()
+        if profiler._owner != owner:
+            profiler = profiler._fork(owner)
+            __local_ctx.set(profiler)
+    return profiler
+
+
+def submit(
+    executor: futures.Executor,
+    fn: Callable[..., R],
+    /,
+    *args: Any,
+    **kwargs: Any,
+) -> futures.Future[R]:
+    """Submit a callable to an executor preserving the trace context.
+
+    Same as executor.submit(fn, *args, **kwargs), but trace points created
+    by fn are children of the current trace point.
+    """
+    ctx = contextvars.copy_context()
+    return executor.submit(ctx.run, fn, *args, **kwargs)
+
+
+def run_in_executor(
+    loop: asyncio.AbstractEventLoop,
+    executor: futures.Executor | None,
+    fn: Callable[..., R],
+    /,
+    *args: Any,
+) -> asyncio.Future[R]:
+    """Run a callable in an executor from asyncio preserving trace context.
+
+    Same as loop.run_in_executor(executor, fn, *args), but trace points
+    created by fn are children of the current trace point.
+    """
+    ctx = contextvars.copy_context()
+    return loop.run_in_executor(
+        executor, functools.partial(ctx.run, fn, *args)
+    )
 
 
 def start(name: str, info: dict[str, Any] | None = None) -> None:
@@ -104,6 +510,128 @@ def stop(info: dict[str, Any] | None = None) -> None:
         profiler.stop(info=info)
 
 
+def add_event(name: str, attrs: dict[str, Any] | None = None) -> None:
+    """Records an event in the current trace point.
+
+    Cheaper than a child trace point for a mark such as "lock acquired" or
+    "retry": the timestamped events are sent in the "events" list of the
+    stop info of the trace point.
+
+    :param name: name of the event
+    :param attrs: dictionary with extra information about the event
+    """
+    profiler = get()
+    if profiler:
+        profiler.add_event(name, attrs)
+
+
+def add_counter(name: str, value: float = 1) -> None:
+    """Adds a value to a counter of the current trace point.
+
+    The counters, e.g. "bytes_sent" or "retries", are summed per trace point
+    and sent in the "counters" dict of its stop info.
+
+    :param name: name of the counter
+    :param value: value added to the counter
+    """
+    profiler = get()
+    if profiler:
+        profiler.add_counter(name, value)
+
+
+def start_span(
+    name: str,
+    info: dict[str, Any] | None = None,
+    parent: Span | None = None,
+) -> Span:
+    """Starts a trace point that is finished with its handle.
+
+    Unlike start() and stop(), the trace point isn't pushed on the stack of
+    the current thread: it can be finished from another thread or callback,
+    in any order, with Span.finish().
+
+    >>  span = profiler.start_span("volume_attach", info={"volume": vol})
+    >>  executor.submit(attach, vol, span)
+    >>  ...
+    >>  span.finish()  # e.g. in the thread running attach()
+
+    :param name: name of the trace point, e.g. "rpc"
+    :param info: dictionary with extra trace information
+    :param parent: Span the trace point is a child of, the current trace
+                   point of the thread by default
+    :returns: Span, that does nothing if no profiler is initialized
+    """
+    if parent is not None:
+        profiler = parent._profiler
+        parent_id = parent.trace_id
+        depth = parent._depth
+    else:
+        profiler = get()
+        parent_id = profiler.get_id() if profiler is not None else None
+        depth = len(profiler._name) if profiler is not None else 0
+    if profiler is None or parent_id is None:
+        return Span(None, name, None, None)
+    return profiler.start_span(name, info, parent_id, depth=depth)
+
+
+@contextlib.contextmanager
+def _activate(span: Span) -> Iterator[Span]:
+    if span._profiler is None or span.trace_id is None:
+        yield span
+        return
+    token = __local_ctx.set(span._profiler._fork_at(span))
+    try:
+        yield span
+    finally:
+        __local_ctx.reset(token)
+
+
+class _GeneratorTrace:
+    """Trace points of a suspended generator, kept off the trace stack.
+
+    The trace points a generator started are put back on the trace stack
+    of the current profiler when it is resumed in the with block, and taken
+    off when it yields, so they don't get the children of its consumer or
+    get stopped by it.
+    """
+
+    def __init__(self) -> None:
+        self._frames: list[list[Any]] = []
+        # NOTE: Id of the trace point the generator was first resumed in,
+        #       the parent of the trace points it started.
+        self._parent: str | None = None
+        self._profiler: _Profiler | None = None
+        self._depth: tuple[int, ...] = ()
+
+    def __enter__(self) -> None:
+        self._profiler = profiler = get()
+        if profiler is None:
+            return
+        self._depth = profiler._depth()
+        if self._parent is not None:
+            profiler._trace_stack.append(self._parent)
+        profiler._resume(self._frames)
+
+    def __exit__(self, *exc_info: Any) -> None:
+        profiler = self._profiler
+        if profiler is None:
+            return
+        self._frames = profiler._suspend(self._depth)
+        if self._parent is None:
+            self._parent = profiler.get_id()
+        else:
+            # NOTE: The parent put back on the trace stack by __enter__().
+            self._frames[1].pop(0)
+        self._profiler = None
+
+
+def _error_info(ex: Exception) -> dict[str, Any]:
+    return {
+        "etype": reflection.get_class_name(ex),
+        "message": str(ex),
+    }
+
+
 def trace(
     name: str,
     info: dict[str, Any] | None = None,
@@ -132,12 +660,15 @@ def trace(
                                  traced either allow the new trace to occur
                                  or raise a value error denoting that multiple
                                  tracing is not allowed (by default allow).
+
+    The trace point is registered in osprofiler.tracepoints, under its name
+    and the qualified name of the function, so it can be disabled at runtime.
+
+    Args and result are formatted with the size limits and the per type
+    formatters of the capture module, and only when the notification is
+    sent.
     """
-    if not info:
-        info = {}
-    else:
-        info = info.copy()
-    info["function"] = {}
+    info = dict(info or {})
 
     def decorator(f: Callable[P, R]) -> Callable[P, R]:
         trace_times = getattr(f, "__traced__", 0)
@@ -158,37 +689,209 @@ def trace(
             except AttributeError:  # nosec
                 pass
 
-        @functools.wraps(f)
-        def wrapper(*args: P.args, **kwargs: P.kwargs) -> R:
-            # NOTE(tovin07): Workaround for this issue
-            # F823 local variable 'info'
-            # (defined in enclosing scope on line xxx)
-            # referenced before assignment
-            info_ = info
-            if "name" not in info_["function"]:
-                # Get this once (as it should **not** be changing in
-                # subsequent calls).
-                info_["function"]["name"] = reflection.get_callable_name(f)
-
+        try:
+            func_name = reflection.get_callable_name(f)
+        except TypeError:
+            # NOTE: e.g. functions of code executed without a module name.
+            func_name = getattr(f, "__qualname__", repr(f))
+        trace_point = tracepoints.register(name, func_name)
+
+        def trace_start(args: tuple[Any, ...], kwargs: dict[str, Any]) -> None:
+            function_info: dict[str, Any] = {"name": func_name}
             if not hide_args:
-                info_["function"]["args"] = str(args)
-                info_["function"]["kwargs"] = str(kwargs)
+                function_info["args"] = capture.LazyRepr(args)
+                function_info["kwargs"] = capture.LazyRepr(kwargs)
+
+            # NOTE: Build a new info dict on every call, the shared one must
+            #       not be modified by concurrent calls.
+            start(name, info={**info, "function": function_info})
+
+        def result_info(result: Any) -> dict[str, Any] | None:
+            if hide_result:
+                return None
+            return {"function": {"result": capture.LazyRepr(result)}}
+
+        # NOTE: Coroutines, generators and async generators only start
+        #       running when they are awaited or iterated, so for them the
+        #       trace point covers the whole await or iteration instead of
+        #       the creation of the coroutine or generator object.
+        if inspect.iscoroutinefunction(f):
+
+            @functools.wraps(f)
+            async def async_wrapper(*args: P.args, **kwargs: P.kwargs) -> Any:
+                if not trace_point.enabled or not _is_recording():
+                    return await f(*args, **kwargs)
+                if _aggregate_min_calls:
+                    aggregate = _aggregate(trace_point)
+                    if aggregate is not None:
+                        error = None
+                        started = time.perf_counter_ns()
+                        try:
+                            return await f(*args, **kwargs)
+                        except Exception as ex:
+                            error = ex
+                            raise
+                        finally:
+                            duration = time.perf_counter_ns() - started
+                            aggregate.add(trace_point, duration, error)
+                stop_info: dict[str, Any] | None = None
+                started = 0
+                try:
+                    trace_start(args, kwargs)
+                    if _aggregate_min_calls:
+                        started = time.perf_counter_ns()
+                    result = await f(*args, **kwargs)
+                except Exception as ex:
+                    stop_info = _error_info(ex)
+                    raise
+                else:
+                    stop_info = result_info(result)
+                    return result
+                finally:
+                    if started:
+                        trace_point.observe(time.perf_counter_ns() - started)
+                    stop(info=stop_info)
+
+            return cast("Callable[P, R]", async_wrapper)
+
+        if inspect.isasyncgenfunction(f):
+
+            @functools.wraps(f)
+            async def async_gen_wrapper(
+                *args: P.args, **kwargs: P.kwargs
+            ) -> Any:
+                # NOTE: Async generators can't delegate with "yield from",
+                #       so asend(), athrow() and aclose() are forwarded by
+                #       hand, whether the call is traced or not.
+                traced = trace_point.enabled and _is_recording()
+                resumed: contextlib.AbstractContextManager[Any] = (
+                    _GeneratorTrace() if traced else contextlib.nullcontext()
+                )
+                stop_info: dict[str, Any] | None = None
+                try:
+                    with resumed:
+                        if traced:
+                            trace_start(args, kwargs)
+                        agen = f(*args, **kwargs)
+                    try:
+                        with resumed:
+                            item = await agen.__anext__()
+                        while True:
+                            try:
+                                value = yield item
+                            except GeneratorExit:
+                                with resumed:
+                                    await agen.aclose()
+                                raise
+                            except BaseException as ex:
+                                with resumed:
+                                    item = await agen.athrow(ex)
+                            else:
+                                with resumed:
+                                    item = await agen.asend(value)
+                    except StopAsyncIteration:
+                        pass
+                except Exception as ex:
+                    if traced:
+                        stop_info = _error_info(ex)
+                    raise
+                finally:
+                    if traced:
+                        with resumed:
+                            stop(info=stop_info)
+
+            return cast("Callable[P, R]", async_gen_wrapper)
+
+        if inspect.isgeneratorfunction(f):
+
+            @functools.wraps(f)
+            def gen_wrapper(*args: P.args, **kwargs: P.kwargs) -> Any:
+                if not trace_point.enabled or not _is_recording():
+                    return (yield from f(*args, **kwargs))
+                # NOTE: The generator's trace point is only on the trace
+                #       stack while its body runs, send(), throw() and
+                #       close() are forwarded by hand to put it back.
+                resumed = _GeneratorTrace()
+                stop_info: dict[str, Any] | None = None
+                try:
+                    with resumed:
+                        trace_start(args, kwargs)
+                        gen = f(*args, **kwargs)
+                        item = next(gen)
+                    while True:
+                        try:
+                            value = yield item
+                        except GeneratorExit:
+                            with resumed:
+                                gen.close()
+                            raise
+                        except BaseException as ex:
+                            with resumed:
+                                item = gen.throw(ex)
+                        else:
+                            with resumed:
+                                item = gen.send(value)
+                except StopIteration as ex:
+                    stop_info = result_info(ex.value)
+                    return ex.value
+                except Exception as ex:
+                    stop_info = _error_info(ex)
+                    raise
+                finally:
+                    with resumed:
+                        stop(info=stop_info)
+
+            return cast("Callable[P, R]", gen_wrapper)
 
+        @functools.wraps(f)
+        def wrapper(*args: P.args, **kwargs: P.kwargs) -> R:
+            # NOTE: Fast path, nothing is traced in this context so don't
+            #       pay for more than a context variable lookup.
+            profiler = _get_profiler()
+            if (
+                profiler is None
+                or profiler.sampled is False
+                or not trace_point.enabled
+            ):
+                return f(*args, **kwargs)
+            if _aggregate_min_calls:
+                aggregate = _aggregate(trace_point)
+                if aggregate is not None:
+                    # NOTE: Trace points started by the call, e.g. by the
+                    #       traced functions it calls, aren't sent either,
+                    #       no trace point of the call is their parent.
+                    #       _aggregate() made the profiler of the context
+                    #       the one of this thread or task.
+                    profiler = cast(_Profiler, _get_profiler())
+                    sampled = profiler.sampled
+                    profiler.sampled = False
+                    error = None
+                    started = time.perf_counter_ns()
+                    try:
+                        return f(*args, **kwargs)
+                    except Exception as ex:
+                        error = ex
+                        raise
+                    finally:
+                        duration = time.perf_counter_ns() - started
+                        profiler.sampled = sampled
+                        aggregate.add(trace_point, duration, error)
             stop_info: dict[str, Any] | None = None
+            started = 0
             try:
-                start(name, info=info_)
+                trace_start(args, kwargs)
+                if _aggregate_min_calls:
+                    started = time.perf_counter_ns()
                 result = f(*args, **kwargs)
             except Exception as ex:
-                stop_info = {
-                    "etype": reflection.get_class_name(ex),
-                    "message": str(ex),
-                }
+                stop_info = _error_info(ex)
                 raise
             else:
-                if not hide_result:
-                    stop_info = {"function": {"result": repr(result)}}
+                stop_info = result_info(result)
                 return result
             finally:
+                if started:
+                    trace_point.observe(time.perf_counter_ns() - started)
                 stop(info=stop_info)
 
         return wrapper
@@ -205,6 +908,7 @@ def trace_cls(
     allow_multiple_trace: bool = True,
     trace_class_methods: bool = False,
     trace_static_methods: bool = False,
+    lazy: bool = False,
 ) -> Callable[[T], T]:
     """Trace decorator for instances of class .
 
@@ -241,6 +945,10 @@ def trace_cls(
                                  traced either allow the new trace to occur
                                  or raise a value error denoting that multiple
                                  tracing is not allowed (by default allow).
+    :param lazy: Wrap methods when they are first looked up on the class
+                 instead of when the class is decorated, so that classes
+                 whose methods are never called cost nothing at import time.
+                 Ignored when an instance is decorated.
     """
 
     def trace_checker(
@@ -262,32 +970,53 @@ def trace_cls(
         return (True, None)
 
     def decorator(cls: T) -> T:
-        clss = cls if inspect.isclass(cls) else cls.__class__
-        mro_dicts = [c.__dict__ for c in inspect.getmro(clss)]
+        is_class = inspect.isclass(cls)
+        clss = cls if is_class else cls.__class__
+        namespaces: list[Mapping[str, Any]] = [
+            c.__dict__ for c in inspect.getmro(clss)
+        ]
+        if not is_class:
+            namespaces.insert(0, getattr(cls, "__dict__", {}))
+        # NOTE: Walk each namespace once, the first one defining a name is
+        #       the one its attribute is looked up from.
+        seen: set[str] = set()
         traceable_attrs: list[tuple[str, Any]] = []
         traceable_wrappers: list[type | None] = []
-        for attr_name, attr in inspect.getmembers(cls):
-            if not (inspect.ismethod(attr) or inspect.isfunction(attr)):
-                continue
-            wrapped_obj = None
-            for cls_dict in mro_dicts:
-                if attr_name in cls_dict:
-                    wrapped_obj = cls_dict[attr_name]
-                    break
-            should_wrap, wrapper = trace_checker(attr_name, wrapped_obj)
-            if not should_wrap:
-                continue
-            traceable_attrs.append((attr_name, attr))
-            traceable_wrappers.append(wrapper)
+        for namespace in namespaces:
+            for attr_name, wrapped_obj in list(namespace.items()):
+                if attr_name in seen:
+                    continue
+                seen.add(attr_name)
+                if isinstance(wrapped_obj, _LazyTrace):
+                    wrapped_obj = wrapped_obj.resolve()
+                should_wrap, wrapper = trace_checker(attr_name, wrapped_obj)
+                if not should_wrap:
+                    continue
+                try:
+                    attr = getattr(cls, attr_name)
+                except AttributeError:
+                    continue
+                if not (inspect.ismethod(attr) or inspect.isfunction(attr)):
+                    continue
+                traceable_attrs.append((attr_name, attr))
+                traceable_wrappers.append(wrapper)
         if not allow_multiple_trace:
             # Check before doing any other further work (so we don't
             # halfway trace this class).
             _ensure_no_multiple_traced(traceable_attrs)
+        tracer = trace(
+            name, info=info, hide_args=hide_args, hide_result=hide_result
+        )
         for i, (attr_name, attr) in enumerate(traceable_attrs):
-            wrapped_method = trace(
-                name, info=info, hide_args=hide_args, hide_result=hide_result
-            )(attr)
             wrapper = traceable_wrappers[i]
+            if lazy and is_class:
+                setattr(
+                    cls,
+                    attr_name,
+                    _LazyTrace(cls, attr_name, attr, tracer, wrapper),
+                )
+                continue
+            wrapped_method = tracer(attr)
             if wrapper is not None:
                 wrapped_method = wrapper(wrapped_method)
             setattr(cls, attr_name, wrapped_method)
@@ -296,6 +1025,45 @@ def trace_cls(
     return decorator
 
 
+_lazy_lock = threading.Lock()
+
+
+class _LazyTrace:
+    """Class attribute tracing a method when it is first looked up."""
+
+    __slots__ = ("_cls", "_name", "_attr", "_tracer", "_wrapper")
+
+    def __init__(
+        self,
+        cls: type,
+        name: str,
+        attr: Any,
+        tracer: Callable[[Any], Any],
+        wrapper: type | None = None,
+    ) -> None:
+        self._cls = cls
+        self._name = name
+        self._attr = attr
+        self._tracer = tracer
+        self._wrapper = wrapper
+
+    def resolve(self) -> Any:
+        """Replaces this attribute of the class by the traced method."""
+        with _lazy_lock:
+            current = self._cls.__dict__.get(self._name)
+            if current is not self:
+                # NOTE: Resolved by another thread meanwhile.
+                return current
+            traced = self._tracer(self._attr)
+            if self._wrapper is not None:
+                traced = self._wrapper(traced)
+            setattr(self._cls, self._name, traced)
+            return traced
+
+    def __get__(self, instance: Any, owner: type | None = None) -> Any:
+        return self.resolve().__get__(instance, owner)
+
+
 class TracedMeta(type):
     """Metaclass to comfortably trace all children of a specific class.
 
@@ -306,7 +1074,8 @@ class TracedMeta(type):
     >>>                        'info': None,
     >>>                        'hide_args': False,
     >>>                        'hide_result': True,
-    >>>                        'trace_private': False}
+    >>>                        'trace_private': False,
+    >>>                        'lazy': False}
     >>>
     >>>      def my_method(self, some_args):
     >>>          pass
@@ -318,6 +1087,9 @@ class TracedMeta(type):
     class we want to modify. __trace_args__ is the dictionary with one
     mandatory key included - "name", that will define name of action to be
     traced - E.g. wsgi, rpc, db, etc...
+
+    With 'lazy', methods are wrapped when they are first looked up instead
+    of when the class is created, see trace_cls().
     """
 
     def __init__(
@@ -331,6 +1103,7 @@ class TracedMeta(type):
         trace_args = dict(getattr(cls, "__trace_args__", {}))
         trace_private = trace_args.pop("trace_private", False)
         allow_multiple_trace = trace_args.pop("allow_multiple_trace", True)
+        lazy = trace_args.pop("lazy", False)
         if "name" not in trace_args:
             raise TypeError(
                 "Please specify __trace_args__ class level "
@@ -353,10 +1126,18 @@ class TracedMeta(type):
             # Check before doing any other further work (so we don't
             # halfway trace this class).
             _ensure_no_multiple_traced(traceable_attrs)
+        if not traceable_attrs:
+            return
+        tracer = trace(**trace_args)
         for attr_name, attr_value in traceable_attrs:
-            setattr(
-                cls, attr_name, trace(**trace_args)(getattr(cls, attr_name))
-            )
+            if lazy:
+                setattr(
+                    cls,
+                    attr_name,
+                    _LazyTrace(cls, attr_name, attr_value, tracer),
+                )
+            else:
+                setattr(cls, attr_name, tracer(getattr(cls, attr_name)))
 
 
 class Trace:
@@ -377,9 +1158,13 @@ class Trace:
         """
         self._name = name
         self._info = info
+        self._enabled = True
 
     def __enter__(self) -> None:
-        start(self._name, info=self._info)
+        # NOTE: Checked once, so that start() and stop() stay balanced.
+        self._enabled = tracepoints.is_enabled(self._name)
+        if self._enabled:
+            start(self._name, info=self._info)
 
     def __exit__(
         self,
@@ -387,6 +1172,8 @@ class Trace:
         value: BaseException | None,
         traceback: types.TracebackType | None,
     ) -> None:
+        if not self._enabled:
+            return
         info = None
         if etype and value is not None:
             info = {
@@ -396,21 +1183,316 @@ class Trace:
         stop(info=info)
 
 
+# NOTE: Guards Span.finish(), so that a trace point is only stopped once.
+_finish_lock = threading.Lock()
+
+
+class Span:
+    """Handle of a trace point started with start_span().
+
+    :ivar name: name of the trace point
+    :ivar trace_id: id of the trace point, None if nothing is traced
+    :ivar parent_id: id of its parent trace point
+    """
+
+    __slots__ = (
+        "name",
+        "trace_id",
+        "parent_id",
+        "_profiler",
+        "_recording",
+        "_depth",
+        "_started_ns",
+        "_started_perf_ns",
+        "_info",
+        "_finished",
+    )
+
+    def __init__(
+        self,
+        profiler: _Profiler | None,
+        name: str,
+        trace_id: str | None,
+        parent_id: str | None,
+        recording: bool = False,
+        depth: int = 0,
+    ) -> None:
+        self.name = name
+        self.trace_id = trace_id
+        self.parent_id = parent_id
+        self._profiler = profiler
+        # NOTE: False for a disabled trace point, its children are attached
+        #       to its parent.
+        self._recording = recording
+        # NOTE: Depth of the children of the trace point in the trace stack,
+        #       see set_trace_limits().
+        self._depth = depth
+        self._started_ns = 0
+        self._started_perf_ns = 0
+        self._info: dict[str, Any] = {}
+        self._finished = False
+
+    def __repr__(self) -> str:
+        return f"Span({self.name!r}, trace_id={self.trace_id!r})"
+
+    def finish(self, info: dict[str, Any] | None = None) -> None:
+        """Stops the trace point, from any thread, only the first call counts.
+
+        :param info: dictionary with extra information, sent when the trace
+                     point stops
+        """
+        with _finish_lock:
+            if self._finished:
+                return
+            self._finished = True
+        profiler = self._profiler
+        if profiler is None or not self._recording:
+            return
+        if profiler._events or profiler._counters:
+            info = profiler._pop_annotations(cast(str, self.trace_id), info)
+        if _max_bytes and info:
+            profiler._budget.bytes += _info_size(info)
+        if _span_records:
+            profiler._notify_handle(
+                self,
+                f"{self.name}-span",
+                self._started_ns,
+                self._info,
+                duration_ns=time.perf_counter_ns() - self._started_perf_ns,
+                stop_info=info,
+            )
+        else:
+            info = info or {}
+            info["host"] = profiler._host
+            profiler._notify_handle(
+                self, f"{self.name}-stop", utils.timestamp_ns(), info
+            )
+
+    def add_event(
+        self, name: str, attrs: dict[str, Any] | None = None
+    ) -> None:
+        """Records an event in the trace point, see add_event()."""
+        if self._profiler is not None and self.trace_id is not None:
+            self._profiler.add_event(name, attrs, trace_id=self.trace_id)
+
+    def add_counter(self, name: str, value: float = 1) -> None:
+        """Adds a value to a counter of the trace point, see add_counter()."""
+        if self._profiler is not None and self.trace_id is not None:
+            self._profiler.add_counter(name, value, trace_id=self.trace_id)
+
+    def activate(self) -> contextlib.AbstractContextManager[Span]:
+        """Makes the trace point the current one of the thread.
+
+        Trace points started in the block, e.g. by traced functions, are its
+        children:
+
+        >>  with span.activate():
+        >>      attach(volume)
+        """
+        return _activate(self)
+
+
+class _TraceBudget:
+    """What a trace consumed of the limits set with set_trace_limits()."""
+
+    __slots__ = ("spans", "bytes", "truncated")
+
+    def __init__(self) -> None:
+        self.spans = 0
+        self.bytes = 0
+        #: Number of trace points left out, per limit.
+        self.truncated: dict[str, int] = {}
+
+
+# NOTE: Start of the trace points left out by the trace limits.
+_TRUNCATED: Any = object()
+
+
 class _Profiler:
     def __init__(
         self,
         hmac_key: str,
         base_id: str | None = None,
         parent_id: str | None = None,
+        sampled: bool | None = None,
     ) -> None:
         self.hmac_key = hmac_key
+        self.sampled = sampled
         if not base_id:
-            base_id = str(uuidutils.generate_uuid())
+            base_id = _generate_id()
         self._trace_stack: collections.deque[str] = collections.deque(
             [base_id, parent_id or base_id]
         )
         self._name: collections.deque[str] = collections.deque()
+        # NOTE: Number of trace points inherited from the profiler this one
+        #       was forked from, it doesn't stop them.
+        self._inherited = 0
+        # NOTE: Start time, performance counter value and info of trace
+        #       points sent as span records, None for the ones sent as start
+        #       and stop events.
+        self._span_start: collections.deque[
+            tuple[int, int, dict[str, Any]] | None
+        ] = collections.deque()
+        # NOTE: Resource usage when the trace points started, None when it
+        #       isn't recorded, see set_resource_usage().
+        self._usage: collections.deque[list[int] | None] = collections.deque()
+        # NOTE: Traced memory and peak when the trace points started, None
+        #       when it isn't recorded, see set_memory_tracking().
+        self._memory: collections.deque[list[int] | None] = collections.deque()
+        self._snapshot: tracemalloc.Snapshot | None = None
+        # NOTE: Collapsed stacks sampled per trace point id, filled by the
+        #       stack sampler thread, see osprofiler.stacksampler.
+        self._stacks: dict[str, dict[str, int]] = {}
+        # NOTE: Garbage collections per trace point id, see gctrace.
+        self._gc_pauses: dict[str, list[tuple[Any, ...]]] = {}
+        # NOTE: Events and counters per trace point id, see add_event() and
+        #       add_counter().
+        self._events: dict[str, list[dict[str, Any]]] = {}
+        self._counters: dict[str, dict[str, float]] = {}
         self._host: str = socket.gethostname()
+        self._owner = _get_owner()
+        # NOTE: Shared with the profilers forked for other threads.
+        self._overhead = [0.0]
+        self._budget = _TraceBudget()
+        # NOTE: Calls of traced functions per parent trace point id, see
+        #       set_aggregation().
+        self._aggregates: dict[
+            str, dict[tracepoints.TracePoint, _Aggregate]
+        ] = {}
+
+    def _fork(self, owner: tuple[int, Any]) -> _Profiler:
+        """Returns a copy of the profiler with its own trace stack."""
+        profiler = copy.copy(self)
+        profiler._trace_stack = collections.deque(self._trace_stack)
+        profiler._name = collections.deque(self._name)
+        profiler._span_start = collections.deque(self._span_start)
+        # NOTE: The CPU time of the fork's thread isn't part of the one of
+        #       the trace points it inherits.
+        profiler._usage = collections.deque([None] * len(self._usage))
+        profiler._memory = collections.deque([None] * len(self._memory))
+        profiler._snapshot = None
+        profiler._inherited = len(self._name)
+        # NOTE: The stacks sampled and the garbage collections recorded in
+        #       the fork's thread are sent by the trace points the fork
+        #       starts, not by the ones it inherits.
+        profiler._stacks = {}
+        profiler._gc_pauses = {}
+        profiler._owner = owner
+        return profiler
+
+    def _fork_at(self, span: Span) -> _Profiler:
+        """Returns a copy of the profiler whose current trace point is span."""
+        profiler = self._fork(_get_owner())
+        # NOTE: The parent id keeps the trace points of the span from being
+        #       seen as the first ones of the trace in this service.
+        profiler._trace_stack = collections.deque(
+            [self.get_base_id(), span.parent_id or "", span.trace_id or ""]
+        )
+        profiler._name = collections.deque()
+        profiler._inherited = 0
+        profiler._span_start = collections.deque()
+        profiler._usage = collections.deque()
+        profiler._memory = collections.deque()
+        return profiler
+
+    def _span_stacks(self) -> tuple[collections.deque[Any], ...]:
+        return (
+            self._name,
+            self._trace_stack,
+            self._span_start,
+            self._usage,
+            self._memory,
+        )
+
+    def _depth(self) -> tuple[int, ...]:
+        """Returns the sizes of the trace stacks, see _suspend()."""
+        return tuple(len(stack) for stack in self._span_stacks())
+
+    def _suspend(self, depth: tuple[int, ...]) -> list[list[Any]]:
+        """Takes the trace points started above depth off the trace stacks.
+
+        :param depth: sizes of the trace stacks returned by _depth()
+        :returns: the trace points, to put back with _resume()
+        """
+        frames = []
+        for stack, size in zip(self._span_stacks(), depth):
+            frame = []
+            while len(stack) > size:
+                frame.append(stack.pop())
+            frame.reverse()
+            frames.append(frame)
+        return frames
+
+    def _resume(self, frames: list[list[Any]]) -> None:
+        """Puts trace points taken off by _suspend() back on the stacks."""
+        for stack, frame in zip(self._span_stacks(), frames):
+            stack.extend(frame)
+
+    def start_span(
+        self,
+        name: str,
+        info: dict[str, Any] | None,
+        parent_id: str,
+        depth: int = 0,
+    ) -> Span:
+        """Starts a trace point that is finished with its handle.
+
+        See the start_span() function.
+
+        :param depth: depth of the trace point's parent in the trace stack
+        """
+        if not tracepoints.is_enabled(name):
+            return Span(self, name, parent_id, parent_id, depth=depth)
+        if (
+            (_max_spans or _max_bytes or _max_depth)
+            and self.sampled is not False
+            and self._truncate(info, depth)
+        ):
+            # NOTE: Children of the trace point are attached to its parent.
+            return Span(self, name, parent_id, parent_id, depth=depth)
+        span = Span(
+            self,
+            name,
+            _generate_id(),
+            parent_id,
+            recording=self.sampled is not False,
+            depth=depth + 1,
+        )
+        if not span._recording:
+            return span
+        info = info or {}
+        info["host"] = self._host
+        if _span_records:
+            span._started_ns = utils.timestamp_ns()
+            span._started_perf_ns = time.perf_counter_ns()
+            span._info = info
+        else:
+            self._notify_handle(
+                span, f"{name}-start", utils.timestamp_ns(), info
+            )
+        return span
+
+    def _notify_handle(
+        self,
+        span: Span,
+        name: str,
+        timestamp_ns: int,
+        info: dict[str, Any],
+        **kwargs: Any,
+    ) -> None:
+        stats.incr("events_emitted")
+        # NOTE: Only spans that record have ids.
+        notifier.notify(
+            records.TraceRecord(
+                name,
+                self.get_base_id(),
+                cast(str, span.trace_id),
+                cast(str, span.parent_id),
+                timestamp_ns,
+                info,
+                **kwargs,
+            )
+        )
 
     def get_shorten_id(self, uuid_id: str | int) -> str:
         """Return shorten id of a uuid that will be used in OpenTracing drivers
@@ -436,6 +1518,14 @@ class _Profiler:
         """Returns current trace element id."""
         return self._trace_stack[-1]
 
+    def get_overhead(self) -> float:
+        """Returns the seconds spent in start() and stop() for this trace.
+
+        Includes the trace points of the threads and tasks the profiler was
+        propagated to.
+        """
+        return self._overhead[0]
+
     def start(self, name: str, info: dict[str, Any] | None = None) -> None:
         """Start new event.
 
@@ -450,11 +1540,53 @@ class _Profiler:
                      trace element. (sql request, rpc message or url...)
         """
 
+        started = time.perf_counter()
+        if (
+            (_max_spans or _max_bytes or _max_depth)
+            and self.sampled is not False
+            and self._truncate(info, len(self._name))
+        ):
+            # NOTE: Children of the trace point are attached to its parent.
+            self._name.append(name)
+            self._trace_stack.append(self._trace_stack[-1])
+            self._span_start.append(_TRUNCATED)
+            self._overhead[0] += time.perf_counter() - started
+            return
         info = info or {}
         info["host"] = self._host
         self._name.append(name)
-        self._trace_stack.append(str(uuidutils.generate_uuid()))
-        self._notify(f"{name}-start", info)
+        self._trace_stack.append(_generate_id())
+        if _resource_usage and self.sampled is not False:
+            self._usage.append(_resource_usage_sample())
+        else:
+            self._usage.append(None)
+        sampler = stacksampler.get()
+        if sampler is not None and self.sampled is not False:
+            sampler.track(self)
+        if self.sampled is not False:
+            gctrace.track(self)
+        if _span_records:
+            if self.sampled is False:
+                self._span_start.append((0, 0, info))
+            else:
+                self._span_start.append(
+                    (utils.timestamp_ns(), time.perf_counter_ns(), info)
+                )
+        else:
+            self._span_start.append(None)
+            self._notify(f"{name}-start", info)
+        if (
+            _memory_tracking
+            and self.sampled is not False
+            and tracemalloc.is_tracing()
+        ):
+            if _memory_top_sites and len(self._name) == 1:
+                self._snapshot = tracemalloc.take_snapshot()
+            parent = self._memory[-1] if self._memory else None
+            self._memory.append(_memory_sample(parent))
+        else:
+            self._memory.append(None)
+        self._overhead[0] += time.perf_counter() - started
 
     def stop(self, info: dict[str, Any] | None = None) -> None:
         """Finish latest event.
@@ -463,25 +1595,293 @@ class _Profiler:
 
         :param info: Dict with useful info. It will be send in notification.
         """
-        info = info or {}
-        info["host"] = self._host
         # Guard against stop() being called without matching start()
         if not self._name:
             # Silently return if there's no active profiling context
             return
-        self._notify(f"{self._name.pop()}-stop", info)
+        started = time.perf_counter()
+        span = self._span_start.pop() if self._span_start else None
+        if span is _TRUNCATED:
+            self._name.pop()
+            self._trace_stack.pop()
+            self._overhead[0] += time.perf_counter() - started
+            return
+        memory = self._memory.pop() if self._memory else None
+        if memory is not None and tracemalloc.is_tracing():
+            info = info or {}
+            parent = self._memory[-1] if self._memory else None
+            info["memory"] = _memory_info(memory, parent)
+            if self._snapshot is not None and len(self._name) == 1:
+                info["memory"]["top_sites"] = _top_sites(
+                    self._snapshot, _memory_top_sites
+                )
+                self._snapshot = None
+        usage = self._usage.pop() if self._usage else None
+        if usage is not None:
+            info = info or {}
+            info["cpu"] = _resource_usage_info(usage)
+            parent_usage = self._usage[-1] if self._usage else None
+            if parent_usage is not None:
+                parent_usage[-1] += info["cpu"]["cpu_ns"]
+        if self._stacks:
+            stacks = self._stacks.pop(self._trace_stack[-1], None)
+            if stacks:
+                info = info or {}
+                info["stacks"] = stacks
+        if self._events or self._counters:
+            info = self._pop_annotations(self._trace_stack[-1], info)
+        if self._aggregates:
+            aggregates = self._aggregates.pop(self._trace_stack[-1], None)
+            if aggregates:
+                self._notify_aggregates(aggregates)
+        if self._gc_pauses:
+            pauses = self._gc_pauses.pop(self._trace_stack[-1], None)
+            if pauses:
+                self._notify_gc_pauses(pauses)
+        if len(self._name) == 1 and self._budget.truncated:
+            self._notify_truncation()
+        if _max_bytes and info:
+            self._budget.bytes += _info_size(info)
+        if span is None:
+            info = info or {}
+            info["host"] = self._host
+            self._notify(f"{self._name.pop()}-stop", info)
+        else:
+            self._notify_span(
+                self._name.pop(),
+                span[0],
+                span[2],
+                info,
+                time.perf_counter_ns() - span[1],
+            )
         if self._trace_stack:
             self._trace_stack.pop()
-
-    def _notify(self, name: str, info: dict[str, Any]) -> None:
-        payload: dict[str, Any] = {
+        if len(self._name) <= self._inherited:
+            # NOTE: The last trace point started by this profiler stopped.
+            sampler = stacksampler.get()
+            if sampler is not None:
+                sampler.untrack(self)
+            if gctrace.is_enabled():
+                gctrace.untrack(self)
+        self._overhead[0] += time.perf_counter() - started
+
+    def add_event(
+        self,
+        name: str,
+        attrs: dict[str, Any] | None = None,
+        trace_id: str | None = None,
+    ) -> None:
+        """Records an event in a trace point, the current one by default."""
+        if self.sampled is False:
+            return
+        if trace_id is None:
+            if len(self._trace_stack) <= 2:
+                # NOTE: No trace point started in this service.
+                return
+            trace_id = self._trace_stack[-1]
+        events = self._events.setdefault(trace_id, [])
+        if len(events) >= MAX_EVENTS:
+            stats.incr("span_events_dropped")
+            return
+        event: dict[str, Any] = {
             "name": name,
-            "base_id": self.get_base_id(),
-            "trace_id": self.get_id(),
-            "parent_id": self.get_parent_id(),
-            "timestamp": timeutils.utcnow().strftime("%Y-%m-%dT%H:%M:%S.%f"),
+            "timestamp_ns": utils.timestamp_ns(),
         }
-        if info:
-            payload["info"] = info
+        if attrs:
+            event["attrs"] = attrs
+        events.append(event)
 
-        notifier.notify(payload)
+    def add_counter(
+        self, name: str, value: float = 1, trace_id: str | None = None
+    ) -> None:
+        """Adds a value to a counter of a trace point, the current one."""
+        if self.sampled is False:
+            return
+        if trace_id is None:
+            if len(self._trace_stack) <= 2:
+                return
+            trace_id = self._trace_stack[-1]
+        counters = self._counters.setdefault(trace_id, {})
+        counters[name] = counters.get(name, 0) + value
+
+    def _pop_annotations(
+        self, trace_id: str, info: dict[str, Any] | None
+    ) -> dict[str, Any] | None:
+        """Adds the events and counters of a trace point to its stop info."""
+        events = self._events.pop(trace_id, None)
+        if events:
+            info = info or {}
+            info["events"] = events
+        counters = self._counters.pop(trace_id, None)
+        if counters:
+            info = info or {}
+            info["counters"] = counters
+        return info
+
+    def _truncate(self, info: dict[str, Any] | None, depth: int) -> bool:
+        """Returns True if a new trace point exceeds the trace limits.
+
+        :param depth: depth of its parent in the trace stack
+        """
+        budget = self._budget
+        if _max_depth and depth >= _max_depth:
+            reason = "max_depth"
+        elif _max_spans and budget.spans >= _max_spans:
+            reason = "max_spans"
+        elif _max_bytes and budget.bytes >= _max_bytes:
+            reason = "max_bytes"
+        else:
+            budget.spans += 1
+            if _max_bytes and info:
+                budget.bytes += _info_size(info)
+            return False
+        budget.truncated[reason] = budget.truncated.get(reason, 0) + 1
+        stats.incr("events_dropped.trace_limit", 1 if _span_records else 2)
+        return True
+
+    def _aggregate(
+        self, trace_point: tracepoints.TracePoint
+    ) -> _Aggregate | None:
+        """Counts a call of a trace point, returns its aggregate if hot."""
+        parent_id = self._trace_stack[-1]
+        aggregates = self._aggregates.get(parent_id)
+        if aggregates is None:
+            # NOTE: setdefault(), the dict is shared with the forks of the
+            #       profiler that run in other threads.
+            aggregates = self._aggregates.setdefault(parent_id, {})
+        aggregate = aggregates.get(trace_point)
+        if aggregate is None:
+            aggregate = aggregates.setdefault(trace_point, _Aggregate())
+        aggregate.calls += 1
+        if (
+            aggregate.calls > _aggregate_min_calls
+            and trace_point.duration_ns < _aggregate_max_duration_ns
+        ):
+            return aggregate
+        return None
+
+    def _notify_aggregates(
+        self, aggregates: dict[tracepoints.TracePoint, _Aggregate]
+    ) -> None:
+        """Sends a trace point per trace point whose calls were aggregated."""
+        for trace_point, aggregate in aggregates.items():
+            if not aggregate.count:
+                continue
+            stats.incr("spans_aggregated", aggregate.count)
+            info = {
+                "host": self._host,
+                "function": {"name": trace_point.qualname},
+                "aggregated": {
+                    "count": aggregate.count,
+                    "duration_ns": aggregate.duration_ns,
+                    "errors": aggregate.errors,
+                },
+            }
+            stop_info: dict[str, Any] = {"host": self._host}
+            if aggregate.errors:
+                # NOTE: So that the trace is still seen as failed.
+                stop_info["etype"] = next(iter(aggregate.errors))
+                stop_info["message"] = (
+                    f"{sum(aggregate.errors.values())} of {aggregate.count} "
+                    "aggregated calls failed: "
+                    + ", ".join(
+                        f"{etype} ({count})"
+                        for etype, count in aggregate.errors.items()
+                    )
+                )
+            self._notify_child(
+                trace_point.name,
+                aggregate.started_ns,
+                aggregate.started_ns + aggregate.duration_ns,
+                info,
+                stop_info,
+            )
+
+    def _notify_gc_pauses(self, pauses: list[tuple[Any, ...]]) -> None:
+        """Sends a trace point per garbage collection, see gctrace."""
+        for started_ns, duration_ns, gc_info in pauses:
+            self._notify_child(
+                "gc",
+                started_ns,
+                started_ns + duration_ns,
+                {"host": self._host, "gc": gc_info},
+                {"host": self._host},
+            )
+
+    def _notify_child(
+        self,
+        name: str,
+        started_ns: int,
+        stopped_ns: int,
+        info: dict[str, Any],
+        stop_info: dict[str, Any],
+    ) -> None:
+        """Sends a child of the current trace point that already stopped."""
+        self._trace_stack.append(_generate_id())
+        if _span_records:
+            self._notify_span(
+                name, started_ns, info, stop_info, stopped_ns - started_ns
+            )
+        else:
+            self._notify(f"{name}-start", info, timestamp_ns=started_ns)
+            self._notify(f"{name}-stop", stop_info, timestamp_ns=stopped_ns)
+        self._trace_stack.pop()
+
+    def _notify_truncation(self) -> None:
+        """Sends the trace point recording what the trace limits left out."""
+        info = {"host": self._host, "truncated": self._budget.truncated}
+        self._budget.truncated = {}
+        self._trace_stack.append(_generate_id())
+        if _span_records:
+            self._notify_span("truncated", utils.timestamp_ns(), info, None, 0)
+        else:
+            self._notify("truncated-start", info)
+            self._notify("truncated-stop", {"host": self._host})
+        self._trace_stack.pop()
+
+    def _notify(
+        self,
+        name: str,
+        info: dict[str, Any],
+        timestamp_ns: int | None = None,
+    ) -> None:
+        if self.sampled is False:
+            return
+        stats.incr("events_emitted")
+        notifier.notify(
+            records.TraceRecord(
+                name,
+                self.get_base_id(),
+                self.get_id(),
+                self.get_parent_id(),
+                timestamp_ns or utils.timestamp_ns(),
+                info,
+            )
+        )
+
+    def _notify_span(
+        self,
+        name: str,
+        started_ns: int,
+        start_info: dict[str, Any],
+        stop_info: dict[str, Any] | None,
+        duration_ns: int,
+    ) -> None:
+        if self.sampled is False:
+            return
+        stats.incr("events_emitted")
+        notifier.notify(
+            records.TraceRecord(
+                f"{name}-span",
+                self.get_base_id(),
+                self.get_id(),
+                self.get_parent_id(),
+                started_ns,
+                start_info,
+                duration_ns=duration_ns,
+                stop_info=stop_info,
+                # NOTE: The first trace point started by this service for
+                #       the trace, it's done when this record is sent.
+                local_root=len(self._trace_stack) == 3,
+            )
+        )
@@ -0,0 +1,140 @@
+# Copyright 2026 OpenStack Foundation.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Compact in-memory form of the notifications sent by the profiler."""
+
+from collections.abc import Iterator, Mapping
+from typing import Any
+
+from osprofiler import _utils as utils
+from osprofiler import capture
+
+
+class TraceRecord(Mapping[str, Any]):
+    """Notification of a trace point, read-only mapping of its payload.
+
+    Records are what the profiler passes to the notifier. They keep the
+    payload fields in slots instead of a dict and only format the
+    "timestamp" field when it is read, so a record that is buffered, sampled
+    out or sent in a batch costs a fraction of the payload dict. copy()
+    returns the payload as a plain dict, for serialization.
+
+    Optional fields ("duration_ns", "info", "stop_info" and "local_root")
+    are only present when they are set.
+    """
+
+    __slots__ = (
+        "name",
+        "base_id",
+        "trace_id",
+        "parent_id",
+        "timestamp_ns",
+        "duration_ns",
+        "info",
+        "stop_info",
+        "local_root",
+    )
+
+    def __init__(
+        self,
+        name: str,
+        base_id: str,
+        trace_id: str,
+        parent_id: str,
+        timestamp_ns: int,
+        info: dict[str, Any] | None = None,
+        duration_ns: int | None = None,
+        stop_info: dict[str, Any] | None = None,
+        local_root: bool = False,
+    ) -> None:
+        self.name = name
+        self.base_id = base_id
+        self.trace_id = trace_id
+        self.parent_id = parent_id
+        self.timestamp_ns = timestamp_ns
+        self.duration_ns = duration_ns
+        self.info = info
+        self.stop_info = stop_info
+        self.local_root = local_root
+
+    def __getitem__(self, key: str) -> Any:
+        if key == "timestamp":
+            return utils.format_timestamp(self.timestamp_ns)
+        if key in _REQUIRED_FIELDS:
+            return getattr(self, key)
+        if key == "duration_ns":
+            if self.duration_ns is not None:
+                return self.duration_ns
+        elif key in _FLAG_FIELDS:
+            value = getattr(self, key)
+            if value:
+                return value
+        raise KeyError(key)
+
+    def __iter__(self) -> Iterator[str]:
+        yield from ("name", "base_id", "trace_id", "parent_id", "timestamp")
+        yield "timestamp_ns"
+        if self.duration_ns is not None:
+            yield "duration_ns"
+        if self.info:
+            yield "info"
+        if self.stop_info:
+            yield "stop_info"
+        if self.local_root:
+            yield "local_root"
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def __repr__(self) -> str:
+        return f"TraceRecord({self.copy()!r})"
+
+    def resolve(self) -> None:
+        """Formats the values captured lazily in the info dicts.
+
+        See capture.LazyRepr.
+        """
+        if self.info:
+            capture.resolve(self.info)
+        if self.stop_info:
+            capture.resolve(self.stop_info)
+
+    def copy(self) -> dict[str, Any]:
+        """Returns the payload as a new dict."""
+        self.resolve()
+        payload: dict[str, Any] = {
+            "name": self.name,
+            "base_id": self.base_id,
+            "trace_id": self.trace_id,
+            "parent_id": self.parent_id,
+            "timestamp": utils.format_timestamp(self.timestamp_ns),
+            "timestamp_ns": self.timestamp_ns,
+        }
+        if self.duration_ns is not None:
+            payload["duration_ns"] = self.duration_ns
+        if self.info:
+            payload["info"] = self.info
+        if self.stop_info:
+            payload["stop_info"] = self.stop_info
+        if self.local_root:
+            payload["local_root"] = True
+        return payload
+
+
+_REQUIRED_FIELDS = frozenset(
+    ("name", "base_id", "trace_id", "parent_id", "timestamp_ns")
+)
+# NOTE: Optional fields that are only present when they are truthy.
+_FLAG_FIELDS = frozenset(("info", "stop_info", "local_root"))
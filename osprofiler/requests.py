@@ -18,6 +18,7 @@ from typing import Any
 from urllib import parse as parser
 
 from osprofiler import profiler
+from osprofiler import tracepoints
 from osprofiler import web
 
 
@@ -28,6 +29,12 @@ LOG = log.getLogger(__name__)
 
 _FUNC: Callable[..., Any] | None = None
 
+# NOTE: Trace points are named after the scheme of the url.
+_TRACE_POINTS = {
+    scheme: tracepoints.register(scheme, __name__)
+    for scheme in ("http", "https")
+}
+
 try:
     from requests.adapters import HTTPAdapter
 except ImportError:
@@ -35,7 +42,12 @@ except ImportError:
 else:
 
     def send(self: Any, request: Any, *args: Any, **kwargs: Any) -> Any:
+        if _FUNC is None:
+            raise RuntimeError("osprofiler requests adapter not initialized")
         parsed_url = parser.urlparse(request.url)
+        trace_point = _TRACE_POINTS.get(parsed_url.scheme)
+        if trace_point is not None and not trace_point.enabled:
+            return _FUNC(self, request, *args, **kwargs)
 
         # Best effort guessing port if needed
         port: int | str = parsed_url.port or ""
@@ -62,8 +74,6 @@ else:
         # context/span.
         request.headers.update(web.get_trace_id_headers())
 
-        if _FUNC is None:
-            raise RuntimeError("osprofiler requests adapter not initialized")
         response = _FUNC(self, request, *args, **kwargs)
 
         profiler.stop(info={"requests": {"status_code": response.status_code}})
@@ -0,0 +1,152 @@
+# Copyright 2026 OpenStack Foundation.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Head sampling of traces.
+
+The sampling decision is taken once, where a trace starts, and is then
+carried to the other services in the signed trace headers, so a trace is
+either recorded by all services or by none of them.
+"""
+
+from collections.abc import Mapping
+import fnmatch
+import random
+import threading
+import time
+
+from osprofiler import _utils as utils
+
+
+class Sampler:
+    """Decides whether a new trace is recorded.
+
+    :param rate: Probability (0.0 - 1.0) of recording a trace.
+    :param max_per_second: Maximum number of traces recorded per second,
+                           enforced with a token bucket. 0 or None means
+                           unlimited.
+    :param path_rates: Per path sampling rates, either a mapping or a
+                       "<pattern>:<rate>[,<pattern>:<rate>...]" string.
+                       Patterns are shell-style wildcards (e.g.
+                       "/healthcheck*"), the first matching pattern
+                       overrides ``rate``.
+    """
+
+    def __init__(
+        self,
+        rate: float = 1.0,
+        max_per_second: float | None = None,
+        path_rates: Mapping[str, float | str] | str | None = None,
+    ) -> None:
+        self.rate = _check_rate(float(rate))
+        self.max_per_second = float(max_per_second or 0)
+        if self.max_per_second < 0:
+            raise ValueError(
+                f"max_per_second must not be negative: {max_per_second}"
+            )
+        self.path_rates = _parse_path_rates(path_rates)
+        self._lock = threading.Lock()
+        self._tokens = max(self.max_per_second, 1.0)
+        self._last_refill = time.monotonic()
+
+    def get_rate(self, path: str | None = None) -> float:
+        """Returns the sampling rate that applies to the given path."""
+        if path is not None:
+            for pattern, rate in self.path_rates:
+                if fnmatch.fnmatchcase(path, pattern):
+                    return rate
+        return self.rate
+
+    def should_sample(self, path: str | None = None) -> bool:
+        """Takes the sampling decision for a new trace.
+
+        :param path: Request path of the trace, used to select the rate.
+        :returns: True if the trace has to be recorded.
+        """
+        rate = self.get_rate(path)
+        if rate <= 0:
+            return False
+        if rate < 1 and random.random() >= rate:  # noqa: S311
+            return False
+        return self._take_token()
+
+    def _take_token(self) -> bool:
+        if not self.max_per_second:
+            return True
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(
+                max(self.max_per_second, 1.0),
+                self._tokens + (now - self._last_refill) * self.max_per_second,
+            )
+            self._last_refill = now
+            if self._tokens < 1:
+                return False
+            self._tokens -= 1
+            return True
+
+
+def _check_rate(rate: float) -> float:
+    if not 0 <= rate <= 1:
+        raise ValueError(f"Sampling rate must be between 0 and 1: {rate}")
+    return rate
+
+
+def _parse_path_rates(
+    path_rates: Mapping[str, float | str] | str | None,
+) -> list[tuple[str, float]]:
+    if not path_rates:
+        return []
+    rules: list[tuple[str, float | str]] = []
+    if isinstance(path_rates, str):
+        for rule in utils.split(path_rates):
+            pattern, sep, rate = rule.rpartition(":")
+            if not sep or not pattern:
+                raise ValueError(
+                    f"Invalid sampling rule '{rule}', expected "
+                    "'<pattern>:<rate>'"
+                )
+            rules.append((pattern.strip(), rate))
+    else:
+        rules.extend(path_rates.items())
+    return [(pattern, _check_rate(float(rate))) for pattern, rate in rules]
+
+
+__sampler: Sampler | None = None
+
+
+def set(sampler: Sampler | None) -> None:
+    """Sets the sampler used for new traces.
+
+    :param sampler: Sampler instance or None to record every trace.
+    """
+    global __sampler
+    __sampler = sampler
+
+
+def get() -> Sampler | None:
+    """Returns the sampler used for new traces, None if not configured."""
+    return __sampler
+
+
+def should_sample(path: str | None = None) -> bool | None:
+    """Takes a sampling decision with the configured sampler.
+
+    :param path: Request path of the trace, used to select the rate.
+    :returns: The decision or None if no sampler is configured.
+    """
+    sampler = __sampler
+    if sampler is None:
+        return None
+    return sampler.should_sample(path)
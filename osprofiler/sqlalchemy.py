@@ -21,11 +21,16 @@ from typing import Any
 from oslo_utils import reflection
 
 from osprofiler import profiler
+from osprofiler import tracepoints
 
 LOG = log.getLogger(__name__)
 
 _DISABLED = False
 
+# NOTE: Set on the execution context of the statements whose trace point is
+#       disabled, so that the stop handlers skip them too.
+_SKIPPED = "_osprofiler_skipped"
+
 
 def disable() -> None:
     """Disable tracing of all DB queries. Reduce a lot size of profiles."""
@@ -68,6 +73,7 @@ def wrap_session(sqlalchemy: Any, sess: Any) -> Generator[Any, None, None]:
 
 def _before_cursor_execute(name: str) -> Any:
     """Add listener that will send trace info before query is executed."""
+    trace_point = tracepoints.register(name, __name__)
 
     def handler(
         conn: Any,
@@ -77,6 +83,9 @@ def _before_cursor_execute(name: str) -> Any:
         context: Any,
         executemany: Any,
     ) -> None:
+        if not trace_point.enabled and context is not None:
+            setattr(context, _SKIPPED, True)
+            return
         info = {"db": {"statement": statement, "params": params}}
         profiler.start(name, info=info)
 
@@ -99,6 +108,8 @@ def _after_cursor_execute(hide_result: bool = True) -> Any:
         context: Any,
         executemany: Any,
     ) -> None:
+        if getattr(context, _SKIPPED, False) is True:
+            return
         if not hide_result:
             # Add SQL result to trace info in *-stop phase
             info = {"db": {"result": str(cursor._rows)}}
@@ -111,6 +122,9 @@ def _after_cursor_execute(hide_result: bool = True) -> Any:
 
 def handle_error(exception_context: Any) -> None:
     """Handle SQLAlchemy errors"""
+    context = getattr(exception_context, "execution_context", None)
+    if getattr(context, _SKIPPED, False) is True:
+        return
     exception_class_name = reflection.get_class_name(
         exception_context.original_exception
     )
@@ -0,0 +1,215 @@
+# Copyright 2026 OpenStack Foundation.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Sampling profiler of the code running inside trace points.
+
+A background thread periodically takes the stacks of the threads that are
+in a sampled trace (with sys._current_frames()) and counts them per trace
+point, the innermost one running when the sample is taken. When a trace
+point stops, its counts are sent in its stop info as collapsed stacks
+(``"module:function;module:function": count``, the format of flame graph
+tools), which shows where un-instrumented code spends the time:
+
+>>  from osprofiler import stacksampler
+>>  stacksampler.set(stacksampler.StackSampler(interval=0.01))
+"""
+
+import atexit
+import sys
+import threading
+import time
+import types
+from typing import Any
+
+from osprofiler import _utils as utils
+from osprofiler import stats
+
+#: Collapsed stack counting the samples over max_stacks.
+TRUNCATED = "[truncated]"
+
+
+class StackSampler:
+    """Samples the stacks of the threads in a sampled trace.
+
+    :param interval: seconds between two samples
+    :param max_overhead: maximum share (0.0 - 1.0) of the time spent
+                         sampling, the interval grows when the stacks are
+                         too expensive to take, 0 for no limit
+    :param max_depth: maximum number of frames of a stack, the outermost
+                      ones are left out
+    :param max_stacks: maximum number of distinct stacks per trace point,
+                       further ones are counted as "[truncated]"
+    """
+
+    def __init__(
+        self,
+        interval: float = 0.01,
+        max_overhead: float = 0.01,
+        max_depth: int = 64,
+        max_stacks: int = 500,
+    ) -> None:
+        if interval <= 0:
+            raise ValueError(f"interval must be positive: {interval}")
+        if not 0 <= max_overhead <= 1:
+            raise ValueError(
+                f"max_overhead must be between 0 and 1: {max_overhead}"
+            )
+        self.interval = interval
+        self.max_overhead = max_overhead
+        self.max_depth = max_depth
+        self.max_stacks = max_stacks
+        # NOTE: Profiler of the trace running in each thread, by thread id.
+        self._profilers: dict[int, Any] = {}
+        self._lock = threading.Lock()
+        # NOTE: Set when a thread is tracked, to leave the idle wait.
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._stopped = False
+        atexit.register(self.shutdown)
+        utils.register_at_fork(self._after_fork)
+
+    def _after_fork(self) -> None:
+        # NOTE: The sampling thread doesn't exist in a forked child, it is
+        #       started again when a thread is tracked.
+        self._profilers = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def track(self, profiler: Any) -> None:
+        """Samples the current thread while profiler is tracing in it."""
+        ident = threading.get_ident()
+        if self._profilers.get(ident) is profiler:
+            return
+        with self._lock:
+            self._profilers[ident] = profiler
+            if self._thread is None and not self._stopped:
+                self._thread = threading.Thread(
+                    target=self._run,
+                    name="osprofiler-stack-sampler",
+                    daemon=True,
+                )
+                self._thread.start()
+        self._wake.set()
+
+    def untrack(self, profiler: Any) -> None:
+        """Stops sampling the current thread for profiler."""
+        ident = threading.get_ident()
+        with self._lock:
+            if self._profilers.get(ident) is profiler:
+                del self._profilers[ident]
+
+    def sample(self) -> int:
+        """Takes a sample of the stacks of the tracked threads.
+
+        :returns: number of stacks counted
+        """
+        with self._lock:
+            profilers = list(self._profilers.items())
+        if not profilers:
+            return 0
+        frames = sys._current_frames()
+        count = 0
+        for ident, profiler in profilers:
+            frame = frames.get(ident)
+            if frame is None:
+                # NOTE: The thread exited without stopping its trace.
+                with self._lock:
+                    if self._profilers.get(ident) is profiler:
+                        del self._profilers[ident]
+                continue
+            try:
+                trace_id = profiler._trace_stack[-1]
+            except IndexError:
+                continue
+            stack = _collapse(frame, self.max_depth)
+            # NOTE: Not locked, a sample may be lost when the trace point
+            #       stops meanwhile. The dict belongs to the profiler so
+            #       such late samples don't outlive the trace.
+            stacks = profiler._stacks.setdefault(trace_id, {})
+            if stack not in stacks and len(stacks) >= self.max_stacks:
+                stack = TRUNCATED
+            stacks[stack] = stacks.get(stack, 0) + 1
+            count += 1
+        del frames
+        return count
+
+    def get_delay(self, cost: float) -> float:
+        """Returns the seconds to wait after a sample that took cost."""
+        if self.max_overhead and cost > self.interval * self.max_overhead:
+            return cost / self.max_overhead
+        return self.interval
+
+    def _run(self) -> None:
+        delay = self.interval
+        while not self._stopped:
+            self._wake.clear()
+            if not self._profilers:
+                self._wake.wait()
+                continue
+            if self._stop.wait(delay):
+                return
+            started = time.perf_counter()
+            count = self.sample()
+            cost = time.perf_counter() - started
+            if count:
+                stats.incr("stack_samples", count)
+            stats.observe("stack_sampling", cost)
+            delay = self.get_delay(cost)
+
+    def shutdown(self, timeout: float | None = 5.0) -> None:
+        """Stops the sampling thread.
+
+        :param timeout: maximum number of seconds to wait for it
+        """
+        self._stopped = True
+        self._stop.set()
+        self._wake.set()
+        thread = self._thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout)
+
+
+def _collapse(frame: types.FrameType | None, max_depth: int) -> str:
+    names: list[str] = []
+    while frame is not None and len(names) < max_depth:
+        names.append(
+            f"{frame.f_globals.get('__name__', '?')}:"
+            f"{frame.f_code.co_qualname}"
+        )
+        frame = frame.f_back
+    names.reverse()
+    return ";".join(names)
+
+
+__sampler: StackSampler | None = None
+
+
+def set(sampler: StackSampler | None) -> None:
+    """Sets the stack sampler, stopping the previous one.
+
+    :param sampler: StackSampler instance or None to disable the sampling
+    """
+    global __sampler
+    previous, __sampler = __sampler, sampler
+    if previous is not None and previous is not sampler:
+        previous.shutdown()
+
+
+def get() -> StackSampler | None:
+    """Returns the stack sampler, None if not configured."""
+    return __sampler
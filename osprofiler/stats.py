@@ -0,0 +1,299 @@
+# Copyright 2026 OpenStack Foundation.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Counters about osprofiler itself.
+
+They tell whether trace points are lost and how much time osprofiler costs:
+
+* counters - ``events_emitted``, ``events_dropped.<reason>``,
+  ``notify_errors.<notifier>`` and ``spans_aggregated``, the calls of hot
+  trace points sent as aggregated trace points, and
+  ``span_events_dropped``, the events over profiler.MAX_EVENTS
+* histograms (in seconds) - ``notify_latency.<notifier>``,
+  ``request_overhead``, the time spent in osprofiler per traced request, and
+  ``stack_sampling``, the time taken by each sample of the stack sampler
+* gauges - ``queue_depth``, payloads waiting in AsyncNotifier queues
+
+>>  from osprofiler import stats
+>>  stats.snapshot()["counters"]["events_emitted"]
+
+The same snapshot is served as JSON by the app() WSGI application.
+"""
+
+import bisect
+from collections.abc import Callable, Iterable, Sequence
+import json
+import threading
+from typing import Any
+import weakref
+
+from osprofiler import _utils as utils
+
+#: Upper bounds (seconds) of the buckets of the histograms.
+LATENCY_BUCKETS = (
+    0.00001,
+    0.0001,
+    0.001,
+    0.01,
+    0.1,
+    1.0,
+    10.0,
+)
+
+
+class Histogram:
+    """Distribution of observed values in fixed buckets.
+
+    :param buckets: sorted upper bounds of the buckets, values above the
+                    last one are counted in an extra bucket
+    """
+
+    def __init__(self, buckets: Sequence[float] = LATENCY_BUCKETS) -> None:
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def merge(self, other: "Histogram") -> None:
+        """Adds the values observed by another histogram of same buckets."""
+        for i, count in enumerate(list(other.counts)):
+            self.counts[i] += count
+        self.count += other.count
+        self.sum += other.sum
+
+    def copy(self) -> "Histogram":
+        histogram = Histogram(self.buckets)
+        histogram.merge(self)
+        return histogram
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "buckets": list(self.buckets),
+            "counts": list(self.counts),
+            "count": self.count,
+            "sum": self.sum,
+        }
+
+
+class _Shard:
+    """Counters and histograms only updated by the thread owning them."""
+
+    __slots__ = ("counters", "histograms", "__weakref__")
+
+    def __init__(self) -> None:
+        self.counters: dict[str, int] = {}
+        self.histograms: dict[str, Histogram] = {}
+
+
+class Stats:
+    """Registry of counters, histograms and gauges.
+
+    Counters and histograms are updated without locking: each thread updates
+    its own shard, the shards are merged when the values are read and when
+    their thread exits.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        # NOTE: Counters and histograms of the threads that exited.
+        self._counters: dict[str, int] = {}
+        self._histograms: dict[str, Histogram] = {}
+        self._shards: list[tuple[dict[str, int], dict[str, Histogram]]] = []
+        self._exited: list[tuple[dict[str, int], dict[str, Histogram]]] = []
+        self._gauges: dict[str, list[weakref.WeakMethod[Any]]] = {}
+        utils.register_at_fork(self._after_fork)
+
+    def _after_fork(self) -> None:
+        # NOTE: Another thread of the parent may have held the lock.
+        self._lock = threading.Lock()
+
+    def _new_shard(self) -> _Shard:
+        shard = self._local.shard = _Shard()
+        data = (shard.counters, shard.histograms)
+        with self._lock:
+            self._collect_exited()
+            self._shards.append(data)
+        # NOTE: The shard is only referenced by the thread local storage,
+        #       it's collected when its thread exits.
+        weakref.finalize(shard, self._retire, data).atexit = False
+        return shard
+
+    def _retire(
+        self, data: tuple[dict[str, int], dict[str, Histogram]]
+    ) -> None:
+        # NOTE: Doesn't take the lock, the shards of the other threads of
+        #       the parent are also collected in forked children, where the
+        #       lock may still be held.
+        self._exited.append(data)
+
+    def _collect_exited(self) -> None:
+        """Merges the shards of the exited threads, with the lock held."""
+        while self._exited:
+            data = self._exited.pop()
+            self._shards = [
+                shard for shard in self._shards if shard is not data
+            ]
+            _merge(self._counters, self._histograms, *data)
+
+    def incr(self, name: str, value: int = 1) -> None:
+        """Adds value to a counter."""
+        try:
+            counters = self._local.shard.counters
+        except AttributeError:
+            counters = self._new_shard().counters
+        counters[name] = counters.get(name, 0) + value
+
+    def observe(self, name: str, value: float) -> None:
+        """Adds a value to a histogram."""
+        try:
+            histograms = self._local.shard.histograms
+        except AttributeError:
+            histograms = self._new_shard().histograms
+        histogram = histograms.get(name)
+        if histogram is None:
+            histogram = histograms[name] = Histogram()
+        histogram.observe(value)
+
+    def register_gauge(self, name: str, method: Callable[[], Any]) -> None:
+        """Registers a bound method read by snapshot().
+
+        Only a weak reference to its object is kept, the gauge is the sum of
+        the values of the objects that are still alive.
+        """
+        with self._lock:
+            self._gauges.setdefault(name, []).append(
+                weakref.WeakMethod(method)
+            )
+
+    def snapshot(self) -> dict[str, Any]:
+        """Returns the current values."""
+        with self._lock:
+            gauges = {
+                name: [ref for ref in refs if ref() is not None]
+                for name, refs in self._gauges.items()
+            }
+            self._gauges = gauges
+            self._collect_exited()
+            counters = dict(self._counters)
+            histograms = {
+                name: histogram.copy()
+                for name, histogram in self._histograms.items()
+            }
+            for data in self._shards:
+                _merge(counters, histograms, *data)
+        result: dict[str, Any] = {
+            "counters": counters,
+            "histograms": {
+                name: histogram.to_dict()
+                for name, histogram in histograms.items()
+            },
+        }
+        result["gauges"] = {
+            name: sum(_read(refs)) for name, refs in gauges.items()
+        }
+        return result
+
+    def reset(self) -> None:
+        """Resets counters and histograms, gauges are kept."""
+        with self._lock:
+            self._collect_exited()
+            self._counters = {}
+            self._histograms = {}
+            # NOTE: A value added concurrently by the owner of a shard may
+            #       be lost or survive the reset.
+            for counters, histograms in self._shards:
+                counters.clear()
+                histograms.clear()
+
+
+def _merge(
+    counters: dict[str, int],
+    histograms: dict[str, Histogram],
+    shard_counters: dict[str, int],
+    shard_histograms: dict[str, Histogram],
+) -> None:
+    # NOTE: Copy the items first, the owner of the shard may add some.
+    for name, value in list(shard_counters.items()):
+        counters[name] = counters.get(name, 0) + value
+    for name, histogram in list(shard_histograms.items()):
+        total = histograms.get(name)
+        if total is None:
+            histograms[name] = histogram.copy()
+        else:
+            total.merge(histogram)
+
+
+def _read(refs: Iterable[weakref.WeakMethod[Any]]) -> list[Any]:
+    values = []
+    for ref in refs:
+        method = ref()
+        if method is not None:
+            values.append(method())
+    return values
+
+
+__stats = Stats()
+
+
+def get() -> Stats:
+    """Returns the stats registry of the process."""
+    return __stats
+
+
+def incr(name: str, value: int = 1) -> None:
+    """Adds value to a counter of the registry."""
+    __stats.incr(name, value)
+
+
+def observe(name: str, value: float) -> None:
+    """Adds a value to a histogram of the registry."""
+    __stats.observe(name, value)
+
+
+def snapshot() -> dict[str, Any]:
+    """Returns the counters, histograms and gauges of the registry."""
+    return __stats.snapshot()
+
+
+def app(environ: dict[str, Any], start_response: Callable[..., Any]) -> Any:
+    """WSGI application returning snapshot() as JSON.
+
+    The values don't contain trace data, but who can read them learns about
+    the load of the service, so expose it only to operators, e.g. with
+    api-paste.ini:
+
+    >>  [app:osprofiler_stats]
+    >>  paste.app_factory = osprofiler.stats:app_factory
+    """
+    body = json.dumps(snapshot(), sort_keys=True).encode()
+    start_response(
+        "200 OK",
+        [
+            ("Content-Type", "application/json"),
+            ("Content-Length", str(len(body))),
+        ],
+    )
+    return [body]
+
+
+def app_factory(global_conf: dict[str, Any] | None, **local_conf: Any) -> Any:
+    """Paste application factory of app()."""
+    return app
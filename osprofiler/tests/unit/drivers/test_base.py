@@ -13,6 +13,9 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+from typing import Any
+from unittest import mock
+
 from osprofiler.drivers import base
 from osprofiler.tests import test
 
@@ -46,6 +49,28 @@ class NotifierBaseTestCase(test.TestCase):
 
         self.assertEqual(22, base.get_driver("b://", 5, b=7).notify(10))  # type: ignore[arg-type, func-returns-value]
 
+    def test_notify_batch_default(self):
+        notify = mock.MagicMock()
+
+        class E(base.Driver):
+            @classmethod
+            def get_name(cls):
+                return "e"
+
+            def notify(self, info, **kwargs):
+                notify(info, **kwargs)
+
+        base.get_driver("e://").notify_batch(
+            [{"a": 1}, {"a": 2}], context="ctx"
+        )
+        self.assertEqual(
+            [
+                mock.call({"a": 1}, context="ctx"),
+                mock.call({"a": 2}, context="ctx"),
+            ],
+            notify.call_args_list,
+        )
+
     def test_driver_not_found(self):
         self.assertRaises(
             ValueError,
@@ -147,3 +172,354 @@ class NotifierBaseTestCase(test.TestCase):
         self.assertEqual(
             expected_output, base.get_driver("d://")._build_tree(test_input)
         )
+
+    def test_parse_results_precision(self):
+        class F(base.Driver):
+            @classmethod
+            def get_name(cls):
+                return "f"
+
+        driver = base.get_driver("f://")
+        base_ns = 1450879342338776000
+        events = [
+            ("wsgi-start", "1", "0", base_ns),
+            ("db-start", "2", "1", base_ns + 1_250_500),
+            ("db-stop", "2", "1", base_ns + 1_750_900),
+            ("wsgi-stop", "1", "0", base_ns + 3_000_000),
+        ]
+        for name, trace_id, parent_id, ts in events:
+            driver._append_results(
+                trace_id,
+                parent_id,
+                name,
+                None,
+                None,
+                None,
+                # NOTE: Not parsed, timestamp_ns is used instead.
+                "invalid",
+                {"name": name, "timestamp_ns": ts},
+            )
+        # Payloads of older releases only have the string timestamp.
+        driver._append_results(
+            "3",
+            "1",
+            "rpc-start",
+            None,
+            None,
+            None,
+            "2015-12-23T14:02:22.340000",
+        )
+
+        report = driver._parse_results()
+
+        self.assertEqual(3.0, report["info"]["finished"])
+        wsgi = report["children"][0]
+        self.assertEqual(
+            (0, 3.0), (wsgi["info"]["started"], wsgi["info"]["finished"])
+        )
+        rpc, db = wsgi["children"]
+        self.assertEqual(
+            (1.25, 1.75), (db["info"]["started"], db["info"]["finished"])
+        )
+        self.assertEqual(1.224, rpc["info"]["started"])
+        self.assertEqual(
+            {
+                "wsgi": {"count": 1, "duration": 3.0},
+                "db": {"count": 1, "duration": 0.5},
+                "rpc": {"count": 1, "duration": 0.0},
+            },
+            report["stats"],
+        )
+
+    def test_parse_results_span_records(self):
+        class G(base.Driver):
+            @classmethod
+            def get_name(cls):
+                return "g"
+
+        driver = base.get_driver("g://")
+        base_ns = 1450879342338776000
+        records: list[dict[str, Any]] = [
+            {
+                "name": "db-span",
+                "trace_id": "2",
+                "parent_id": "1",
+                "timestamp": "2015-12-23T14:02:22.340026",
+                "timestamp_ns": base_ns + 1_250_000,
+                "duration_ns": 500_000,
+                "info": {"host": "h", "db": {"statement": "SELECT 1"}},
+                "stop_info": {"etype": "OperationalError"},
+            },
+            {
+                "name": "wsgi-span",
+                "trace_id": "1",
+                "parent_id": "0",
+                "timestamp": "2015-12-23T14:02:22.338776",
+                "timestamp_ns": base_ns,
+                "duration_ns": 3_000_000,
+                "info": {"host": "h"},
+                "local_root": True,
+            },
+        ]
+        for record in records:
+            driver._append_results(
+                record["trace_id"],
+                record["parent_id"],
+                record["name"],
+                None,
+                None,
+                "h",
+                record["timestamp"],
+                record,
+            )
+
+        report = driver._parse_results()
+
+        self.assertEqual(3.0, report["info"]["finished"])
+        wsgi = report["children"][0]
+        self.assertEqual(
+            (0, 3.0), (wsgi["info"]["started"], wsgi["info"]["finished"])
+        )
+        self.assertEqual("None", wsgi["info"]["exception"])
+        db = wsgi["children"][0]
+        self.assertEqual(
+            (1.25, 1.75), (db["info"]["started"], db["info"]["finished"])
+        )
+        self.assertEqual("OperationalError", db["info"]["exception"])
+        self.assertEqual(
+            "SELECT 1",
+            db["info"]["meta.raw_payload.db-start"]["info"]["db"]["statement"],
+        )
+        self.assertEqual(
+            {"etype": "OperationalError", "host": "h"},
+            db["info"]["meta.raw_payload.db-stop"]["info"],
+        )
+        self.assertNotIn(
+            "duration_ns", db["info"]["meta.raw_payload.db-start"]
+        )
+
+    def test_parse_results_aggregated(self):
+        class H(base.Driver):
+            @classmethod
+            def get_name(cls):
+                return "h"
+
+        driver = base.get_driver("h://")
+        base_ns = 1450879342338776000
+        events: list[tuple[str, str, str, int, dict[str, Any]]] = [
+            ("wsgi-start", "1", "0", base_ns, {}),
+            ("db-start", "2", "1", base_ns + 1_000_000, {}),
+            ("db-stop", "2", "1", base_ns + 2_000_000, {}),
+            (
+                "db-start",
+                "3",
+                "1",
+                base_ns + 2_000_000,
+                {"aggregated": {"count": 40, "duration_ns": 800_000}},
+            ),
+            ("db-stop", "3", "1", base_ns + 2_800_000, {}),
+            ("wsgi-stop", "1", "0", base_ns + 3_000_000, {}),
+        ]
+        for name, trace_id, parent_id, ts, info in events:
+            driver._append_results(
+                trace_id,
+                parent_id,
+                name,
+                None,
+                None,
+                None,
+                "invalid",
+                {"name": name, "timestamp_ns": ts, "info": info},
+            )
+
+        report = driver._parse_results()
+
+        first, aggregated = report["children"][0]["children"]
+        self.assertNotIn("aggregated", first["info"])
+        self.assertEqual(40, aggregated["info"]["aggregated"])
+        self.assertEqual({"count": 41, "duration": 1.8}, report["stats"]["db"])
+
+    def test_parse_results_cpu_and_memory(self):
+        class C(base.Driver):
+            @classmethod
+            def get_name(cls):
+                return "c"
+
+        driver = base.get_driver("c://")
+        base_ns = 1450879342338776000
+        events: list[tuple[str, str, str, int, dict[str, Any]]] = [
+            ("wsgi-start", "1", "0", base_ns, {}),
+            ("db-start", "2", "1", base_ns + 1_000_000, {}),
+            (
+                "db-stop",
+                "2",
+                "1",
+                base_ns + 2_000_000,
+                {
+                    "cpu": {"cpu_ns": 200_000, "self_cpu_ns": 200_000},
+                    "memory": {"allocated": 100, "process_peak": 5000},
+                },
+            ),
+            ("db-start", "4", "1", base_ns + 2_500_000, {}),
+            (
+                "db-stop",
+                "4",
+                "1",
+                base_ns + 2_600_000,
+                {"memory": {"allocated": -40, "process_peak": 300}},
+            ),
+            (
+                "wsgi-stop",
+                "1",
+                "0",
+                base_ns + 3_000_000,
+                {"cpu": {"cpu_ns": 2_500_500, "self_cpu_ns": 2_300_500}},
+            ),
+            ("rpc-start", "3", "1", base_ns + 2_000_000, {}),
+            ("rpc-stop", "3", "1", base_ns + 2_500_000, {}),
+        ]
+        for name, trace_id, parent_id, ts, info in events:
+            driver._append_results(
+                trace_id,
+                parent_id,
+                name,
+                None,
+                None,
+                None,
+                "invalid",
+                {"name": name, "timestamp_ns": ts, "info": info},
+            )
+
+        report = driver._parse_results()
+
+        wsgi = report["children"][0]
+        self.assertEqual(
+            (2.5, 2.3), (wsgi["info"]["cpu"], wsgi["info"]["self_cpu"])
+        )
+        self.assertNotIn("cpu", wsgi["children"][1]["info"])
+        self.assertEqual(
+            (-40, 300),
+            (
+                wsgi["children"][2]["info"]["memory_allocated"],
+                wsgi["children"][2]["info"]["memory_process_peak"],
+            ),
+        )
+        self.assertEqual(
+            {
+                "wsgi": {
+                    "count": 1,
+                    "duration": 3.0,
+                    "cpu": 2.5,
+                    "self_cpu": 2.3,
+                },
+                "db": {
+                    "count": 2,
+                    "duration": 1.1,
+                    "cpu": 0.2,
+                    "self_cpu": 0.2,
+                    "memory_allocated": 60,
+                    "memory_process_peak": 5000,
+                },
+                "rpc": {"count": 1, "duration": 0.5},
+            },
+            report["stats"],
+        )
+
+    def test_parse_results_counters(self):
+        class K(base.Driver):
+            @classmethod
+            def get_name(cls):
+                return "k"
+
+        driver = base.get_driver("k://")
+        base_ns = 1450879342338776000
+        events: list[tuple[str, str, str, int, dict[str, Any]]] = [
+            ("wsgi-start", "1", "0", base_ns, {}),
+            ("db-start", "2", "1", base_ns, {}),
+            (
+                "db-stop",
+                "2",
+                "1",
+                base_ns + 1_000_000,
+                {"counters": {"rows": 3}},
+            ),
+            ("db-start", "3", "1", base_ns + 1_000_000, {}),
+            (
+                "db-stop",
+                "3",
+                "1",
+                base_ns + 2_000_000,
+                {"counters": {"rows": 2, "retries": 1}},
+            ),
+            ("wsgi-stop", "1", "0", base_ns + 3_000_000, {}),
+        ]
+        for name, trace_id, parent_id, ts, info in events:
+            driver._append_results(
+                trace_id,
+                parent_id,
+                name,
+                None,
+                None,
+                None,
+                "invalid",
+                {"name": name, "timestamp_ns": ts, "info": info},
+            )
+
+        report = driver._parse_results()
+
+        self.assertEqual(
+            {"rows": 3},
+            report["children"][0]["children"][0]["info"]["counters"],
+        )
+        self.assertEqual(
+            {"rows": 5, "retries": 1}, report["stats"]["db"]["counters"]
+        )
+        self.assertNotIn("counters", report["stats"]["wsgi"])
+
+    def test_parse_results_gc(self):
+        class D(base.Driver):
+            @classmethod
+            def get_name(cls):
+                return "d"
+
+        driver = base.get_driver("d://")
+        base_ns = 1450879342338776000
+        first = {"generation": 2, "pid": 10, "collection": 1}
+        second = {"generation": 0, "pid": 10, "collection": 2}
+        events: list[tuple[str, str, str, int, dict[str, Any]]] = [
+            ("wsgi-start", "1", "0", base_ns, {}),
+            ("rpc-start", "2", "1", base_ns, {}),
+            # NOTE: The same collection, recorded by two traced threads.
+            ("gc-start", "3", "1", base_ns + 1_000_000, {"gc": first}),
+            ("gc-stop", "3", "1", base_ns + 1_500_000, {}),
+            ("gc-start", "4", "2", base_ns + 1_000_000, {"gc": first}),
+            ("gc-stop", "4", "2", base_ns + 1_500_000, {}),
+            ("gc-start", "5", "1", base_ns + 2_000_000, {"gc": second}),
+            ("gc-stop", "5", "1", base_ns + 2_100_000, {}),
+            ("rpc-stop", "2", "1", base_ns + 2_500_000, {}),
+            ("wsgi-stop", "1", "0", base_ns + 3_000_000, {}),
+        ]
+        for name, trace_id, parent_id, ts, info in events:
+            driver._append_results(
+                trace_id,
+                parent_id,
+                name,
+                None,
+                None,
+                "h",
+                "invalid",
+                {"name": name, "timestamp_ns": ts, "info": info},
+            )
+
+        report = driver._parse_results()
+
+        self.assertEqual(0.6, report["info"]["gc"])
+        self.assertEqual({"count": 3, "duration": 1.1}, report["stats"]["gc"])
+
+    def test_is_error(self):
+        self.assertFalse(base.Driver._is_error({"info": {"host": "h"}}))
+        self.assertFalse(base.Driver._is_error({}))
+        self.assertTrue(base.Driver._is_error({"info": {"etype": "E"}}))
+        self.assertTrue(
+            base.Driver._is_error({"info": {}, "stop_info": {"etype": "E"}})
+        )
@@ -28,6 +28,12 @@ class ElasticsearchTestCase(test.TestCase):
         self.elasticsearch.project = "project"
         self.elasticsearch.service = "service"
 
+    def test_after_fork(self):
+        client = self.elasticsearch.client
+        self.elasticsearch.after_fork()
+
+        self.assertIsNot(client, self.elasticsearch.client)
+
     def test_init_and_notify(self):
         self.elasticsearch.client = mock.MagicMock()
         self.elasticsearch.client.reset_mock()
@@ -44,6 +50,40 @@ class ElasticsearchTestCase(test.TestCase):
             body=info,
         )
 
+    def test_notify_batch(self):
+        self.elasticsearch.client = mock.MagicMock()
+        self.elasticsearch.filter_error_trace = True
+        events = [
+            {"base_id": "1", "timestamp": "t1", "info": {}},
+            {"base_id": "1", "timestamp": "t2", "info": {"etype": "E"}},
+        ]
+
+        self.elasticsearch.notify_batch(events)
+
+        action = {
+            "index": {
+                "_index": "osprofiler-notifications",
+                "_type": "notification",
+            }
+        }
+        error_action = {
+            "index": {
+                "_index": "osprofiler-notifications-error",
+                "_type": "notification",
+            }
+        }
+        self.elasticsearch.client.bulk.assert_called_once_with(
+            body=[
+                action,
+                dict(events[0], project="project", service="service"),
+                action,
+                dict(events[1], project="project", service="service"),
+                error_action,
+                {"base_id": "1", "timestamp": "t2"},
+            ]
+        )
+        self.elasticsearch.client.index.assert_not_called()
+
     def test_get_empty_report(self):
         self.elasticsearch.client = mock.MagicMock()
         self.elasticsearch.client.search = mock.MagicMock(
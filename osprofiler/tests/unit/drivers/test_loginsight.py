@@ -118,6 +118,24 @@ class LogInsightDriverTestCase(test.TestCase):
         }
         self._client.send_event.assert_called_once_with(exp_event)
 
+    @mock.patch("json.dumps")
+    def test_notify_batch(self, dumps):
+        dumps.return_value = mock.sentinel.json_str
+        traces = [self._create_start_trace(), self._create_stop_trace()]
+
+        self._driver.notify_batch(traces)
+
+        self._client.send_events.assert_called_once()
+        events = self._client.send_events.call_args[0][0]
+        self.assertEqual(2, len(events))
+        self.assertEqual(
+            {"name": "name", "content": "wsgi-start"}, events[0]["fields"][4]
+        )
+        self.assertEqual(
+            {"name": "name", "content": "wsgi-stop"}, events[1]["fields"][4]
+        )
+        self._client.send_event.assert_not_called()
+
     @mock.patch.object(loginsight.LogInsightDriver, "_append_results")
     @mock.patch.object(loginsight.LogInsightDriver, "_parse_results")
     def test_get_report(self, parse_results, append_results):
@@ -27,6 +27,13 @@ class MongoDBParserTestCase(test.TestCase):
     def test_build_empty_tree(self):
         self.assertEqual([], self.mongodb._build_tree({}))
 
+    def test_after_fork(self):
+        db = self.mongodb.db
+        self.mongodb.after_fork()
+
+        self.assertIsNot(db.client, self.mongodb.db.client)
+        self.assertEqual("osprofiler", self.mongodb.db.name)
+
     def test_build_complex_tree(self):
         test_input = {
             "2": {"parent_id": "0", "trace_id": "2", "info": {"started": 1}},
@@ -108,6 +115,23 @@ class MongoDBParserTestCase(test.TestCase):
         result = self.mongodb._build_tree(test_input)
         self.assertEqual(expected_output, result)
 
+    def test_notify_batch(self):
+        self.mongodb.db = mock.MagicMock()
+        self.mongodb.project = "project"
+        self.mongodb.service = "service"
+        events = [{"a": 1}, {"a": 2}]
+
+        self.mongodb.notify_batch(events)
+
+        self.mongodb.db.profiler.insert_many.assert_called_once_with(
+            [
+                {"a": 1, "project": "project", "service": "service"},
+                {"a": 2, "project": "project", "service": "service"},
+            ],
+            ordered=False,
+        )
+        self.mongodb.db.profiler.insert_one.assert_not_called()
+
     def test_get_report_empty(self):
         self.mongodb.db = mock.MagicMock()
         self.mongodb.db.profiler.find.return_value = []
@@ -213,7 +237,7 @@ class MongoDBParserTestCase(test.TestCase):
                         {
                             "children": [],
                             "info": {
-                                "finished": 76,
+                                "finished": 76.71,
                                 "host": "ubuntu",
                                 "meta.raw_payload.db-start": {
                                     "base_id": "7253ca8c-33b3-4f84-b4f1-f5a4311ddfa4",  # noqa: E501
@@ -250,7 +274,7 @@ class MongoDBParserTestCase(test.TestCase):
                                 "name": "db",
                                 "project": "keystone",
                                 "service": "main",
-                                "started": 56,
+                                "started": 56.589,
                                 "exception": "None",
                             },
                             "parent_id": "06320327-2c2c-45ae-923a-515de890276a",  # noqa: E501
@@ -292,7 +316,7 @@ class MongoDBParserTestCase(test.TestCase):
                 {
                     "children": [],
                     "info": {
-                        "finished": 41,
+                        "finished": 41.629,
                         "host": "ubuntu",
                         "meta.raw_payload.wsgi-stop": {
                             "base_id": "7253ca8c-33b3-4f84-b4f1-f5a4311ddfa4",
@@ -311,7 +335,7 @@ class MongoDBParserTestCase(test.TestCase):
                         "name": "wsgi",
                         "project": "keystone",
                         "service": "main",
-                        "started": 41,
+                        "started": 41.629,
                         "exception": "None",
                     },
                     "parent_id": "7253ca8c-33b3-4f84-b4f1-f5a4311ddfa4",
@@ -320,7 +344,7 @@ class MongoDBParserTestCase(test.TestCase):
                 {
                     "children": [],
                     "info": {
-                        "finished": 88,
+                        "finished": 88.668,
                         "host": "ubuntu",
                         "meta.raw_payload.wsgi-start": {
                             "base_id": "7253ca8c-33b3-4f84-b4f1-f5a4311ddfa4",
@@ -346,20 +370,20 @@ class MongoDBParserTestCase(test.TestCase):
                         "name": "wsgi",
                         "project": "keystone",
                         "service": "main",
-                        "started": 88,
+                        "started": 88.668,
                     },
                     "parent_id": "7253ca8c-33b3-4f84-b4f1-f5a4311ddfa4",
                     "trace_id": "016c97fd-87f3-40b2-9b55-e431156b694b",
                 },
             ],
             "info": {
-                "finished": 88,
+                "finished": 88.668,
                 "name": "total",
                 "started": 0,
-                "last_trace_started": 88,
+                "last_trace_started": 88.668,
             },
             "stats": {
-                "db": {"count": 1, "duration": 20},
+                "db": {"count": 1, "duration": 20.121},
                 "wsgi": {"count": 3, "duration": 0},
             },
         }
@@ -12,13 +12,16 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+from typing import Any
 from unittest import mock
 
 from oslo_config import cfg
 
 from osprofiler import _utils as utils
 from osprofiler.drivers import otlp
+from osprofiler import notifier
 from osprofiler import opts
+from osprofiler import profiler
 from osprofiler.tests import test
 
 
@@ -28,7 +31,7 @@ class OTLPTestCase(test.TestCase):
 
         opts.set_defaults(cfg.CONF)
 
-        self.payload_start = {
+        self.payload_start: dict[str, Any] = {
             "name": "api-start",
             "base_id": "4e3e0ec6-2938-40b1-8504-09eb1d4b0dee",
             "trace_id": "1c089ea8-28fe-4f3d-8c00-f6daa2bc32f1",
@@ -37,7 +40,7 @@ class OTLPTestCase(test.TestCase):
             "info": {"host": "test"},
         }
 
-        self.root_span_payload_start = {
+        self.root_span_payload_start: dict[str, Any] = {
             "name": "api-start",
             "base_id": "4e3e0ec6-2938-40b1-8504-09eb1d4b0dee",
             "trace_id": "1c089ea8-28fe-4f3d-8c00-f6daa2bc32f1",
@@ -46,7 +49,7 @@ class OTLPTestCase(test.TestCase):
             "info": {"host": "test"},
         }
 
-        self.payload_stop = {
+        self.payload_stop: dict[str, Any] = {
             "name": "api-stop",
             "base_id": "4e3e0ec6-2938-40b1-8504-09eb1d4b0dee",
             "trace_id": "1c089ea8-28fe-4f3d-8c00-f6daa2bc32f1",
@@ -69,7 +72,7 @@ class OTLPTestCase(test.TestCase):
     def test_notify_start_with_parent_span(self):
         self.driver.notify(self.payload_start)
         self.assertEqual(1, len(self.driver.spans))
-        result_span = self.driver.spans[0]
+        result_span = self.driver.spans[self.payload_start["trace_id"]]
         self.assertEqual(
             utils.uuid_to_int128(str(self.payload_start["base_id"])),
             result_span._parent.trace_id,
@@ -82,21 +85,91 @@ class OTLPTestCase(test.TestCase):
     def test_notify_start_with_root_span(self):
         self.driver.notify(self.root_span_payload_start)
         self.assertEqual(1, len(self.driver.spans))
-        result_span = self.driver.spans[0]
+        result_span = self.driver.spans[
+            self.root_span_payload_start["trace_id"]
+        ]
         self.assertIsNone(result_span._parent)
 
     def test_notify_stop(self):
         mock_end = mock.MagicMock()
         self.driver.notify(self.payload_start)
-        self.driver.spans[0].end = mock_end
+        self.driver.spans[self.payload_start["trace_id"]].end = mock_end
         self.driver.notify(self.payload_stop)
         mock_end.assert_called_once()
 
+    def test_notify_with_timestamp_ns(self):
+        self.payload_start["timestamp_ns"] = 1525321911781381123
+        self.payload_stop["timestamp_ns"] = 1525321911791381123
+        mock_end = mock.MagicMock()
+        self.driver.notify(self.payload_start)
+        self.assertEqual(
+            1525321911781381123,
+            self.driver.spans[self.payload_start["trace_id"]].start_time,
+        )
+        self.driver.spans[self.payload_start["trace_id"]].end = mock_end
+        self.driver.notify(self.payload_stop)
+        mock_end.assert_called_once_with(end_time=1525321911791381123)
+
+    def test_notify_span_record(self):
+        payload = dict(
+            self.payload_start,
+            name="api-span",
+            timestamp_ns=1525321911781381123,
+            duration_ns=10000000,
+            stop_info={"etype": "E", "message": "failed"},
+        )
+        with mock.patch.object(self.driver, "_finish_span") as mock_finish:
+            self.driver.notify(payload)
+
+        self.assertEqual(0, len(self.driver.spans))
+        span, info, end_time = mock_finish.call_args[0]
+        self.assertEqual("api", span.name)
+        self.assertEqual(1525321911781381123, span.start_time)
+        self.assertEqual({"etype": "E", "message": "failed"}, info)
+        self.assertEqual(1525321911791381123, end_time)
+
+    def test_notify_stop_with_events_and_counters(self):
+        self.payload_stop["info"] = {
+            "host": "test",
+            "events": [
+                {"name": "retry", "timestamp_ns": 1525321911785381123},
+                {
+                    "name": "lock",
+                    "timestamp_ns": 1525321911786381123,
+                    "attrs": {"name": "db", "waiters": [1, 2]},
+                },
+            ],
+            "counters": {"rows": 5},
+        }
+        self.driver.notify(self.payload_start)
+        span = self.driver.spans[self.payload_start["trace_id"]]
+        span.add_event = mock.MagicMock()
+        span.set_attribute = mock.MagicMock()
+        self.driver.notify(self.payload_stop)
+
+        span.add_event.assert_has_calls(
+            [
+                mock.call("retry", {}, timestamp=1525321911785381123),
+                mock.call(
+                    "lock",
+                    {"name": "db", "waiters": "[1, 2]"},
+                    timestamp=1525321911786381123,
+                ),
+            ]
+        )
+        span.set_attribute.assert_any_call("counter.rows", 5)
+
+    def test_after_fork(self):
+        self.driver.notify(self.payload_start)
+        self.driver.after_fork()
+
+        self.assertEqual(0, len(self.driver.spans))
+
     def test_notify_stop_with_db_result(self):
         self.payload_stop["info"] = {"host": "test", "db": {"result": "()"}}
         mock_end = mock.MagicMock()
         self.driver.notify(self.payload_start)
-        self.driver.spans[0].end = mock_end
+        self.driver.spans[self.payload_start["trace_id"]].end = mock_end
         self.driver.notify(self.payload_stop)
         mock_end.assert_called_once()
 
@@ -112,15 +185,78 @@ class OTLPTestCase(test.TestCase):
         }
         mock_end = mock.MagicMock()
         self.driver.notify(self.payload_start)
-        self.driver.spans[0].end = mock_end
+        self.driver.spans[self.payload_start["trace_id"]].end = mock_end
         self.driver.notify(self.payload_stop)
         mock_end.assert_called_once()
 
+    def test_notify_aggregated_error(self):
+        profiler.set_aggregation(min_calls=1, max_duration=1.0)
+        self.addCleanup(profiler.set_aggregation)
+        notifier.set(self.driver.notify)
+        self.addCleanup(notifier.set, notifier._noop_notifier)
+        profiler.init(
+            "secret",
+            base_id=self.payload_start["base_id"],
+            parent_id=self.payload_start["parent_id"],
+        )
+        self.addCleanup(profiler.clean)
+
+        @profiler.trace("hot")
+        def hot():
+            raise ValueError("boom")
+
+        with mock.patch.object(
+            self.driver, "_finish_span", wraps=self.driver._finish_span
+        ) as mock_finish:
+            with profiler.Trace("parent"):
+                for _ in range(3):
+                    self.assertRaises(ValueError, hot)
+
+        errors = [
+            call[0][1]
+            for call in mock_finish.call_args_list
+            if "aggregated calls" in call[0][1].get("message", "")
+        ]
+        self.assertEqual(1, len(errors))
+        self.assertEqual("ValueError", errors[0]["etype"])
+
+    def test_notify_span_handles_out_of_order(self):
+        notifier.set(self.driver.notify)
+        self.addCleanup(notifier.set, notifier._noop_notifier)
+        profiler.init(
+            "secret",
+            base_id=self.payload_start["base_id"],
+            parent_id=self.payload_start["parent_id"],
+        )
+        self.addCleanup(profiler.clean)
+
+        with mock.patch.object(
+            self.driver, "_finish_span", wraps=self.driver._finish_span
+        ) as mock_finish:
+            first = profiler.start_span("first")
+            second = profiler.start_span("second")
+            first.finish(info={"which": "first"})
+            second.finish(info={"which": "second"})
+
+        self.assertEqual(
+            [("first", "first"), ("second", "second")],
+            [
+                (call[0][0].name, call[0][1]["which"])
+                for call in mock_finish.call_args_list
+            ],
+        )
+        self.assertEqual({}, self.driver.spans)
+
+    def test_notify_stop_unknown_span(self):
+        with mock.patch.object(self.driver, "_finish_span") as mock_finish:
+            self.driver.notify(self.payload_stop)
+        mock_finish.assert_not_called()
+
     def test_notify_stop_without_function_result(self):
         self.payload_stop["info"] = {"host": "test", "function": {}}
         mock_end = mock.MagicMock()
         self.driver.notify(self.payload_start)
-        self.driver.spans[0].end = mock_end
+        self.driver.spans[self.payload_start["trace_id"]].end = mock_end
         self.driver.notify(self.payload_stop)
         mock_end.assert_called_once()
 
@@ -133,7 +269,7 @@ class OTLPTestCase(test.TestCase):
         }
         mock_end = mock.MagicMock()
         self.driver.notify(self.payload_start)
-        self.driver.spans[0].end = mock_end
+        self.driver.spans[self.payload_start["trace_id"]].end = mock_end
         self.driver.notify(self.payload_stop)
         mock_end.assert_called_once()
 
@@ -31,6 +31,15 @@ class RedisParserTestCase(test.TestCase):
     def test_build_empty_tree(self):
         self.assertEqual([], self.redisdb._build_tree({}))
 
+    def test_after_fork(self):
+        db = self.redisdb.db
+        self.redisdb.after_fork()
+
+        self.assertIsNot(db, self.redisdb.db)
+        self.assertIsNot(db.connection_pool, self.redisdb.db.connection_pool)
+        kwargs = self.redisdb.db.connection_pool.connection_kwargs
+        self.assertEqual(("localhost", 6379), (kwargs["host"], kwargs["port"]))
+
     def test_build_complex_tree(self):
         test_input = {
             "2": {"parent_id": "0", "trace_id": "2", "info": {"started": 1}},
@@ -112,6 +121,44 @@ class RedisParserTestCase(test.TestCase):
         result = self.redisdb._build_tree(test_input)
         self.assertEqual(expected_output, result)
 
+    def test_notify_batch(self):
+        self.redisdb.db = mock.MagicMock()
+        self.redisdb.filter_error_trace = True
+        self.redisdb.project = "project"
+        self.redisdb.service = "service"
+        pipe = self.redisdb.db.pipeline.return_value
+        events = [
+            {"base_id": "1", "timestamp": "t1", "info": {}},
+            {"base_id": "1", "timestamp": "t2", "info": {"etype": "E"}},
+        ]
+
+        self.redisdb.notify_batch(events)
+
+        self.redisdb.db.pipeline.assert_called_once_with(transaction=False)
+        self.assertEqual(
+            [
+                mock.call(
+                    "osprofiler_opt:1",
+                    jsonutils.dumps(
+                        dict(events[0], project="project", service="service")
+                    ),
+                ),
+                mock.call(
+                    "osprofiler_opt:1",
+                    jsonutils.dumps(
+                        dict(events[1], project="project", service="service")
+                    ),
+                ),
+            ],
+            pipe.lpush.call_args_list,
+        )
+        pipe.set.assert_called_once_with(
+            "osprofiler_error:1",
+            jsonutils.dumps({"base_id": "1", "timestamp": "t2"}),
+        )
+        pipe.execute.assert_called_once_with()
+        self.redisdb.db.lpush.assert_not_called()
+
     def test_get_report_empty(self):
         self.redisdb.db = mock.MagicMock()
         self.redisdb.db.scan_iter.return_value = []
@@ -225,7 +272,7 @@ class RedisParserTestCase(test.TestCase):
                         {
                             "children": [],
                             "info": {
-                                "finished": 76,
+                                "finished": 76.71,
                                 "host": "ubuntu",
                                 "meta.raw_payload.db-start": {
                                     "base_id": "7253ca8c-33b3-4f84-b4f1-f5a4311ddfa4",  # noqa: E501
@@ -262,7 +309,7 @@ class RedisParserTestCase(test.TestCase):
                                 "name": "db",
                                 "project": "keystone",
                                 "service": "main",
-                                "started": 56,
+                                "started": 56.589,
                                 "exception": "None",
                             },
                             "parent_id": "06320327-2c2c-45ae-923a-515de890276a",  # noqa: E501
@@ -304,7 +351,7 @@ class RedisParserTestCase(test.TestCase):
                 {
                     "children": [],
                     "info": {
-                        "finished": 41,
+                        "finished": 41.629,
                         "host": "ubuntu",
                         "meta.raw_payload.wsgi-stop": {
                             "base_id": "7253ca8c-33b3-4f84-b4f1-f5a4311ddfa4",
@@ -323,7 +370,7 @@ class RedisParserTestCase(test.TestCase):
                         "name": "wsgi",
                         "project": "keystone",
                         "service": "main",
-                        "started": 41,
+                        "started": 41.629,
                         "exception": "None",
                     },
                     "parent_id": "7253ca8c-33b3-4f84-b4f1-f5a4311ddfa4",
@@ -332,7 +379,7 @@ class RedisParserTestCase(test.TestCase):
                 {
                     "children": [],
                     "info": {
-                        "finished": 88,
+                        "finished": 88.668,
                         "host": "ubuntu",
                         "meta.raw_payload.wsgi-start": {
                             "base_id": "7253ca8c-33b3-4f84-b4f1-f5a4311ddfa4",
@@ -358,20 +405,20 @@ class RedisParserTestCase(test.TestCase):
                         "name": "wsgi",
                         "project": "keystone",
                         "service": "main",
-                        "started": 88,
+                        "started": 88.668,
                     },
                     "parent_id": "7253ca8c-33b3-4f84-b4f1-f5a4311ddfa4",
                     "trace_id": "016c97fd-87f3-40b2-9b55-e431156b694b",
                 },
             ],
             "info": {
-                "finished": 88,
+                "finished": 88.668,
                 "name": "total",
                 "started": 0,
-                "last_trace_started": 88,
+                "last_trace_started": 88.668,
             },
             "stats": {
-                "db": {"count": 1, "duration": 20},
+                "db": {"count": 1, "duration": 20.121},
                 "wsgi": {"count": 3, "duration": 0},
             },
         }
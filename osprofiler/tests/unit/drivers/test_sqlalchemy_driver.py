@@ -0,0 +1,108 @@
+# Copyright 2026 OpenStack Foundation.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import os
+import tempfile
+
+import sqlalchemy
+
+from osprofiler.drivers.sqlalchemy_driver import SQLAlchemyDriver
+from osprofiler.tests import test
+
+
+class SQLAlchemyDriverTestCase(test.TestCase):
+    def setUp(self):
+        super().setUp()
+        fd, path = tempfile.mkstemp()
+        os.close(fd)
+        self.addCleanup(os.unlink, path)
+        self.url = f"sqlite:///{path}"
+        self.driver = self._driver()
+
+    def _driver(self):
+        driver = SQLAlchemyDriver(self.url, project="p", service="s")
+        self.addCleanup(driver._engine.dispose)
+        return driver
+
+    def test_get_report_span_records(self):
+        base_ns = 1450879342338776000
+        self.driver.notify_batch(
+            [
+                {
+                    "name": "db-span",
+                    "base_id": "b",
+                    "trace_id": "2",
+                    "parent_id": "1",
+                    "timestamp": "2015-12-23T14:02:22.340026",
+                    "timestamp_ns": base_ns + 1_250_000,
+                    "duration_ns": 500_000,
+                    "info": {"host": "h", "db": {"statement": "SELECT 1"}},
+                    "stop_info": {"etype": "OperationalError"},
+                },
+                {
+                    "name": "wsgi-span",
+                    "base_id": "b",
+                    "trace_id": "1",
+                    "parent_id": "b",
+                    "timestamp": "2015-12-23T14:02:22.338776",
+                    "timestamp_ns": base_ns,
+                    "duration_ns": 3_000_000,
+                    "info": {"host": "h"},
+                    "local_root": True,
+                },
+            ]
+        )
+
+        # NOTE: Read by another driver, e.g. of the osprofiler command.
+        reader = self._driver()
+        report = reader.get_report("b")
+
+        self.assertEqual(3.0, report["info"]["finished"])
+        wsgi = report["children"][0]
+        self.assertEqual("wsgi", wsgi["info"]["name"])
+        self.assertEqual(
+            (0, 3.0), (wsgi["info"]["started"], wsgi["info"]["finished"])
+        )
+        db = wsgi["children"][0]
+        self.assertEqual(
+            (1.25, 1.75), (db["info"]["started"], db["info"]["finished"])
+        )
+        self.assertEqual("OperationalError", db["info"]["exception"])
+        self.assertEqual(
+            [{"base_id": "b", "timestamp": "2015-12-23T14:02:22.340026"}],
+            reader.list_traces(),
+        )
+
+    def test_notify_committed(self):
+        self.driver.notify(
+            {"name": "wsgi-start", "base_id": "b", "trace_id": "1"}
+        )
+        self.driver.notify_batch(
+            [
+                {"name": "wsgi-stop", "base_id": "b", "trace_id": "1"},
+                {"name": "db-start", "base_id": "b", "trace_id": "2"},
+            ]
+        )
+
+        # NOTE: Another connection only sees committed rows.
+        engine = sqlalchemy.create_engine(self.url)
+        self.addCleanup(engine.dispose)
+        with engine.connect() as conn:
+            rows = conn.execute(
+                sqlalchemy.text("SELECT name FROM data ORDER BY id")
+            ).fetchall()
+        self.assertEqual(
+            ["wsgi-start", "wsgi-stop", "db-start"], [row[0] for row in rows]
+        )
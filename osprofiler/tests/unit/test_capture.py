@@ -0,0 +1,141 @@
+# Copyright 2026 OpenStack Foundation.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+from typing import Any
+
+from osprofiler import capture
+from osprofiler.tests import test
+
+
+class Instance:
+    def __init__(self, id):
+        self.id = id
+
+    def __repr__(self):
+        return f"Instance({self.id})"
+
+
+class FormatterTestCase(test.TestCase):
+    def test_small_values_unchanged(self):
+        formatter = capture.Formatter()
+        for value in [(1, "a"), (1,), {"b": 2, "a": [1, None]}, "x", 10]:
+            self.assertEqual(repr(value), formatter.format(value))
+
+    def test_long_values_truncated(self):
+        formatter = capture.Formatter(max_length=12)
+        self.assertEqual("'xxx...xxxx'", formatter.format("x" * 20))
+        self.assertEqual(
+            "['xxx...x...", formatter.format(["x" * 20, "y" * 20])
+        )
+        self.assertEqual(
+            "{'a': 1, ...", formatter.format(dict.fromkeys("abcdef", 1))
+        )
+
+    def test_max_length(self):
+        formatter = capture.Formatter(max_length=20)
+        self.assertEqual(20, len(formatter.format("x" * 1000)))
+        self.assertEqual(20, len(formatter.format(list(range(1000)))))
+        self.assertEqual(20, len(formatter.format(Instance("y" * 1000))))
+
+    def test_max_depth(self):
+        formatter = capture.Formatter(max_depth=2)
+        self.assertEqual("([[...]],)", formatter.format(([[1]],)))
+        self.assertEqual(
+            "({'a': {...}},)", formatter.format(({"a": {"b": 1}},))
+        )
+
+    def test_max_items(self):
+        formatter = capture.Formatter(max_items=2)
+        self.assertEqual("[1, 2, ...]", formatter.format([1, 2, 3]))
+        self.assertEqual(
+            "{'b': 1, 'a': 2, ...}", formatter.format({"b": 1, "a": 2, "c": 3})
+        )
+
+    def test_invalid_limits(self):
+        self.assertRaises(ValueError, capture.Formatter, max_length=0)
+        self.assertRaises(ValueError, capture.Formatter, max_depth=0)
+        self.assertRaises(ValueError, capture.Formatter, max_items=0)
+
+    def test_register_formatter(self):
+        class Server(Instance):
+            pass
+
+        capture.register_formatter(Instance, lambda i: f"<Instance {i.id}>")
+        self.addCleanup(capture.unregister_formatter, Instance)
+        formatter = capture.Formatter(max_length=15)
+
+        self.assertEqual("(<Instance 1>,)", formatter.format((Instance(1),)))
+        self.assertEqual("<Instance 2>", formatter.format(Server(2)))
+        self.assertEqual("<Instance 12...", formatter.format(Instance(12345)))
+
+    def test_register_formatter_builtin(self):
+        capture.register_formatter(int, lambda i: f"<{i:x}>")
+        self.addCleanup(capture.unregister_formatter, int)
+        capture.register_formatter(tuple, lambda t: "<tuple>")
+        self.addCleanup(capture.unregister_formatter, tuple)
+        formatter = capture.Formatter()
+
+        self.assertEqual("<ff>", formatter.format(255))
+        self.assertEqual("[<ff>, 'a']", formatter.format([255, "a"]))
+        self.assertEqual("<tuple>", formatter.format((1,)))
+        capture.unregister_formatter(int)
+        self.assertEqual("[255, 'a']", formatter.format([255, "a"]))
+
+    def test_failing_formatter(self):
+        def fail(value):
+            raise ValueError()
+
+        capture.register_formatter(Instance, fail)
+        self.addCleanup(capture.unregister_formatter, Instance)
+
+        self.assertEqual(
+            "Instance(1)", capture.Formatter().format(Instance(1))
+        )
+
+
+class LazyReprTestCase(test.TestCase):
+    def test_formatted_once(self):
+        calls = []
+
+        class Value:
+            def __repr__(self):
+                calls.append(1)
+                return "value"
+
+        lazy = capture.LazyRepr(Value())
+        self.assertEqual([], calls)
+        self.assertEqual("value", str(lazy))
+        self.assertEqual("value", lazy)
+        self.assertEqual([1], calls)
+        self.assertIsNone(lazy._value)
+
+    def test_current_formatter(self):
+        capture.set(capture.Formatter(max_length=8))
+        self.addCleanup(capture.set, capture.Formatter())
+        self.assertEqual("'x...xx'", str(capture.LazyRepr("x" * 10)))
+
+    def test_resolve(self):
+        info: dict[str, Any] = {
+            "host": "h",
+            "function": {
+                "args": capture.LazyRepr((1,)),
+                "kwargs": capture.LazyRepr({}),
+            },
+        }
+        capture.resolve(info)
+        self.assertEqual(
+            {"host": "h", "function": {"args": "(1,)", "kwargs": "{}"}}, info
+        )
+        self.assertIs(str, type(info["function"]["args"]))
@@ -0,0 +1,151 @@
+# Copyright 2026 OpenStack Foundation.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+from concurrent import futures
+import gc
+import threading
+from unittest import mock
+
+from osprofiler import gctrace
+from osprofiler import profiler
+from osprofiler.tests import test
+
+
+class GCTraceTestCase(test.TestCase):
+    def setUp(self):
+        super().setUp()
+        gctrace.set_enabled(True)
+        self.addCleanup(gctrace.set_enabled, False)
+        # NOTE: Only the explicit collections of the tests are recorded.
+        if gc.isenabled():
+            gc.disable()
+            self.addCleanup(gc.enable)
+
+    def test_hook_installed_while_tracing(self):
+        prof = profiler._Profiler("secret", base_id="1", parent_id="2")
+        self.assertNotIn(gctrace._callback, gc.callbacks)
+
+        prof.start("wsgi")
+        self.assertIn(gctrace._callback, gc.callbacks)
+        prof.start("db")
+        prof.stop()
+        self.assertIn(gctrace._callback, gc.callbacks)
+        prof.stop()
+        self.assertNotIn(gctrace._callback, gc.callbacks)
+
+    def test_disabled(self):
+        gctrace.set_enabled(False)
+        prof = profiler._Profiler("secret", base_id="1", parent_id="2")
+
+        prof.start("wsgi")
+        self.assertNotIn(gctrace._callback, gc.callbacks)
+        prof.stop()
+
+    def test_unsampled_trace(self):
+        prof = profiler._Profiler(
+            "secret", base_id="1", parent_id="2", sampled=False
+        )
+
+        prof.start("wsgi")
+        self.assertNotIn(gctrace._callback, gc.callbacks)
+        prof.stop()
+
+    def test_after_fork(self):
+        prof = profiler._Profiler("secret", base_id="1", parent_id="2")
+        prof.start("wsgi")
+        # NOTE: A thread of the parent, it doesn't exist in the child.
+        gctrace._profilers[-1] = profiler._Profiler("secret")
+
+        gctrace._after_fork()
+        self.assertEqual({threading.get_ident(): prof}, gctrace._profilers)
+        self.assertIn(gctrace._callback, gc.callbacks)
+        prof.stop()
+        self.assertNotIn(gctrace._callback, gc.callbacks)
+
+    @mock.patch("osprofiler.profiler.notifier.notify")
+    def test_collection_recorded(self, mock_notify):
+        prof = profiler._Profiler("secret", base_id="1", parent_id="2")
+
+        prof.start("wsgi")
+        prof.start("db")
+        db_id = prof.get_id()
+        gc.collect(1)
+        prof.stop()
+        prof.stop()
+        sent = [call[0][0] for call in mock_notify.call_args_list]
+
+        self.assertEqual(
+            ["wsgi-start", "db-start", "gc-start", "gc-stop", "db-stop"]
+            + ["wsgi-stop"],
+            [info["name"] for info in sent],
+        )
+        gc_start, gc_stop = sent[2], sent[3]
+        self.assertEqual(db_id, gc_start["parent_id"])
+        self.assertEqual(1, gc_start["info"]["gc"]["generation"])
+        self.assertIn("collected", gc_start["info"]["gc"])
+        self.assertGreaterEqual(
+            gc_stop["timestamp_ns"], gc_start["timestamp_ns"]
+        )
+        self.assertEqual({}, prof._gc_pauses)
+
+    def test_every_traced_thread(self):
+        prof = profiler._Profiler("secret", base_id="1", parent_id="2")
+        other = profiler._Profiler("secret", base_id="3", parent_id="4")
+        started, collected = threading.Event(), threading.Event()
+
+        def run():
+            other.start("rpc")
+            started.set()
+            collected.wait(5)
+
+        thread = threading.Thread(target=run)
+        thread.start()
+        self.addCleanup(thread.join)
+        self.addCleanup(collected.set)
+        started.wait(5)
+
+        prof.start("wsgi")
+        gc.collect()
+        collected.set()
+        thread.join()
+
+        (pause,) = prof._gc_pauses[prof.get_id()]
+        (other_pause,) = other._gc_pauses[other.get_id()]
+        self.assertIs(pause[2], other_pause[2])
+        self.assertEqual(2, pause[2]["generation"])
+
+    @mock.patch("osprofiler.profiler.notifier.notify")
+    def test_executor_thread_untracked(self, mock_notify):
+        executor = futures.ThreadPoolExecutor(max_workers=1)
+        self.addCleanup(executor.shutdown)
+
+        @profiler.trace("db")
+        def query():
+            gc.collect()
+
+        profiler.init("secret", base_id="1", parent_id="2")
+        self.addCleanup(profiler.clean)
+        with profiler.Trace("wsgi"):
+            profiler.submit(executor, query).result()
+            prof = profiler.get()
+            self.assertEqual({threading.get_ident(): prof}, gctrace._profilers)
+
+        sent = [call[0][0] for call in mock_notify.call_args_list]
+        self.assertIn("gc-start", [info["name"] for info in sent])
+        self.assertEqual({}, gctrace._profilers)
+        self.assertNotIn(gctrace._callback, gc.callbacks)
+        # NOTE: Later collections in the pool thread aren't recorded.
+        executor.submit(gc.collect).result()
+        self.assertEqual({}, prof._gc_pauses)  # type: ignore[union-attr]
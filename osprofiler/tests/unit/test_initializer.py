@@ -12,21 +12,36 @@
 
 from unittest import mock
 
+from oslo_config import cfg
 import testtools
 
 from osprofiler import initializer
+from osprofiler import notifier
+from osprofiler import opts
+from osprofiler import sampling
+from osprofiler import tracepoints
 
 
 class InitializerTestCase(testtools.TestCase):
+    def _conf(self, **overrides):
+        """Returns a configuration with overridden profiler options."""
+        conf = cfg.ConfigOpts()
+        opts.set_defaults(conf)
+        conf([])
+        # NOTE: The overrides are kept in the option group, which is shared
+        #       by all configurations.
+        self.addCleanup(conf.reset)
+        for name, value in overrides.items():
+            conf.set_override(name, value, "profiler")
+        return conf
+
     @mock.patch("osprofiler.notifier.set")
     @mock.patch("osprofiler.notifier.create")
     @mock.patch("osprofiler.web.enable")
     def test_initializer(
         self, web_enable_mock, notifier_create_mock, notifier_set_mock
     ):
-        conf = mock.Mock()
-        conf.profiler.connection_string = "driver://"
-        conf.profiler.hmac_keys = "hmac_keys"
+        conf = self._conf(connection_string="driver://", hmac_keys="hmac_keys")
         context: dict[object, object] = {}
         project = "my-project"
         service = "my-service"
@@ -47,3 +62,284 @@ class InitializerTestCase(testtools.TestCase):
         )
         notifier_set_mock.assert_called_once_with(notifier_mock)
         web_enable_mock.assert_called_once_with("hmac_keys")
+
+    @mock.patch("osprofiler.notifier.set")
+    @mock.patch("osprofiler.notifier.create")
+    @mock.patch("osprofiler.web.enable")
+    def test_initializer_async_notification(
+        self, web_enable_mock, notifier_create_mock, notifier_set_mock
+    ):
+        conf = self._conf(
+            async_notification=True,
+            async_queue_size=10,
+            async_workers=2,
+            async_overflow_policy="drop_oldest",
+        )
+
+        notifier_mock = mock.Mock()
+        notifier_create_mock.return_value = notifier_mock
+
+        initializer.init_from_conf(conf, {}, "project", "service", "host")
+
+        async_notifier = notifier_set_mock.call_args[0][0]
+        self.addCleanup(async_notifier.shutdown)
+        self.assertIsInstance(async_notifier, notifier.AsyncNotifier)
+        self.assertEqual(notifier_mock, async_notifier.notifier)
+        self.assertEqual(2, async_notifier.workers)
+        self.assertEqual("drop_oldest", async_notifier.overflow_policy)
+
+    @mock.patch("osprofiler.notifier.set")
+    @mock.patch("osprofiler.notifier.create")
+    @mock.patch("osprofiler.web.enable")
+    def test_initializer_batch_notification(
+        self, web_enable_mock, notifier_create_mock, notifier_set_mock
+    ):
+        conf = self._conf(
+            notification_batch_size=50,
+            notification_batch_interval=0.5,
+        )
+
+        notifier_mock = mock.Mock()
+        notifier_create_mock.return_value = notifier_mock
+
+        initializer.init_from_conf(conf, {}, "project", "service", "host")
+
+        batch_notifier = notifier_set_mock.call_args[0][0]
+        self.assertIsInstance(batch_notifier, notifier.BatchNotifier)
+        self.assertEqual(notifier_mock, batch_notifier.notifier)
+        self.assertEqual(50, batch_notifier.batch_size)
+        self.assertEqual(0.5, batch_notifier.batch_interval)
+
+    @mock.patch("osprofiler.sampling.set")
+    @mock.patch("osprofiler.notifier.set")
+    @mock.patch("osprofiler.notifier.create")
+    @mock.patch("osprofiler.web.enable")
+    def test_initializer_sampling(
+        self,
+        web_enable_mock,
+        notifier_create_mock,
+        notifier_set_mock,
+        sampling_set_mock,
+    ):
+        conf = self._conf(
+            sampling_rate=0.25,
+            sampling_max_per_second=10,
+            sampling_path_rates={"/healthcheck*": "0"},
+        )
+
+        initializer.init_from_conf(conf, {}, "project", "service", "host")
+
+        sampler = sampling_set_mock.call_args[0][0]
+        self.assertIsInstance(sampler, sampling.Sampler)
+        self.assertEqual(0.25, sampler.rate)
+        self.assertEqual(10, sampler.max_per_second)
+        self.assertEqual([("/healthcheck*", 0.0)], sampler.path_rates)
+
+    @mock.patch("osprofiler.notifier.set")
+    @mock.patch("osprofiler.notifier.create")
+    @mock.patch("osprofiler.web.enable")
+    def test_initializer_tail_sampling(
+        self, web_enable_mock, notifier_create_mock, notifier_set_mock
+    ):
+        conf = self._conf(
+            tail_sampling=True,
+            tail_sampling_min_duration=0.5,
+            tail_sampling_max_trace_events=10,
+            tail_sampling_max_events=100,
+        )
+
+        notifier_mock = mock.Mock()
+        notifier_create_mock.return_value = notifier_mock
+
+        initializer.init_from_conf(conf, {}, "project", "service", "host")
+
+        tail_notifier = notifier_set_mock.call_args[0][0]
+        self.assertIsInstance(tail_notifier, notifier.TailSamplingNotifier)
+        self.assertEqual(notifier_mock, tail_notifier.notifier)
+        self.assertEqual(0.5, tail_notifier.min_duration)
+        self.assertEqual(10, tail_notifier.max_trace_events)
+        self.assertEqual(100, tail_notifier.max_events)
+
+    @mock.patch("osprofiler.profiler.set_id_generator")
+    @mock.patch("osprofiler.notifier.set")
+    @mock.patch("osprofiler.notifier.create")
+    @mock.patch("osprofiler.web.enable")
+    def test_initializer_id_generator(
+        self,
+        web_enable_mock,
+        notifier_create_mock,
+        notifier_set_mock,
+        set_id_generator_mock,
+    ):
+        conf = self._conf(id_generator="fast")
+
+        initializer.init_from_conf(conf, {}, "project", "service", "host")
+
+        set_id_generator_mock.assert_called_once_with("fast")
+
+    @mock.patch("osprofiler.profiler.set_notification_format")
+    @mock.patch("osprofiler.notifier.set")
+    @mock.patch("osprofiler.notifier.create")
+    @mock.patch("osprofiler.web.enable")
+    def test_initializer_notification_format(
+        self,
+        web_enable_mock,
+        notifier_create_mock,
+        notifier_set_mock,
+        set_notification_format_mock,
+    ):
+        conf = self._conf(notification_format="spans")
+
+        initializer.init_from_conf(conf, {}, "project", "service", "host")
+
+        set_notification_format_mock.assert_called_once_with("spans")
+
+    @mock.patch("osprofiler.capture.set")
+    @mock.patch("osprofiler.notifier.set")
+    @mock.patch("osprofiler.notifier.create")
+    @mock.patch("osprofiler.web.enable")
+    def test_initializer_capture_limits(
+        self,
+        web_enable_mock,
+        notifier_create_mock,
+        notifier_set_mock,
+        capture_set_mock,
+    ):
+        conf = self._conf(
+            capture_max_length=100,
+            capture_max_depth=2,
+            capture_max_items=10,
+        )
+
+        initializer.init_from_conf(conf, {}, "project", "service", "host")
+
+        formatter = capture_set_mock.call_args[0][0]
+        self.assertEqual(100, formatter.max_length)
+        self.assertEqual(2, formatter.maxlevel)
+        self.assertEqual(10, formatter.maxlist)
+
+    @mock.patch("osprofiler.profiler.set_trace_limits")
+    @mock.patch("osprofiler.notifier.set")
+    @mock.patch("osprofiler.notifier.create")
+    @mock.patch("osprofiler.web.enable")
+    def test_initializer_trace_limits(
+        self,
+        web_enable_mock,
+        notifier_create_mock,
+        notifier_set_mock,
+        set_trace_limits_mock,
+    ):
+        conf = self._conf(
+            trace_max_spans=1000,
+            trace_max_bytes=100000,
+            trace_max_depth=20,
+        )
+
+        initializer.init_from_conf(conf, {}, "project", "service", "host")
+
+        set_trace_limits_mock.assert_called_once_with(
+            max_spans=1000, max_bytes=100000, max_depth=20
+        )
+
+    @mock.patch("osprofiler.profiler.set_aggregation")
+    @mock.patch("osprofiler.notifier.set")
+    @mock.patch("osprofiler.notifier.create")
+    @mock.patch("osprofiler.web.enable")
+    def test_initializer_aggregation(
+        self,
+        web_enable_mock,
+        notifier_create_mock,
+        notifier_set_mock,
+        set_aggregation_mock,
+    ):
+        conf = self._conf(
+            aggregate_min_calls=50,
+            aggregate_max_duration=0.001,
+        )
+
+        initializer.init_from_conf(conf, {}, "project", "service", "host")
+
+        set_aggregation_mock.assert_called_once_with(
+            min_calls=50, max_duration=0.001
+        )
+
+    @mock.patch("osprofiler.profiler.set_memory_tracking")
+    @mock.patch("osprofiler.notifier.set")
+    @mock.patch("osprofiler.notifier.create")
+    @mock.patch("osprofiler.web.enable")
+    def test_initializer_memory_tracking(
+        self,
+        web_enable_mock,
+        notifier_create_mock,
+        notifier_set_mock,
+        set_memory_tracking_mock,
+    ):
+        conf = self._conf(
+            memory_tracking=True,
+            memory_top_sites=10,
+        )
+
+        initializer.init_from_conf(conf, {}, "project", "service", "host")
+
+        set_memory_tracking_mock.assert_called_once_with(True, top_sites=10)
+
+    @mock.patch("osprofiler.gctrace.set_enabled")
+    @mock.patch("osprofiler.notifier.set")
+    @mock.patch("osprofiler.notifier.create")
+    @mock.patch("osprofiler.web.enable")
+    def test_initializer_trace_gc(
+        self,
+        web_enable_mock,
+        notifier_create_mock,
+        notifier_set_mock,
+        gctrace_set_enabled_mock,
+    ):
+        conf = self._conf(trace_gc=True)
+
+        initializer.init_from_conf(conf, {}, "project", "service", "host")
+
+        gctrace_set_enabled_mock.assert_called_once_with(True)
+
+    @mock.patch("osprofiler.stacksampler.set")
+    @mock.patch("osprofiler.notifier.set")
+    @mock.patch("osprofiler.notifier.create")
+    @mock.patch("osprofiler.web.enable")
+    def test_initializer_stack_sampler(
+        self,
+        web_enable_mock,
+        notifier_create_mock,
+        notifier_set_mock,
+        stacksampler_set_mock,
+    ):
+        conf = self._conf(
+            stack_sampling_interval=0.05,
+            stack_sampling_max_overhead=0.02,
+        )
+
+        initializer.init_from_conf(conf, {}, "project", "service", "host")
+
+        sampler = stacksampler_set_mock.call_args[0][0]
+        self.assertEqual(0.05, sampler.interval)
+        self.assertEqual(0.02, sampler.max_overhead)
+
+    @mock.patch("osprofiler.notifier.set")
+    @mock.patch("osprofiler.notifier.create")
+    @mock.patch("osprofiler.web.enable")
+    def test_initializer_disabled_trace_points(
+        self, web_enable_mock, notifier_create_mock, notifier_set_mock
+    ):
+        self.addCleanup(tracepoints.set_disabled, [])
+        self.addCleanup(sampling.set, None)
+        conf = self._conf(disabled_trace_points=["db"])
+
+        initializer.init_from_conf(conf, {}, "project", "service", "host")
+        self.assertEqual(["db"], tracepoints.get_disabled())
+        self.assertIn(
+            initializer._mutate_disabled_trace_points, conf._mutate_hooks
+        )
+
+        conf.set_override("disabled_trace_points", ["rpc"], "profiler")
+        initializer._mutate_disabled_trace_points(
+            conf, {("profiler", "disabled_trace_points"): (["db"], ["rpc"])}
+        )
+        self.assertEqual(["rpc"], tracepoints.get_disabled())
@@ -13,9 +13,20 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+import threading
+import time
+from typing import Any
 from unittest import mock
 
+from osprofiler.drivers import base
 from osprofiler import notifier
+from osprofiler import records
+from osprofiler import stats
 from osprofiler.tests import test
 
 
@@ -43,6 +54,73 @@ class NotifierTestCase(test.TestCase):
 
         m.assert_called_once_with(10)
 
+    def test_notify_record_as_dict(self):
+        sent = []
+        notifier.set(lambda info, context=None: sent.append(info))
+        record = records.TraceRecord("a-start", "1", "2", "1", 10**18)
+        notifier.notify(record)
+
+        self.assertIs(dict, type(sent[0]))
+        self.assertEqual(dict(record), sent[0])
+
+    def test_notify_record_to_driver(self):
+        class R(base.Driver):
+            sent: list[Any] = []
+
+            @classmethod
+            def get_name(cls):
+                return "r"
+
+            def notify(self, info, **kwargs):
+                self.sent.append(info)
+
+        driver = base.get_driver("r://")
+        notifier.set(notifier.TailSamplingNotifier(driver.notify, 0))
+        record = records.TraceRecord("a-start", "1", "2", "1", 10**18)
+        notifier.notify(record)
+        notifier.notify(record.copy())
+
+        self.assertEqual([], R.sent)
+        notifier.notify(records.TraceRecord("a-stop", "1", "2", "1", 10**18))
+        self.assertIs(record, R.sent[0])
+        self.assertIs(dict, type(R.sent[1]))
+
+    @mock.patch("osprofiler.stats.__stats", new_callable=stats.Stats)
+    def test_notify_stats(self, mock_stats):
+        def sender(info):
+            if info.get("fail"):
+                raise ValueError()
+
+        notifier.set(sender)
+        notifier.notify({"a": 1})
+        self.assertRaises(ValueError, notifier.notify, {"fail": True})
+
+        snapshot = mock_stats.snapshot()
+        self.assertEqual(
+            {"notify_errors.sender": 1, "events_dropped.notify_error": 1},
+            snapshot["counters"],
+        )
+        self.assertEqual(
+            1, snapshot["histograms"]["notify_latency.sender"]["count"]
+        )
+
+    @mock.patch("osprofiler.stats.__stats", new_callable=stats.Stats)
+    def test_notify_stats_driver_name(self, mock_stats):
+        class S(base.Driver):
+            @classmethod
+            def get_name(cls):
+                return "s"
+
+            def notify(self, info, **kwargs):
+                pass
+
+        notifier.set(base.get_driver("s://").notify)
+        notifier.notify({"a": 1})
+
+        self.assertEqual(
+            ["notify_latency.s"], list(mock_stats.snapshot()["histograms"])
+        )
+
     @mock.patch("osprofiler.notifier.base.get_driver")
     def test_create(self, mock_factory):
 
@@ -57,3 +135,495 @@ class NotifierTestCase(test.TestCase):
         result = notifier.create("test", 10, b=20)
         mock_get_driver.assert_called_once_with("test", 10, b=20)
         self.assertEqual(notifier._noop_notifier, result)
+
+
+class AsyncNotifierTestCase(test.TestCase):
+    def setUp(self):
+        super().setUp()
+        self.received = []
+        self.addCleanup(notifier.set, notifier._noop_notifier)
+
+    def _create(self, **kwargs):
+        async_notifier = notifier.AsyncNotifier(self.received.append, **kwargs)
+        self.addCleanup(async_notifier.shutdown, 1)
+        return async_notifier
+
+    def test_invalid_overflow_policy(self):
+        self.assertRaises(
+            ValueError,
+            notifier.AsyncNotifier,
+            self.received.append,
+            overflow_policy="explode",
+        )
+
+    def test_notify_delivers_in_background(self):
+        async_notifier = self._create(workers=2)
+        for i in range(100):
+            async_notifier({"i": i})
+
+        self.assertTrue(async_notifier.flush(5))
+        self.assertEqual(
+            list(range(100)), sorted(info["i"] for info in self.received)
+        )
+        self.assertEqual(2, len(async_notifier._threads))
+        for thread in async_notifier._threads:
+            self.assertNotEqual(threading.current_thread(), thread)
+
+    def test_notify_survives_notifier_errors(self):
+        calls = []
+
+        def failing(info):
+            calls.append(info)
+            raise Exception("boom")
+
+        async_notifier = notifier.AsyncNotifier(failing)
+        self.addCleanup(async_notifier.shutdown, 1)
+        async_notifier({"a": 1})
+        async_notifier({"a": 2})
+
+        self.assertTrue(async_notifier.flush(5))
+        self.assertEqual([{"a": 1}, {"a": 2}], calls)
+
+    def _fill_blocked_queue(self, overflow_policy):
+        release = threading.Event()
+        delivered = []
+
+        def slow(info):
+            release.wait(5)
+            delivered.append(info)
+
+        async_notifier = notifier.AsyncNotifier(
+            slow, queue_size=2, overflow_policy=overflow_policy
+        )
+        self.addCleanup(async_notifier.shutdown, 1)
+        self.addCleanup(release.set)
+        async_notifier({"i": 0})
+        # wait until the worker holds the first payload
+        while async_notifier.qsize():
+            time.sleep(0.001)
+        for i in range(1, 5):
+            async_notifier({"i": i})
+        release.set()
+        self.assertTrue(async_notifier.flush(5))
+        return async_notifier, [info["i"] for info in delivered]
+
+    def test_overflow_drop_newest(self):
+        async_notifier, delivered = self._fill_blocked_queue("drop_newest")
+        self.assertEqual([0, 1, 2], delivered)
+        self.assertEqual(2, async_notifier.dropped)
+
+    def test_overflow_drop_oldest(self):
+        async_notifier, delivered = self._fill_blocked_queue("drop_oldest")
+        self.assertEqual([0, 3, 4], delivered)
+        self.assertEqual(2, async_notifier.dropped)
+
+    @mock.patch("osprofiler.stats.__stats", new_callable=stats.Stats)
+    def test_overflow_stats(self, mock_stats):
+        self._fill_blocked_queue("drop_newest")
+
+        snapshot = mock_stats.snapshot()
+        self.assertEqual(
+            2, snapshot["counters"]["events_dropped.async_queue_full"]
+        )
+        self.assertEqual(
+            3, snapshot["histograms"]["notify_latency.slow"]["count"]
+        )
+        self.assertEqual({"queue_depth": 0}, snapshot["gauges"])
+
+    @mock.patch("osprofiler.stats.__stats", new_callable=stats.Stats)
+    def test_notifier_error_stats(self, mock_stats):
+        def failing(info):
+            raise Exception("boom")
+
+        async_notifier = self._create()
+        async_notifier.notifier = failing
+        async_notifier._stats_name = "failing"
+        async_notifier({"a": 1})
+
+        self.assertTrue(async_notifier.flush(5))
+        self.assertEqual(
+            {"notify_errors.failing": 1, "events_dropped.notify_error": 1},
+            mock_stats.snapshot()["counters"],
+        )
+
+    def test_shutdown_flushes_and_falls_back_to_sync(self):
+        async_notifier = self._create()
+        async_notifier({"a": 1})
+        async_notifier.shutdown()
+
+        self.assertEqual([{"a": 1}], self.received)
+        self.assertEqual([], async_notifier._threads)
+
+        async_notifier({"a": 2})
+        self.assertEqual([{"a": 1}, {"a": 2}], self.received)
+
+    def test_module_flush(self):
+        async_notifier = self._create()
+        notifier.set(async_notifier)
+        notifier.notify({"a": 1})
+
+        self.assertTrue(notifier.flush(5))
+        self.assertEqual([{"a": 1}], self.received)
+
+    def test_module_flush_sync_notifier(self):
+        notifier.set(self.received.append)
+        self.assertTrue(notifier.flush())
+
+
+class FakeBatchDriver(base.Driver):
+    def __init__(self):
+        super().__init__("fake://")
+        self.notify_mock = mock.MagicMock()
+        self.notify_batch_mock = mock.MagicMock()
+
+    def notify(self, info, **kwargs):
+        self.notify_mock(info, **kwargs)
+
+    def notify_batch(self, events, **kwargs):
+        self.notify_batch_mock(events, **kwargs)
+
+
+class BatchNotifierTestCase(test.TestCase):
+    def setUp(self):
+        super().setUp()
+        self.batches = []
+
+    def _notify_batch(self, events):
+        self.batches.append(list(events))
+
+    def _driver(self):
+        driver = FakeBatchDriver()
+        driver.notify_batch_mock.side_effect = self._notify_batch
+        return driver
+
+    def test_batch_by_size(self):
+        driver = self._driver()
+        batch_notifier = notifier.BatchNotifier(
+            driver.notify, batch_size=3, batch_interval=60
+        )
+
+        for i in range(7):
+            batch_notifier({"i": i})
+
+        self.assertEqual(
+            [[{"i": 0}, {"i": 1}, {"i": 2}], [{"i": 3}, {"i": 4}, {"i": 5}]],
+            self.batches,
+        )
+        batch_notifier.flush()
+        self.assertEqual([{"i": 6}], self.batches[-1])
+        driver.notify_mock.assert_not_called()
+
+    @mock.patch("osprofiler.notifier.time.monotonic")
+    def test_batch_by_age(self, mock_monotonic):
+        driver = self._driver()
+        batch_notifier = notifier.BatchNotifier(
+            driver.notify, batch_size=100, batch_interval=1.0
+        )
+
+        mock_monotonic.return_value = 10.0
+        batch_notifier({"i": 0})
+        mock_monotonic.return_value = 10.5
+        batch_notifier({"i": 1})
+        self.assertEqual([], self.batches)
+        mock_monotonic.return_value = 11.0
+        batch_notifier({"i": 2})
+        self.assertEqual([[{"i": 0}, {"i": 1}, {"i": 2}]], self.batches)
+
+    def test_plain_callable_fallback(self):
+        received: list[dict[str, Any]] = []
+        batch_notifier = notifier.BatchNotifier(
+            received.append, batch_size=2, batch_interval=60
+        )
+        batch_notifier({"i": 0})
+        self.assertEqual([], received)
+        batch_notifier({"i": 1})
+        self.assertEqual([{"i": 0}, {"i": 1}], received)
+
+    def test_send_errors_are_logged(self):
+        driver = self._driver()
+        driver.notify_batch_mock.side_effect = Exception("boom")
+        batch_notifier = notifier.BatchNotifier(driver.notify, batch_size=1)
+
+        batch_notifier({"i": 0})
+        driver.notify_batch_mock.assert_called_once_with([{"i": 0}])
+
+    def test_async_notifier_flushes_batches(self):
+        driver = self._driver()
+        batch_notifier = notifier.BatchNotifier(
+            driver.notify, batch_size=100, batch_interval=60
+        )
+        async_notifier = notifier.AsyncNotifier(batch_notifier)
+        self.addCleanup(async_notifier.shutdown, 1)
+
+        async_notifier({"i": 0})
+        async_notifier({"i": 1})
+
+        self.assertTrue(async_notifier.flush(5))
+        self.assertEqual([[{"i": 0}, {"i": 1}]], self.batches)
+
+
+def _event(name, trace_id, base_id="b", **info):
+    event = {
+        "name": name,
+        "base_id": base_id,
+        "trace_id": trace_id,
+        "parent_id": "p",
+    }
+    if info:
+        event["info"] = info
+    return event
+
+
+class TailSamplingNotifierTestCase(test.TestCase):
+    def setUp(self):
+        super().setUp()
+        self.sent: list[Any] = []
+        patcher = mock.patch("osprofiler.notifier.time.monotonic")
+        self.mock_monotonic = patcher.start()
+        self.mock_monotonic.return_value = 10.0
+        self.addCleanup(patcher.stop)
+
+    def _notifier(self, **kwargs):
+        return notifier.TailSamplingNotifier(
+            lambda info, context=None: self.sent.append(info), **kwargs
+        )
+
+    def _trace(self, tail_notifier, base_id="b", duration=0.0, **stop_info):
+        self.mock_monotonic.return_value = 10.0
+        tail_notifier(_event("wsgi-start", "1", base_id))
+        tail_notifier(_event("db-start", "2", base_id))
+        tail_notifier(_event("db-stop", "2", base_id))
+        self.mock_monotonic.return_value = 10.0 + duration
+        tail_notifier(_event("wsgi-stop", "1", base_id, **stop_info))
+
+    def test_fast_trace_dropped(self):
+        tail_notifier = self._notifier(min_duration=1.0)
+        self._trace(tail_notifier, duration=0.5)
+
+        self.assertEqual([], self.sent)
+        self.assertEqual(1, tail_notifier.dropped)
+        self.assertEqual(0, tail_notifier._buffered)
+        self.assertEqual({}, dict(tail_notifier._traces))
+
+    @mock.patch("osprofiler.stats.__stats", new_callable=stats.Stats)
+    def test_dropped_trace_stats(self, mock_stats):
+        tail_notifier = self._notifier(min_duration=1.0, max_events=1)
+        self._trace(tail_notifier, duration=0.5)
+        self._trace(tail_notifier, base_id="c", duration=2.0)
+        tail_notifier(_event("wsgi-start", "1", "d"))
+        tail_notifier(_event("wsgi-start", "1", "e"))
+
+        self.assertEqual(
+            {
+                "events_dropped.tail_sampling": 4,
+                "events_dropped.tail_sampling_overflow": 1,
+            },
+            mock_stats.snapshot()["counters"],
+        )
+
+    def test_slow_trace_kept(self):
+        tail_notifier = self._notifier(min_duration=1.0)
+        self._trace(tail_notifier, duration=1.5)
+
+        self.assertEqual(
+            ["wsgi-start", "db-start", "db-stop", "wsgi-stop"],
+            [e["name"] for e in self.sent],
+        )
+        self.assertEqual(1, tail_notifier.kept)
+
+    def test_failed_trace_kept(self):
+        tail_notifier = self._notifier(min_duration=1.0)
+        tail_notifier(_event("wsgi-start", "1"))
+        tail_notifier(_event("db-start", "2"))
+        tail_notifier(_event("db-stop", "2", etype="ValueError"))
+
+        # Kept as soon as the error is seen, later events pass through.
+        self.assertEqual(3, len(self.sent))
+        tail_notifier(_event("wsgi-stop", "1"))
+        self.assertEqual(4, len(self.sent))
+        self.assertEqual(1, tail_notifier.kept)
+
+    def test_forced_trace_kept(self):
+        tail_notifier = self._notifier(min_duration=1.0)
+        self._trace(tail_notifier, **{notifier.FORCE_SAMPLE: True})
+
+        self.assertEqual(4, len(self.sent))
+
+    def test_span_records(self):
+        tail_notifier = self._notifier(min_duration=1.0)
+        db = dict(_event("db-span", "2"), duration_ns=10**8)
+        slow = dict(
+            _event("wsgi-span", "1"), duration_ns=2 * 10**9, local_root=True
+        )
+        fast = dict(slow, duration_ns=10**8)
+
+        tail_notifier(db)
+        self.assertEqual(1, tail_notifier._buffered)
+        tail_notifier(fast)
+        self.assertEqual([], self.sent)
+        self.assertEqual(1, tail_notifier.dropped)
+
+        tail_notifier(db)
+        tail_notifier(slow)
+        self.assertEqual([db, slow], self.sent)
+        self.assertEqual(1, tail_notifier.kept)
+
+    def test_failed_span_record_kept(self):
+        tail_notifier = self._notifier(min_duration=1.0)
+        db = dict(_event("db-span", "2"), stop_info={"etype": "ValueError"})
+        root = dict(_event("wsgi-span", "1"), local_root=True)
+
+        tail_notifier(db)
+        tail_notifier(root)
+
+        self.assertEqual([db, root], self.sent)
+        self.assertEqual(1, tail_notifier.kept)
+
+    def test_traces_are_independent(self):
+        tail_notifier = self._notifier(min_duration=1.0)
+        tail_notifier(_event("wsgi-start", "1", "fast"))
+        self._trace(tail_notifier, base_id="slow", duration=2)
+        self.mock_monotonic.return_value = 10.0
+        tail_notifier(_event("wsgi-stop", "1", "fast"))
+
+        self.assertEqual({"slow"}, {e["base_id"] for e in self.sent})
+        self.assertEqual(1, tail_notifier.kept)
+        self.assertEqual(1, tail_notifier.dropped)
+
+    def test_max_trace_events(self):
+        tail_notifier = self._notifier(min_duration=60, max_trace_events=3)
+        tail_notifier(_event("wsgi-start", "1"))
+        tail_notifier(_event("db-start", "2"))
+        self.assertEqual([], self.sent)
+        tail_notifier(_event("db-stop", "2"))
+        self.assertEqual(3, len(self.sent))
+        tail_notifier(_event("wsgi-stop", "1"))
+        self.assertEqual(4, len(self.sent))
+        self.assertEqual(0, tail_notifier._buffered)
+
+    def test_max_events(self):
+        tail_notifier = self._notifier(min_duration=0, max_events=2)
+        tail_notifier(_event("wsgi-start", "1", "b1"))
+        tail_notifier(_event("rpc-start", "2", "b1"))
+        tail_notifier(_event("wsgi-start", "1", "b2"))
+
+        self.assertEqual(1, tail_notifier.overflowed)
+        self.assertNotIn("b2", tail_notifier._traces)
+
+    def test_trace_timeout(self):
+        tail_notifier = self._notifier(trace_timeout=5)
+        tail_notifier(_event("wsgi-start", "1", "b1"))
+        self.mock_monotonic.return_value = 20.0
+        tail_notifier(_event("wsgi-start", "1", "b2"))
+
+        self.assertEqual(["b2"], list(tail_notifier._traces))
+        self.assertEqual(1, tail_notifier.dropped)
+        self.assertEqual(1, tail_notifier._buffered)
+
+    def test_payload_without_base_id(self):
+        tail_notifier = self._notifier()
+        tail_notifier({"name": "x"})
+        self.assertEqual([{"name": "x"}], self.sent)
+
+    def test_flush(self):
+        inner = mock.Mock()
+        tail_notifier = notifier.TailSamplingNotifier(inner)
+        self.assertTrue(tail_notifier.flush(3))
+        inner.flush.assert_called_once_with(3)
+
+    def test_after_fork(self):
+        tail_notifier = self._notifier(min_duration=0)
+        tail_notifier(_event("wsgi-start", "1", "b1"))
+        tail_notifier._after_fork()
+
+        self.assertEqual({}, tail_notifier._traces)
+        self.assertEqual(0, tail_notifier._buffered)
+        self._trace(tail_notifier, "b2")
+        self.assertEqual(4, len(self.sent))
+
+
+class FileDriver(base.Driver):
+    """Appends the batches to a file, opened on first use."""
+
+    def __init__(self, path):
+        super().__init__("file://")
+        self.path = path
+        self.fd = None
+        self.fd_pid = None
+
+    def after_fork(self):
+        self.fd = None
+
+    def notify(self, info, **kwargs):
+        self.notify_batch([info])
+
+    def notify_batch(self, events, **kwargs):
+        if self.fd is None:
+            self.fd = os.open(self.path, os.O_WRONLY | os.O_APPEND)
+            self.fd_pid = os.getpid()
+        line = {"pid": os.getpid(), "fd_pid": self.fd_pid, "events": events}
+        os.write(self.fd, json.dumps(line).encode() + b"\n")
+
+
+def _fork_worker(count):
+    pid = os.fork()
+    if pid == 0:  # pragma: no cover
+        code = 1
+        try:
+            for i in range(count):
+                notifier.notify({"pid": os.getpid(), "i": i})
+            if notifier.flush(5):
+                code = 0
+        finally:
+            os._exit(code)
+    return pid
+
+
+def _run_master(path, workers, count):
+    """Forks workers like a pre-fork server, in a new interpreter."""
+    driver = FileDriver(path)
+    batch_notifier = notifier.BatchNotifier(
+        driver.notify, batch_size=10, batch_interval=60
+    )
+    async_notifier = notifier.AsyncNotifier(batch_notifier)
+    notifier.set(async_notifier)
+    # NOTE: The master has running workers, buffered payloads and held
+    #       locks when the workers are forked.
+    for i in range(5):
+        notifier.notify({"pid": os.getpid(), "i": i})
+    async_notifier._queue.join()
+    with batch_notifier._lock, stats.get()._lock:
+        pids = [_fork_worker(count) for _ in range(workers)]
+    for pid in pids:
+        _, status = os.waitpid(pid, 0)
+        if os.waitstatus_to_exitcode(status):
+            sys.exit(1)
+    if not notifier.flush(5):
+        sys.exit(1)
+
+
+class ForkTestCase(test.TestCase):
+    def test_forked_workers(self):
+        fd, path = tempfile.mkstemp()
+        os.close(fd)
+        self.addCleanup(os.unlink, path)
+        # NOTE: Not forked from the test runner, whose other tests leave
+        #       threads and fork handlers (e.g. of OpenTelemetry) behind.
+        master = multiprocessing.get_context("spawn").Process(
+            target=_run_master, args=(path, 3, 25)
+        )
+        master.start()
+        master.join(30)
+        self.assertEqual(0, master.exitcode)
+
+        received: dict[int, list[int]] = {}
+        with open(path) as f:
+            for line in f:
+                batch = json.loads(line)
+                # NOTE: Each process opened its own file descriptor.
+                self.assertEqual(batch["pid"], batch["fd_pid"])
+                for event in batch["events"]:
+                    self.assertEqual(batch["pid"], event["pid"])
+                    received.setdefault(event["pid"], []).append(event["i"])
+        self.assertEqual(list(range(5)), received.pop(master.pid))  # type: ignore[arg-type]
+        self.assertEqual([list(range(25))] * 3, list(received.values()))
@@ -13,17 +13,26 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import asyncio
 import collections
+from concurrent import futures
 import copy
-import datetime
+import inspect
 import re
+import threading
+import tracemalloc
 import unittest
 from typing import Any, ClassVar
 from unittest import mock
+import uuid
 
+import testtools
 
+from osprofiler import notifier
 from osprofiler import profiler
+from osprofiler import stats
 from osprofiler.tests import test
+from osprofiler import tracepoints
 
 
 class ProfilerGlobMethodsTestCase(test.TestCase):
@@ -60,6 +69,98 @@ class ProfilerGlobMethodsTestCase(test.TestCase):
         p.stop.assert_called_once_with(info="info")
 
 
+class ProfilerContextTestCase(test.TestCase):
+    def setUp(self):
+        super().setUp()
+        profiler.clean()
+        self.addCleanup(profiler.clean)
+
+    def test_new_thread_has_no_profiler(self):
+        profiler.init("secret", base_id="1", parent_id="2")
+        result = []
+        thread = threading.Thread(target=lambda: result.append(profiler.get()))
+        thread.start()
+        thread.join()
+        self.assertEqual([None], result)
+
+    @mock.patch("osprofiler.profiler.notifier.notify")
+    def test_submit(self, mock_notify):
+        p = profiler.init("secret", base_id="1", parent_id="2")
+        p.start("parent")
+
+        def child():
+            profiler.start("child")
+            profiler.stop()
+            return profiler.get()
+
+        with futures.ThreadPoolExecutor(max_workers=1) as executor:
+            child_p = profiler.submit(executor, child).result()
+
+        self.assertIsNot(p, child_p)
+        self.assertEqual("1", child_p.get_base_id())
+        child_start = mock_notify.call_args_list[1][0][0]
+        self.assertEqual("child-start", child_start["name"])
+        self.assertEqual(p.get_id(), child_start["parent_id"])
+        # the parent stack is untouched by the child
+        self.assertEqual(["1", "2", p.get_id()], list(p._trace_stack))
+
+    @mock.patch("osprofiler.profiler.notifier.notify")
+    def test_asyncio_tasks_are_isolated(self, mock_notify):
+        async def task(name, started, proceed):
+            profiler.start(name)
+            started.set()
+            await proceed.wait()
+            profiler.stop()
+            return profiler.get()
+
+        async def main():
+            p = profiler.init("secret", base_id="1", parent_id="2")
+            profiler.start("root")
+            started = [asyncio.Event(), asyncio.Event()]
+            proceed = asyncio.Event()
+            tasks = [
+                asyncio.ensure_future(task(f"t{i}", started[i], proceed))
+                for i in range(2)
+            ]
+            await asyncio.gather(*(event.wait() for event in started))
+            proceed.set()
+            results = await asyncio.gather(*tasks)
+            profiler.stop()
+            return p, results
+
+        p, results = asyncio.run(main())
+
+        self.assertEqual(3, len({id(p), id(results[0]), id(results[1])}))
+        events = {c[0][0]["name"]: c[0][0] for c in mock_notify.call_args_list}
+        root_id = events["root-start"]["trace_id"]
+        for name in ("t0", "t1"):
+            self.assertEqual(root_id, events[f"{name}-start"]["parent_id"])
+            self.assertEqual(
+                events[f"{name}-start"]["trace_id"],
+                events[f"{name}-stop"]["trace_id"],
+            )
+        self.assertEqual(root_id, events["root-stop"]["trace_id"])
+
+    @mock.patch("osprofiler.profiler.notifier.notify")
+    def test_run_in_executor(self, mock_notify):
+        def child():
+            profiler.start("child")
+            profiler.stop()
+
+        async def main():
+            profiler.init("secret", base_id="1", parent_id="2")
+            loop = asyncio.get_running_loop()
+            await profiler.run_in_executor(loop, None, child)
+
+        asyncio.run(main())
+
+        self.assertEqual(
+            ["child-start", "child-stop"],
+            [c[0][0]["name"] for c in mock_notify.call_args_list],
+        )
+        self.assertEqual("2", mock_notify.call_args_list[0][0][0]["parent_id"])
+
+
 class ProfilerTestCase(test.TestCase):
     def test_profiler_get_shorten_id(self):
         uuid_id = "4e3e0ec6-2938-40b1-8504-09eb1d4b0dee"
@@ -68,6 +169,40 @@ class ProfilerTestCase(test.TestCase):
         expected = "850409eb1d4b0dee"
         self.assertEqual(expected, result)
 
+    def test_profiler_fast_id_generator(self):
+        profiler.set_id_generator("fast")
+        self.addCleanup(profiler.set_id_generator, "uuid")
+        prof = profiler._Profiler("secret")
+        prof.start("test")
+        base_id, trace_id = prof.get_base_id(), prof.get_id()
+
+        self.assertEqual(base_id[:19], trace_id[:19])
+        self.assertNotEqual(base_id, trace_id)
+        self.assertEqual(trace_id, str(uuid.UUID(trace_id)))
+
+    def test_profiler_unknown_id_generator(self):
+        self.assertRaises(ValueError, profiler.set_id_generator, "nope")
+
+    @mock.patch("osprofiler.stats.__stats", new_callable=stats.Stats)
+    def test_profiler_stats(self, mock_stats):
+        prof = profiler._Profiler("secret", base_id="1", parent_id="2")
+        self.assertEqual(0.0, prof.get_overhead())
+        prof.start("test")
+        prof.stop()
+        overhead = prof.get_overhead()
+
+        self.assertGreater(overhead, 0.0)
+        self.assertEqual(
+            {"events_emitted": 2}, mock_stats.snapshot()["counters"]
+        )
+        prof.sampled = False
+        prof.start("test")
+        prof.stop()
+        self.assertEqual(
+            {"events_emitted": 2}, mock_stats.snapshot()["counters"]
+        )
+        self.assertGreater(prof.get_overhead(), overhead)
+
     def test_profiler_get_shorten_id_int(self):
         short_id_int = 42
         prof = profiler._Profiler("secret", base_id="1", parent_id="2")
@@ -100,15 +235,14 @@ class ProfilerTestCase(test.TestCase):
         prof.start("test")
         self.assertEqual(prof.get_id(), "43")
 
-    @mock.patch("osprofiler.profiler.timeutils")
+    @mock.patch("osprofiler.profiler.utils.timestamp_ns")
     @mock.patch("osprofiler.profiler.uuidutils.generate_uuid")
     @mock.patch("osprofiler.profiler.notifier.notify")
     def test_profiler_start(
-        self, mock_notify, mock_generate_uuid, mock_timeutils
+        self, mock_notify, mock_generate_uuid, mock_timestamp_ns
     ):
         mock_generate_uuid.return_value = "44"
-        now = datetime.datetime.now(datetime.UTC).replace(tzinfo=None)
-        mock_timeutils.utcnow.return_value = now
+        mock_timestamp_ns.return_value = 1450879342338776123
 
         info = {"some": "info"}
         payload = {
@@ -117,7 +251,8 @@ class ProfilerTestCase(test.TestCase):
             "parent_id": "2",
             "trace_id": "44",
             "info": info,
-            "timestamp": now.strftime("%Y-%m-%dT%H:%M:%S.%f"),
+            "timestamp": "2015-12-23T14:02:22.338776",
+            "timestamp_ns": 1450879342338776123,
         }
 
         prof = profiler._Profiler("secret", base_id="1", parent_id="2")
@@ -125,11 +260,10 @@ class ProfilerTestCase(test.TestCase):
 
         mock_notify.assert_called_once_with(payload)
 
-    @mock.patch("osprofiler.profiler.timeutils")
+    @mock.patch("osprofiler.profiler.utils.timestamp_ns")
     @mock.patch("osprofiler.profiler.notifier.notify")
-    def test_profiler_stop(self, mock_notify, mock_timeutils):
-        now = datetime.datetime.now(datetime.UTC).replace(tzinfo=None)
-        mock_timeutils.utcnow.return_value = now
+    def test_profiler_stop(self, mock_notify, mock_timestamp_ns):
+        mock_timestamp_ns.return_value = 1450879342380405000
         prof = profiler._Profiler("secret", base_id="1", parent_id="2")
         prof._trace_stack.append("44")
         prof._name.append("abc")
@@ -143,7 +277,8 @@ class ProfilerTestCase(test.TestCase):
             "parent_id": "2",
             "trace_id": "44",
             "info": info,
-            "timestamp": now.strftime("%Y-%m-%dT%H:%M:%S.%f"),
+            "timestamp": "2015-12-23T14:02:22.380405",
+            "timestamp_ns": 1450879342380405000,
         }
 
         mock_notify.assert_called_once_with(payload)
@@ -166,6 +301,299 @@ class ProfilerTestCase(test.TestCase):
         self.assertEqual(len(prof._name), 0)
         self.assertEqual(len(prof._trace_stack), 2)  # base_id and parent_id
 
+    @mock.patch("osprofiler.profiler.time.perf_counter_ns")
+    @mock.patch("osprofiler.profiler.utils.timestamp_ns")
+    @mock.patch("osprofiler.profiler.uuidutils.generate_uuid")
+    @mock.patch("osprofiler.profiler.notifier.notify")
+    def test_profiler_span_records(
+        self,
+        mock_notify,
+        mock_generate_uuid,
+        mock_timestamp_ns,
+        mock_perf_counter_ns,
+    ):
+        profiler.set_notification_format("spans")
+        self.addCleanup(profiler.set_notification_format, "events")
+        mock_generate_uuid.side_effect = ["44", "45"]
+        # NOTE: The durations come from the performance counter.
+        mock_timestamp_ns.side_effect = [
+            1450879342338776000,
+            1450879342340000000,
+        ]
+        mock_perf_counter_ns.side_effect = [
+            1000000,
+            2224000,
+            12224000,
+            42629000,
+        ]
+
+        prof = profiler._Profiler("secret", base_id="1", parent_id="2")
+        prof.start("outer", info={"a": 1})
+        prof.start("inner")
+        prof.stop()
+        mock_notify.assert_called_once_with(
+            {
+                "name": "inner-span",
+                "base_id": "1",
+                "parent_id": "44",
+                "trace_id": "45",
+                "info": {"host": prof._host},
+                "timestamp": "2015-12-23T14:02:22.340000",
+                "timestamp_ns": 1450879342340000000,
+                "duration_ns": 10000000,
+            }
+        )
+        prof.stop(info={"b": 2})
+
+        mock_notify.assert_called_with(
+            {
+                "name": "outer-span",
+                "base_id": "1",
+                "parent_id": "2",
+                "trace_id": "44",
+                "info": {"a": 1, "host": prof._host},
+                "stop_info": {"b": 2},
+                "timestamp": "2015-12-23T14:02:22.338776",
+                "timestamp_ns": 1450879342338776000,
+                "duration_ns": 41629000,
+                "local_root": True,
+            }
+        )
+        self.assertEqual(2, mock_notify.call_count)
+        self.assertEqual(prof._trace_stack, collections.deque(["1", "2"]))
+
+    @mock.patch("osprofiler.profiler.notifier.notify")
+    def test_profiler_span_records_not_sampled(self, mock_notify):
+        profiler.set_notification_format("spans")
+        self.addCleanup(profiler.set_notification_format, "events")
+
+        prof = profiler._Profiler("secret", sampled=False)
+        prof.start("test")
+        prof.stop()
+
+        mock_notify.assert_not_called()
+        self.assertEqual(0, len(prof._span_start))
+
+    def test_profiler_unknown_notification_format(self):
+        self.assertRaises(ValueError, profiler.set_notification_format, "nope")
+
+    def _limited_trace(self, **limits):
+        profiler.set_trace_limits(**limits)
+        self.addCleanup(profiler.set_trace_limits)
+        prof = profiler._Profiler("secret", base_id="1", parent_id="2")
+        prof.start("wsgi")
+        for i in range(5):
+            prof.start("db", info={"statement": "x" * 10})
+            prof.start("nested")
+            prof.stop()
+            prof.stop()
+        prof.stop()
+        return prof
+
+    @mock.patch("osprofiler.profiler.notifier.notify")
+    def test_profiler_trace_limits_max_spans(self, mock_notify):
+        prof = self._limited_trace(max_spans=3)
+        sent = [call[0][0] for call in mock_notify.call_args_list]
+
+        self.assertEqual(
+            ["wsgi", "db", "nested", "nested", "db", "truncated", "truncated"]
+            + ["wsgi"],
+            [info["name"].rsplit("-", 1)[0] for info in sent],
+        )
+        root_id = sent[0]["trace_id"]
+        truncated = sent[5]
+        self.assertEqual(root_id, truncated["parent_id"])
+        self.assertEqual(
+            {"host": prof._host, "truncated": {"max_spans": 8}},
+            truncated["info"],
+        )
+        self.assertEqual(prof._trace_stack, collections.deque(["1", "2"]))
+        self.assertEqual(0, len(prof._name))
+
+    @mock.patch("osprofiler.profiler.notifier.notify")
+    def test_profiler_trace_limits_max_depth(self, mock_notify):
+        self._limited_trace(max_depth=2)
+        sent = [call[0][0] for call in mock_notify.call_args_list]
+
+        names = [info["name"] for info in sent]
+        self.assertEqual(5, names.count("db-start"))
+        self.assertEqual(5, names.count("db-stop"))
+        self.assertNotIn("nested-start", names)
+        self.assertEqual({"max_depth": 5}, sent[-3]["info"]["truncated"])
+
+    @mock.patch("osprofiler.profiler.notifier.notify")
+    def test_profiler_trace_limits_max_bytes(self, mock_notify):
+        self._limited_trace(max_bytes=40)
+        sent = [call[0][0] for call in mock_notify.call_args_list]
+
+        names = [info["name"] for info in sent]
+        # NOTE: The third one starts while under the limit.
+        self.assertEqual(3, names.count("db-start"))
+        self.assertEqual({"max_bytes": 5}, sent[-3]["info"]["truncated"])
+
+    @mock.patch("osprofiler.profiler.notifier.notify")
+    def test_profiler_trace_limits_children_attached_to_parent(
+        self, mock_notify
+    ):
+        profiler.set_trace_limits(max_depth=2)
+        self.addCleanup(profiler.set_trace_limits)
+        profiler.set_notification_format("spans")
+        self.addCleanup(profiler.set_notification_format, "events")
+        prof = profiler._Profiler("secret", base_id="1", parent_id="2")
+        prof.start("wsgi")
+        prof.start("rpc")
+        prof.start("db")
+        self.assertEqual(prof._trace_stack[-1], prof._trace_stack[-2])
+        prof.stop()
+        prof.stop()
+        prof.stop()
+        sent = [call[0][0] for call in mock_notify.call_args_list]
+
+        self.assertEqual(
+            ["rpc-span", "truncated-span", "wsgi-span"],
+            [info["name"] for info in sent],
+        )
+        self.assertTrue(sent[2]["local_root"])
+        self.assertNotIn("local_root", sent[1])
+        self.assertEqual(sent[2]["trace_id"], sent[1]["parent_id"])
+
+    @mock.patch("osprofiler.stats.__stats", new_callable=stats.Stats)
+    @mock.patch("osprofiler.profiler.notifier.notify")
+    def test_profiler_trace_limits_spans(self, mock_notify, mock_stats):
+        profiler.set_trace_limits(max_spans=3, max_depth=3)
+        self.addCleanup(profiler.set_trace_limits)
+        profiler.init("secret", base_id="1", parent_id="2")
+        self.addCleanup(profiler.clean)
+        with profiler.Trace("wsgi"):
+            rpc = profiler.start_span("rpc")
+            db = profiler.start_span("db", parent=rpc)
+            # NOTE: Children of a trace point left out are attached to its
+            #       parent.
+            nested = profiler.start_span("nested", parent=db)
+            self.assertEqual(db.trace_id, nested.trace_id)
+            profiler.start_span("nested", parent=nested).finish()
+            nested.finish()
+            db.finish()
+            profiler.start_span("db", parent=rpc).finish()
+            rpc.finish()
+        sent = [call[0][0] for call in mock_notify.call_args_list]
+
+        self.assertEqual(
+            ["wsgi", "rpc", "db", "db", "rpc", "truncated", "truncated"]
+            + ["wsgi"],
+            [info["name"].rsplit("-", 1)[0] for info in sent],
+        )
+        self.assertEqual(
+            {"max_depth": 2, "max_spans": 1}, sent[5]["info"]["truncated"]
+        )
+        self.assertEqual(
+            6, mock_stats.snapshot()["counters"]["events_dropped.trace_limit"]
+        )
+
+    @mock.patch("osprofiler.profiler.notifier.notify")
+    def test_profiler_trace_limits_not_reached(self, mock_notify):
+        prof = self._limited_trace(max_spans=20, max_depth=3)
+
+        self.assertEqual(22, mock_notify.call_count)
+        self.assertEqual({}, prof._budget.truncated)
+        self.assertEqual(11, prof._budget.spans)
+
+    def test_profiler_invalid_trace_limits(self):
+        self.assertRaises(ValueError, profiler.set_trace_limits, max_spans=-1)
+
+    @mock.patch("osprofiler.profiler.notifier.notify")
+    @mock.patch("osprofiler.profiler.time.thread_time_ns")
+    def test_profiler_resource_usage(self, mock_thread_time, mock_notify):
+        mock_thread_time.side_effect = [100, 200, 250, 275, 600, 1000]
+        profiler.set_resource_usage(True)
+        self.addCleanup(profiler.set_resource_usage, False)
+        prof = profiler._Profiler("secret", base_id="1", parent_id="2")
+        prof.start("wsgi")
+        prof.start("db")
+        prof.stop()
+        prof.start("db")
+        prof.stop()
+        prof.stop()
+        sent = [call[0][0] for call in mock_notify.call_args_list]
+
+        cpu = [info["info"]["cpu"] for info in sent if "cpu" in info["info"]]
+        self.assertEqual(
+            [(50, 50), (325, 325), (900, 525)],
+            [(c["cpu_ns"], c["self_cpu_ns"]) for c in cpu],
+        )
+        if profiler._RUSAGE_THREAD is not None:
+            self.assertIn("voluntary_switches", cpu[0])
+            self.assertIn("user_ns", cpu[0])
+        self.assertEqual(0, len(prof._usage))
+
+    @mock.patch("osprofiler.profiler.notifier.notify")
+    def test_profiler_resource_usage_fork(self, mock_notify):
+        profiler.set_resource_usage(True)
+        self.addCleanup(profiler.set_resource_usage, False)
+        prof = profiler._Profiler("secret", base_id="1", parent_id="2")
+        prof.start("wsgi")
+        fork = prof._fork((0, None))
+        fork.start("db")
+        fork.stop()
+
+        self.assertEqual([None], list(fork._usage))
+        self.assertEqual(0, prof._usage[-1][-1])  # type: ignore[index]
+        prof.stop()
+
+    @mock.patch("osprofiler.profiler.notifier.notify")
+    def test_profiler_resource_usage_disabled(self, mock_notify):
+        prof = profiler._Profiler("secret", base_id="1", parent_id="2")
+        prof.start("wsgi")
+        prof.stop({"a": 1})
+
+        self.assertNotIn("cpu", mock_notify.call_args[0][0]["info"])
+
+    @mock.patch("osprofiler.profiler.notifier.notify")
+    def test_profiler_memory_tracking(self, mock_notify):
+        self.addCleanup(profiler.set_memory_tracking, False)
+        profiler.set_memory_tracking(True, top_sites=3)
+        self.assertTrue(tracemalloc.is_tracing())
+        prof = profiler._Profiler("secret", base_id="1", parent_id="2")
+        kept = []
+
+        prof.start("wsgi")
+        prof.start("db")
+        transient = bytearray(2_000_000)
+        del transient
+        prof.stop()
+        prof.start("db")
+        kept.append(bytearray(1_000_000))
+        prof.stop()
+        prof.stop()
+        memory = [
+            info["info"]["memory"]
+            for info in (call[0][0] for call in mock_notify.call_args_list)
+            if "memory" in info["info"]
+        ]
+
+        first, second, root = memory
+        self.assertLess(first["allocated"], 100_000)
+        self.assertGreater(first["process_peak"], 2_000_000)
+        self.assertGreater(second["allocated"], 1_000_000)
+        self.assertGreater(root["process_peak"], 2_000_000)
+        self.assertGreater(root["allocated"], 1_000_000)
+        self.assertNotIn("top_sites", first)
+        self.assertLessEqual(len(root["top_sites"]), 3)
+        top = root["top_sites"][0]
+        self.assertIn("test_profiler.py:", top["site"])
+        self.assertGreater(top["size"], 1_000_000)
+        self.assertGreaterEqual(top["count"], 1)
+        self.assertIsNone(prof._snapshot)
+        self.assertEqual(0, len(prof._memory))
+
+        profiler.set_memory_tracking(False)
+        self.assertFalse(tracemalloc.is_tracing())
+
+    def test_profiler_invalid_memory_tracking(self):
+        self.assertRaises(
+            ValueError, profiler.set_memory_tracking, True, top_sites=-1
+        )
+
     def test_profiler_hmac(self):
         hmac = "secret"
         prof = profiler._Profiler(hmac, base_id="1", parent_id="2")
@@ -200,6 +628,261 @@ class WithTraceTestCase(test.TestCase):
             info={"etype": "ValueError", "message": "bar"}
         )
 
+    @mock.patch("osprofiler.profiler.stop")
+    @mock.patch("osprofiler.profiler.start")
+    def test_with_trace_disabled(self, mock_start, mock_stop):
+        self.addCleanup(tracepoints.set_disabled, [])
+        trace = profiler.Trace("a")
+        tracepoints.disable("a")
+        with trace:
+            # NOTE: Enabling it while it runs doesn't unbalance it.
+            tracepoints.enable("a")
+
+        mock_start.assert_not_called()
+        mock_stop.assert_not_called()
+
+
+class SpanTestCase(test.TestCase):
+    def setUp(self):
+        super().setUp()
+        profiler.init("secret", base_id="1", parent_id="2")
+        self.addCleanup(profiler.clean)
+        notify_patch = mock.patch("osprofiler.profiler.notifier.notify")
+        self.mock_notify = notify_patch.start()
+        self.addCleanup(notify_patch.stop)
+
+    def _sent(self):
+        return [
+            (info["name"], info["trace_id"], info["parent_id"])
+            for info in (
+                call[0][0] for call in self.mock_notify.call_args_list
+            )
+        ]
+
+    def test_finish_in_other_thread(self):
+        profiler.start("wsgi")
+        wsgi_id = profiler.get().get_id()  # type: ignore[union-attr]
+        first = profiler.start_span("attach", info={"volume": 1})
+        second = profiler.start_span("attach", info={"volume": 2})
+        # NOTE: The stack of the thread is left untouched.
+        self.assertEqual(wsgi_id, profiler.get().get_id())  # type: ignore[union-attr]
+
+        with futures.ThreadPoolExecutor(2) as executor:
+            executor.submit(second.finish, {"ok": True}).result()
+            executor.submit(first.finish).result()
+        profiler.stop()
+        sent = self._sent()
+
+        self.assertEqual(
+            [
+                ("wsgi-start", wsgi_id, "2"),
+                ("attach-start", first.trace_id, wsgi_id),
+                ("attach-start", second.trace_id, wsgi_id),
+                ("attach-stop", second.trace_id, wsgi_id),
+                ("attach-stop", first.trace_id, wsgi_id),
+                ("wsgi-stop", wsgi_id, "2"),
+            ],
+            sent,
+        )
+        stop_info = self.mock_notify.call_args_list[3][0][0]["info"]
+        self.assertTrue(stop_info["ok"])
+        self.assertIn("host", stop_info)
+
+    def test_finish_once(self):
+        span = profiler.start_span("attach")
+        span.finish()
+        span.finish()
+
+        self.assertEqual(2, self.mock_notify.call_count)
+
+    def test_explicit_parent(self):
+        parent = profiler.start_span("attach")
+        child = profiler.start_span("rpc", parent=parent)
+        child.finish()
+        parent.finish()
+
+        self.assertEqual(parent.trace_id, child.parent_id)
+        self.assertEqual(
+            ("rpc-stop", child.trace_id, parent.trace_id), self._sent()[2]
+        )
+
+    def test_activate(self):
+        span = profiler.start_span("attach")
+
+        def attach():
+            with span.activate():
+                traced_func(1)
+            span.finish()
+
+        with futures.ThreadPoolExecutor(1) as executor:
+            executor.submit(attach).result()
+        sent = self._sent()
+
+        self.assertEqual(
+            ["attach-start", "function-start", "function-stop", "attach-stop"],
+            [name for name, _, _ in sent],
+        )
+        self.assertEqual(span.trace_id, sent[1][2])
+        # NOTE: The profiler of the thread is restored.
+        self.assertEqual("2", profiler.get().get_id())  # type: ignore[union-attr]
+
+    def test_span_records(self):
+        profiler.set_notification_format("spans")
+        self.addCleanup(profiler.set_notification_format, "events")
+
+        span = profiler.start_span("attach", info={"volume": 1})
+        with span.activate():
+            traced_func(1)
+        span.finish({"ok": True})
+        sent = [call[0][0] for call in self.mock_notify.call_args_list]
+
+        self.assertEqual(
+            ["function-span", "attach-span"], [info["name"] for info in sent]
+        )
+        self.assertNotIn("local_root", sent[0])
+        self.assertNotIn("local_root", sent[1])
+        self.assertEqual(1, sent[1]["info"]["volume"])
+        self.assertEqual({"ok": True}, sent[1]["stop_info"])
+        self.assertGreaterEqual(sent[1]["duration_ns"], 0)
+
+    def test_disabled_trace_point(self):
+        self.addCleanup(tracepoints.set_disabled, [])
+        tracepoints.disable("attach")
+
+        span = profiler.start_span("attach")
+        child = profiler.start_span("rpc", parent=span)
+        child.finish()
+        span.finish()
+
+        self.assertEqual("2", span.trace_id)
+        self.assertEqual(
+            [("rpc-start", child.trace_id, "2")], self._sent()[:1]
+        )
+        self.assertEqual(2, self.mock_notify.call_count)
+
+    def test_not_sampled(self):
+        profiler.clean()
+        profiler.init("secret", base_id="1", parent_id="2", sampled=False)
+
+        span = profiler.start_span("attach")
+        with span.activate():
+            traced_func(1)
+        span.finish()
+
+        self.mock_notify.assert_not_called()
+
+    def test_no_profiler(self):
+        profiler.clean()
+
+        span = profiler.start_span("attach")
+        child = profiler.start_span("rpc", parent=span)
+        with child.activate():
+            self.assertIsNone(profiler.get())
+        child.finish()
+        span.finish()
+
+        self.assertIsNone(span.trace_id)
+        self.assertIn("'attach'", repr(span))
+        self.mock_notify.assert_not_called()
+
+
+class AnnotationsTestCase(test.TestCase):
+    def setUp(self):
+        super().setUp()
+        profiler.init("secret", base_id="1", parent_id="2")
+        self.addCleanup(profiler.clean)
+        notify_patch = mock.patch("osprofiler.profiler.notifier.notify")
+        self.mock_notify = notify_patch.start()
+        self.addCleanup(notify_patch.stop)
+
+    def _stop_info(self, name):
+        for call in self.mock_notify.call_args_list:
+            if call[0][0]["name"] == name:
+                return call[0][0]["info"]
+        self.fail(f"{name} not sent")
+
+    def test_current_trace_point(self):
+        profiler.start("wsgi")
+        profiler.add_event("retry", {"attempt": 1})
+        profiler.start("db")
+        profiler.add_counter("rows", 10)
+        profiler.add_counter("rows", 5)
+        profiler.add_event("lock acquired")
+        profiler.stop()
+        profiler.add_counter("retries")
+        profiler.stop()
+
+        db_info = self._stop_info("db-stop")
+        self.assertEqual({"rows": 15}, db_info["counters"])
+        (event,) = db_info["events"]
+        self.assertEqual("lock acquired", event["name"])
+        self.assertNotIn("attrs", event)
+        wsgi_info = self._stop_info("wsgi-stop")
+        self.assertEqual({"retries": 1}, wsgi_info["counters"])
+        (event,) = wsgi_info["events"]
+        self.assertEqual("retry", event["name"])
+        self.assertEqual({"attempt": 1}, event["attrs"])
+        self.assertLessEqual(
+            event["timestamp_ns"], db_info["events"][0]["timestamp_ns"]
+        )
+        prof = profiler.get()
+        self.assertEqual({}, prof._events)  # type: ignore[union-attr]
+        self.assertEqual({}, prof._counters)  # type: ignore[union-attr]
+
+    def test_span_handle(self):
+        span = profiler.start_span("attach")
+
+        def attach():
+            span.add_event("attached", {"device": "/dev/vdb"})
+            span.add_counter("bytes", 512)
+            span.finish()
+
+        with futures.ThreadPoolExecutor(1) as executor:
+            executor.submit(attach).result()
+
+        info = self._stop_info("attach-stop")
+        self.assertEqual({"bytes": 512}, info["counters"])
+        self.assertEqual("attached", info["events"][0]["name"])
+
+    def test_no_trace_point(self):
+        profiler.add_event("retry")
+        profiler.add_counter("retries")
+        profiler.start("wsgi")
+        profiler.stop()
+
+        self.assertNotIn("events", self._stop_info("wsgi-stop"))
+        self.assertNotIn("counters", self._stop_info("wsgi-stop"))
+
+    def test_not_sampled(self):
+        profiler.clean()
+        profiler.init("secret", base_id="1", parent_id="2", sampled=False)
+
+        profiler.start("wsgi")
+        profiler.add_event("retry")
+        profiler.add_counter("retries")
+        prof = profiler.get()
+        self.assertEqual({}, prof._events)  # type: ignore[union-attr]
+        self.assertEqual({}, prof._counters)  # type: ignore[union-attr]
+        profiler.stop()
+
+    @mock.patch("osprofiler.profiler.MAX_EVENTS", 2)
+    @mock.patch("osprofiler.profiler.stats.incr")
+    def test_max_events(self, mock_incr):
+        profiler.start("wsgi")
+        for _ in range(3):
+            profiler.add_event("retry")
+        profiler.stop()
+
+        self.assertEqual(2, len(self._stop_info("wsgi-stop")["events"]))
+        self.assertEqual(
+            [mock.call("span_events_dropped")],
+            [
+                call
+                for call in mock_incr.call_args_list
+                if call != mock.call("events_emitted")
+            ],
+        )
+
 
 @profiler.trace("function", info={"info": "some_info"})
 def traced_func(i):
@@ -222,6 +905,34 @@ def trace_with_result_func(a, i=10):
 
 
 class TraceDecoratorTestCase(test.TestCase):
+    def setUp(self):
+        super().setUp()
+        profiler.init("secret", base_id="1", parent_id="2")
+        self.addCleanup(profiler.clean)
+
+    @mock.patch("osprofiler.profiler.stop")
+    @mock.patch("osprofiler.profiler.start")
+    def test_disabled_trace_point(self, mock_start, mock_stop):
+        self.addCleanup(tracepoints.set_disabled, [])
+        qualname = "osprofiler.tests.unit.test_profiler.traced_func"
+        self.assertIn(
+            qualname,
+            [tp.qualname for tp in tracepoints.get_trace_points()],
+        )
+
+        tracepoints.disable(qualname)
+        self.assertEqual(10, traced_func(10))
+        self.assertEqual((1, 10), trace_hide_args_func(1))
+        self.assertEqual(1, mock_start.call_count)
+        self.assertEqual("hide_args", mock_start.call_args[0][0])
+
+        tracepoints.set_disabled(["hide_*"])
+        self.assertEqual(10, traced_func(10))
+        self.assertEqual((1, 10), trace_hide_args_func(1))
+        self.assertEqual(2, mock_start.call_count)
+        self.assertEqual("function", mock_start.call_args[0][0])
+        self.assertEqual(2, mock_stop.call_count)
+
     @mock.patch("osprofiler.profiler.stop")
     @mock.patch("osprofiler.profiler.start")
     def test_duplicate_trace_disallow(self, mock_start, mock_stop):
@@ -296,6 +1007,609 @@ class TraceDecoratorTestCase(test.TestCase):
         mock_stop.assert_called_once_with(info=stop_info)
 
 
+class TraceDecoratorLifetimeTestCase(test.TestCase):
+    """Trace points of coroutines and generators cover their execution."""
+
+    def setUp(self):
+        super().setUp()
+        profiler.init("secret", base_id="1", parent_id="2")
+        self.addCleanup(profiler.clean)
+        self.events: list[Any] = []
+        start_patch = mock.patch(
+            "osprofiler.profiler.start",
+            side_effect=lambda name, info=None: self.events.append("start"),
+        )
+        stop_patch = mock.patch(
+            "osprofiler.profiler.stop",
+            side_effect=lambda info=None: self.events.append(("stop", info)),
+        )
+        start_patch.start()
+        stop_patch.start()
+        self.addCleanup(start_patch.stop)
+        self.addCleanup(stop_patch.stop)
+
+    def test_coroutine(self):
+        @profiler.trace("coro", hide_result=False)
+        async def coro(a):
+            self.events.append("body")
+            await asyncio.sleep(0)
+            self.events.append("after await")
+            return a * 2
+
+        c = coro(2)
+        self.assertEqual([], self.events)
+        self.assertEqual(4, asyncio.run(c))
+        self.assertEqual(
+            [
+                "start",
+                "body",
+                "after await",
+                ("stop", {"function": {"result": "4"}}),
+            ],
+            self.events,
+        )
+        self.assertTrue(inspect.iscoroutinefunction(coro))
+
+    def test_coroutine_exception(self):
+        @profiler.trace("coro")
+        async def coro():
+            await asyncio.sleep(0)
+            raise ValueError("bad")
+
+        self.assertRaises(ValueError, asyncio.run, coro())
+        self.assertEqual(
+            ["start", ("stop", {"etype": "ValueError", "message": "bad"})],
+            self.events,
+        )
+
+    def test_generator(self):
+        @profiler.trace("gen")
+        def gen(n):
+            for i in range(n):
+                self.events.append(i)
+                yield i
+
+        g = gen(2)
+        self.assertEqual([], self.events)
+        self.assertEqual([0, 1], list(g))
+        self.assertEqual(["start", 0, 1, ("stop", None)], self.events)
+        self.assertTrue(inspect.isgeneratorfunction(gen))
+
+    def test_generator_send_and_close(self):
+        @profiler.trace("gen")
+        def gen():
+            received = yield 1
+            self.events.append(received)
+            yield 2
+            self.events.append("unreachable")
+
+        g = gen()
+        self.assertEqual(1, next(g))
+        self.assertEqual(2, g.send("sent"))
+        g.close()
+        self.assertEqual(["start", "sent", ("stop", None)], self.events)
+
+    def test_generator_exception_during_iteration(self):
+        @profiler.trace("gen")
+        def gen():
+            yield 1
+            raise ValueError("bad")
+
+        g = gen()
+        self.assertEqual(1, next(g))
+        self.assertRaises(ValueError, next, g)
+        self.assertEqual(
+            ["start", ("stop", {"etype": "ValueError", "message": "bad"})],
+            self.events,
+        )
+
+    def test_async_generator(self):
+        @profiler.trace("agen")
+        async def agen(n):
+            for i in range(n):
+                await asyncio.sleep(0)
+                self.events.append(i)
+                yield i
+
+        async def consume():
+            return [i async for i in agen(2)]
+
+        self.assertEqual([0, 1], asyncio.run(consume()))
+        self.assertEqual(["start", 0, 1, ("stop", None)], self.events)
+        self.assertTrue(inspect.isasyncgenfunction(agen))
+
+    def test_async_generator_exception_and_close(self):
+        @profiler.trace("agen")
+        async def failing():
+            yield 1
+            raise ValueError("bad")
+
+        @profiler.trace("agen")
+        async def endless():
+            while True:
+                yield 1
+
+        async def consume():
+            g = failing()
+            await g.__anext__()
+            with testtools.ExpectedException(ValueError):
+                await g.__anext__()
+            g = endless()
+            await g.__anext__()
+            await g.aclose()
+
+        asyncio.run(consume())
+        self.assertEqual(
+            [
+                "start",
+                ("stop", {"etype": "ValueError", "message": "bad"}),
+                "start",
+                ("stop", None),
+            ],
+            self.events,
+        )
+
+    def test_trace_cls_coroutine_method(self):
+        events = self.events
+
+        @profiler.trace_cls("rpc")
+        class Service:
+            async def call(self):
+                await asyncio.sleep(0)
+                events.append("body")
+
+        asyncio.run(Service().call())
+        self.assertEqual(["start", "body", ("stop", None)], self.events)
+
+
+class TraceDecoratorInterleavingTestCase(test.TestCase):
+    """Generators suspended across the trace points of their consumer."""
+
+    def setUp(self):
+        super().setUp()
+        profiler.init("secret", base_id="1", parent_id="2")
+        self.addCleanup(profiler.clean)
+        self.sent: list[Any] = []
+        notifier.set(lambda info, context=None: self.sent.append(info))
+        self.addCleanup(notifier.set, notifier._noop_notifier)
+
+    def _events(self):
+        ids = {
+            info["trace_id"]: info["name"][: -len("-start")]
+            for info in self.sent
+            if info["name"].endswith("-start")
+        }
+        ids["2"] = "root"
+        return [(info["name"], ids[info["parent_id"]]) for info in self.sent]
+
+    def test_generator(self):
+        @profiler.trace("gen")
+        def gen():
+            with profiler.Trace("first"):
+                yield 1
+            with profiler.Trace("second"):
+                pass
+            yield 2
+
+        with profiler.Trace("outer"):
+            g = gen()
+            self.assertEqual(1, next(g))
+        with profiler.Trace("other"):
+            self.assertEqual(2, next(g))
+        self.assertRaises(StopIteration, next, g)
+
+        self.assertEqual(
+            [
+                ("outer-start", "root"),
+                ("gen-start", "outer"),
+                ("first-start", "gen"),
+                ("outer-stop", "root"),
+                ("other-start", "root"),
+                ("first-stop", "gen"),
+                ("second-start", "gen"),
+                ("second-stop", "gen"),
+                ("other-stop", "root"),
+                ("gen-stop", "outer"),
+            ],
+            self._events(),
+        )
+        self.assertEqual("2", profiler.get().get_id())  # type: ignore[union-attr]
+
+    def test_generators_interleaved(self):
+        @profiler.trace("gen")
+        def gen(name):
+            for i in range(2):
+                with profiler.Trace(name):
+                    pass
+                yield i
+
+        a = gen("a")
+        b = gen("b")
+        next(a)
+        next(b)
+        a.close()
+        next(b)
+        b.close()
+
+        self.assertEqual(
+            [
+                ("gen-start", "root"),
+                ("a-start", "gen"),
+                ("a-stop", "gen"),
+                ("gen-start", "root"),
+                ("b-start", "gen"),
+                ("b-stop", "gen"),
+                ("gen-stop", "root"),
+                ("b-start", "gen"),
+                ("b-stop", "gen"),
+                ("gen-stop", "root"),
+            ],
+            self._events(),
+        )
+        a_stop, b_stop = (
+            info for info in self.sent if info["name"] == "gen-stop"
+        )
+        self.assertEqual(self.sent[0]["trace_id"], a_stop["trace_id"])
+        self.assertEqual(self.sent[3]["trace_id"], b_stop["trace_id"])
+        self.assertEqual(self.sent[3]["trace_id"], self.sent[7]["parent_id"])
+
+    def test_async_generator(self):
+        @profiler.trace("agen")
+        async def agen():
+            with profiler.Trace("first"):
+                yield 1
+            yield 2
+
+        async def consume():
+            with profiler.Trace("outer"):
+                g = agen()
+                self.assertEqual(1, await g.__anext__())
+            with profiler.Trace("other"):
+                self.assertEqual(2, await g.__anext__())
+            await g.aclose()
+
+        asyncio.run(consume())
+        self.assertEqual(
+            [
+                ("outer-start", "root"),
+                ("agen-start", "outer"),
+                ("first-start", "agen"),
+                ("outer-stop", "root"),
+                ("other-start", "root"),
+                ("first-stop", "agen"),
+                ("other-stop", "root"),
+                ("agen-stop", "outer"),
+            ],
+            self._events(),
+        )
+
+
+class TraceDecoratorDisabledTestCase(test.TestCase):
+    """Traced functions are called directly when profiling is disabled."""
+
+    def setUp(self):
+        super().setUp()
+        profiler.clean()
+        start_patch = mock.patch("osprofiler.profiler.start")
+        stop_patch = mock.patch("osprofiler.profiler.stop")
+        self.mock_start = start_patch.start()
+        self.mock_stop = stop_patch.start()
+        self.addCleanup(start_patch.stop)
+        self.addCleanup(stop_patch.stop)
+
+    def test_function(self):
+        class Arg:
+            def __repr__(self):
+                raise AssertionError("arguments must not be formatted")
+
+        @profiler.trace("disabled", hide_result=False)
+        def func(a, b=None):
+            return a
+
+        arg = Arg()
+        self.assertIs(arg, func(arg, b=arg))
+        self.mock_start.assert_not_called()
+        self.mock_stop.assert_not_called()
+
+    def test_exception(self):
+        @profiler.trace("disabled")
+        def func():
+            raise ValueError("bad")
+
+        self.assertRaises(ValueError, func)
+        self.mock_start.assert_not_called()
+        self.mock_stop.assert_not_called()
+
+    def test_coroutine_and_generators(self):
+        @profiler.trace("coro")
+        async def coro(a):
+            await asyncio.sleep(0)
+            return a
+
+        @profiler.trace("gen")
+        def gen(n):
+            yield from range(n)
+            return n
+
+        @profiler.trace("agen")
+        async def agen(n):
+            for i in range(n):
+                yield i
+
+        async def consume():
+            return [i async for i in agen(2)]
+
+        self.assertEqual(1, asyncio.run(coro(1)))
+        self.assertEqual([0, 1], list(gen(2)))
+        self.assertEqual([0, 1], asyncio.run(consume()))
+        self.mock_start.assert_not_called()
+        self.mock_stop.assert_not_called()
+
+    def test_async_generator_asend_athrow(self):
+        received = []
+
+        @profiler.trace("agen")
+        async def agen():
+            total = 0
+            while True:
+                try:
+                    value = yield total
+                except ValueError:
+                    received.append("error")
+                    total = 0
+                else:
+                    received.append(value)
+                    total += value
+
+        async def consume():
+            g = agen()
+            results = [await g.__anext__()]
+            results.append(await g.asend(2))
+            results.append(await g.asend(3))
+            results.append(await g.athrow(ValueError()))
+            await g.aclose()
+            return results
+
+        self.assertEqual([0, 2, 5, 0], asyncio.run(consume()))
+        self.assertEqual([2, 3, "error"], received)
+        self.mock_start.assert_not_called()
+        self.mock_stop.assert_not_called()
+
+    def test_trace_cls(self):
+        fake_cls = FakeTraceClassWithInfo()
+        self.assertEqual(30, fake_cls.method1(5, 15))
+        self.mock_start.assert_not_called()
+        self.mock_stop.assert_not_called()
+
+    def test_info_not_shared_between_calls(self):
+        info = {"a": 1}
+
+        @profiler.trace("shared", info=info)
+        def func(x):
+            return x
+
+        profiler.init("secret", base_id="1", parent_id="2")
+        self.addCleanup(profiler.clean)
+        func(1)
+        func(2)
+        self.assertEqual({"a": 1}, info)
+        first = self.mock_start.call_args_list[0][1]["info"]
+        second = self.mock_start.call_args_list[1][1]["info"]
+        self.assertIsNot(first, second)
+        self.assertEqual(str((1,)), first["function"]["args"])
+        self.assertEqual(str((2,)), second["function"]["args"])
+
+
+class TraceDecoratorAggregationTestCase(test.TestCase):
+    def setUp(self):
+        super().setUp()
+        profiler.set_aggregation(min_calls=2, max_duration=1.0)
+        self.addCleanup(profiler.set_aggregation)
+        profiler.init("secret", base_id="1", parent_id="2")
+        self.addCleanup(profiler.clean)
+        notify_patch = mock.patch("osprofiler.profiler.notifier.notify")
+        self.mock_notify = notify_patch.start()
+        self.addCleanup(notify_patch.stop)
+
+    def _sent(self):
+        return [call[0][0] for call in self.mock_notify.call_args_list]
+
+    @mock.patch("osprofiler.stats.__stats", new_callable=stats.Stats)
+    def test_hot_function(self, mock_stats):
+        @profiler.trace("hot")
+        def hot(x):
+            if x == 3:
+                raise ValueError(x)
+            return x
+
+        with profiler.Trace("parent"):
+            for i in range(5):
+                try:
+                    hot(i)
+                except ValueError:
+                    pass
+        sent = self._sent()
+
+        self.assertEqual(
+            ["parent-start", "hot-start", "hot-stop", "hot-start", "hot-stop"]
+            + ["hot-start", "hot-stop", "parent-stop"],
+            [info["name"] for info in sent],
+        )
+        summary, summary_stop = sent[5], sent[6]
+        self.assertEqual(sent[0]["trace_id"], summary["parent_id"])
+        self.assertEqual(summary["trace_id"], summary_stop["trace_id"])
+        aggregated = summary["info"]["aggregated"]
+        self.assertEqual(3, aggregated["count"])
+        self.assertEqual({"ValueError": 1}, aggregated["errors"])
+        self.assertEqual(
+            aggregated["duration_ns"],
+            summary_stop["timestamp_ns"] - summary["timestamp_ns"],
+        )
+        self.assertEqual("ValueError", summary_stop["info"]["etype"])
+        self.assertEqual(
+            "1 of 3 aggregated calls failed: ValueError (1)",
+            summary_stop["info"]["message"],
+        )
+        self.assertIn("hot", summary["info"]["function"]["name"])
+        self.assertEqual(
+            3, mock_stats.snapshot()["counters"]["spans_aggregated"]
+        )
+        prof = profiler.get()
+        self.assertIsNotNone(prof)
+        self.assertEqual({}, prof._aggregates)  # type: ignore[union-attr]
+
+    def test_nested_trace_points_not_sent(self):
+        @profiler.trace("inner")
+        def inner():
+            with profiler.Trace("block"):
+                pass
+
+        @profiler.trace("hot")
+        def hot():
+            inner()
+            profiler.start_span("span").finish()
+
+        with profiler.Trace("parent"):
+            for i in range(3):
+                hot()
+        sent = self._sent()
+
+        self.assertEqual(
+            ["parent"]
+            + ["hot", "inner", "block", "block", "inner", "span", "span"]
+            + ["hot", "hot", "inner", "block", "block", "inner", "span"]
+            + ["span", "hot", "hot", "hot", "parent"],
+            [info["name"].rsplit("-", 1)[0] for info in sent],
+        )
+        self.assertEqual(1, sent[17]["info"]["aggregated"]["count"])
+        self.assertEqual(sent[0]["trace_id"], sent[17]["parent_id"])
+        prof = profiler.get()
+        self.assertIsNotNone(prof)
+        self.assertIsNone(prof.sampled)  # type: ignore[union-attr]
+
+    def test_counted_per_parent(self):
+        @profiler.trace("hot")
+        def hot():
+            pass
+
+        for parent in range(2):
+            with profiler.Trace("parent"):
+                hot()
+                hot()
+        names = [info["name"] for info in self._sent()]
+
+        self.assertEqual(4, names.count("hot-start"))
+        self.assertNotIn("aggregated", str(self._sent()))
+
+    def test_slow_function(self):
+        @profiler.trace("slow")
+        def slow():
+            pass
+
+        profiler.set_aggregation(min_calls=2, max_duration=0)
+        with profiler.Trace("parent"):
+            for i in range(5):
+                slow()
+        names = [info["name"] for info in self._sent()]
+
+        self.assertEqual(5, names.count("slow-start"))
+
+    def test_coroutine(self):
+        @profiler.trace("hot")
+        async def hot():
+            await asyncio.sleep(0)
+
+        async def run():
+            for i in range(4):
+                await hot()
+
+        with profiler.Trace("parent"):
+            asyncio.run(run())
+        sent = self._sent()
+
+        self.assertEqual(3, [info["name"] for info in sent].count("hot-start"))
+        self.assertEqual(2, sent[5]["info"]["aggregated"]["count"])
+
+    def test_span_records(self):
+        profiler.set_notification_format("spans")
+        self.addCleanup(profiler.set_notification_format, "events")
+
+        @profiler.trace("hot")
+        def hot():
+            pass
+
+        with profiler.Trace("parent"):
+            for i in range(4):
+                hot()
+        sent = self._sent()
+
+        self.assertEqual(
+            ["hot-span", "hot-span", "hot-span", "parent-span"],
+            [info["name"] for info in sent],
+        )
+        self.assertEqual(2, sent[2]["info"]["aggregated"]["count"])
+        self.assertEqual(
+            sent[2]["info"]["aggregated"]["duration_ns"],
+            sent[2]["duration_ns"],
+        )
+
+    def test_invalid(self):
+        self.assertRaises(ValueError, profiler.set_aggregation, min_calls=-1)
+
+
+class TraceDecoratorCaptureTestCase(test.TestCase):
+    def setUp(self):
+        super().setUp()
+        self.sent: list[Any] = []
+        self.repr_calls = 0
+        profiler.init("secret", base_id="1", parent_id="2")
+        self.addCleanup(profiler.clean)
+        self.addCleanup(notifier.set, notifier._noop_notifier)
+
+    def _value(self):
+        test_case = self
+
+        class Value:
+            def __repr__(self):
+                test_case.repr_calls += 1
+                return "v" * 10000
+
+        return Value()
+
+    def test_bounded_capture(self):
+        @profiler.trace("capture", hide_result=False)
+        def func(value, items):
+            return value
+
+        notifier.set(lambda info, context=None: self.sent.append(info))
+        func(self._value(), items=list(range(1000)))
+
+        start, stop = self.sent
+        self.assertEqual(2, self.repr_calls)
+        self.assertIs(str, type(start["info"]["function"]["args"]))
+        self.assertEqual(1000, len(start["info"]["function"]["args"]))
+        self.assertEqual(1000, len(stop["info"]["function"]["result"]))
+        self.assertTrue(
+            start["info"]["function"]["kwargs"].endswith(", 49, ...]}")
+        )
+
+    def test_dropped_trace_not_formatted(self):
+        @profiler.trace("capture", hide_result=False)
+        def func(value):
+            return value
+
+        notifier.set(
+            notifier.TailSamplingNotifier(
+                lambda info, context=None: self.sent.append(info),
+                min_duration=60,
+            )
+        )
+        func(self._value())
+
+        self.assertEqual([], self.sent)
+        self.assertEqual(0, self.repr_calls)
+
+
 class FakeTracedCls:
     def method1(self, a, b, c=10):
         return a + b + c
@@ -368,6 +1682,11 @@ def possible_mock_calls(name, info):
 
 
 class TraceClsDecoratorTestCase(test.TestCase):
+    def setUp(self):
+        super().setUp()
+        profiler.init("secret", base_id="1", parent_id="2")
+        self.addCleanup(profiler.clean)
+
     @mock.patch("osprofiler.profiler.stop")
     @mock.patch("osprofiler.profiler.start")
     def test_args(self, mock_start, mock_stop):
@@ -515,6 +1834,59 @@ class TraceClsDecoratorTestCase(test.TestCase):
         mock_start.assert_not_called()
         mock_stop.assert_not_called()
 
+    @mock.patch("osprofiler.profiler.stop")
+    @mock.patch("osprofiler.profiler.start")
+    def test_lazy(self, mock_start, mock_stop):
+        @profiler.trace_cls("rpc", trace_static_methods=True, lazy=True)
+        class FakeTraceLazy(FakeTraceStaticMethodBase):
+            pass
+
+        self.assertIsInstance(
+            FakeTraceLazy.__dict__["method1"], profiler._LazyTrace
+        )
+        self.assertIsInstance(
+            FakeTraceLazy.__dict__["static_method"], profiler._LazyTrace
+        )
+        self.assertNotIn("_method", FakeTraceLazy.__dict__)
+
+        fake_cls = FakeTraceLazy()
+        self.assertEqual(30, fake_cls.method1(5, 15))
+        self.assertEqual(25, FakeTraceLazy.static_method(25))
+        self.assertEqual(2, mock_start.call_count)
+        self.assertEqual(2, mock_stop.call_count)
+        self.assertIsInstance(
+            FakeTraceLazy.__dict__["static_method"], staticmethod
+        )
+        self.assertIsInstance(
+            FakeTraceLazy.__dict__["method2"], profiler._LazyTrace
+        )
+
+    def test_lazy_multiple_trace(self):
+        @profiler.trace_cls("rpc", lazy=True)
+        class FakeTraceLazy(FakeTracedCls):
+            pass
+
+        self.assertRaises(
+            ValueError,
+            profiler.trace_cls("rpc", allow_multiple_trace=False),
+            FakeTraceLazy,
+        )
+
+    @mock.patch("osprofiler.profiler.stop")
+    @mock.patch("osprofiler.profiler.start")
+    def test_instance(self, mock_start, mock_stop):
+        fake_obj = FakeTracedCls()
+        fake_obj.method4 = lambda: 4  # type: ignore[attr-defined]
+        profiler.trace_cls("rpc", lazy=True)(fake_obj)  # type: ignore[type-var]
+
+        self.assertEqual(4, fake_obj.method4())  # type: ignore[attr-defined]
+        self.assertEqual(3, fake_obj.method2(5, 2))
+        self.assertEqual(2, mock_start.call_count)
+        # NOTE: Instance attributes can't be lazy.
+        self.assertNotIsInstance(
+            fake_obj.__dict__["method2"], profiler._LazyTrace
+        )
+
 
 class FakeTraceWithMetaclassBase(metaclass=profiler.TracedMeta):
     __trace_args__: ClassVar[dict[str, Any]] = {
@@ -562,6 +1934,11 @@ class FakeTraceWithMetaclassPrivate(FakeTraceWithMetaclassBase):
 
 
 class TraceWithMetaclassTestCase(test.TestCase):
+    def setUp(self):
+        super().setUp()
+        profiler.init("secret", base_id="1", parent_id="2")
+        self.addCleanup(profiler.clean)
+
     def test_no_name_exception(self):
         def define_class_with_no_name():
             class FakeTraceWithMetaclassNoName(
@@ -571,6 +1948,35 @@ class TraceWithMetaclassTestCase(test.TestCase):
 
         self.assertRaises(TypeError, define_class_with_no_name, 1)
 
+    @mock.patch("osprofiler.profiler.stop")
+    @mock.patch("osprofiler.profiler.start")
+    def test_lazy(self, mock_start, mock_stop):
+        class FakeTraceLazyBase(metaclass=profiler.TracedMeta):
+            __trace_args__: ClassVar[dict[str, Any]] = {
+                "name": "rpc",
+                "lazy": True,
+            }
+
+            def method1(self, a):
+                return a
+
+        class FakeTraceLazy(FakeTraceLazyBase):
+            def method2(self, a):
+                return a * 2
+
+        self.assertIsInstance(
+            FakeTraceLazyBase.__dict__["method1"], profiler._LazyTrace
+        )
+        fake_obj = FakeTraceLazy()
+        self.assertEqual(1, fake_obj.method1(1))
+        self.assertEqual(4, fake_obj.method2(2))
+
+        self.assertEqual(2, mock_start.call_count)
+        self.assertEqual("rpc", mock_start.call_args[0][0])
+        # NOTE: Resolved on the class that defines the method.
+        self.assertNotIn("method1", FakeTraceLazy.__dict__)
+        self.assertEqual(1, FakeTraceLazyBase.__dict__["method1"].__traced__)
+
     @mock.patch("osprofiler.profiler.stop")
     @mock.patch("osprofiler.profiler.start")
     def test_args(self, mock_start, mock_stop):
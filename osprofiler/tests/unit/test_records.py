@@ -0,0 +1,76 @@
+# Copyright 2026 OpenStack Foundation.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import pickle
+
+from osprofiler import records
+from osprofiler.tests import test
+
+
+class TraceRecordTestCase(test.TestCase):
+    def _record(self, **kwargs):
+        return records.TraceRecord(
+            "db-start", "1", "3", "2", 1450879342338776123, **kwargs
+        )
+
+    def test_mapping(self):
+        record = self._record(info={"host": "h"})
+        payload = {
+            "name": "db-start",
+            "base_id": "1",
+            "trace_id": "3",
+            "parent_id": "2",
+            "timestamp": "2015-12-23T14:02:22.338776",
+            "timestamp_ns": 1450879342338776123,
+            "info": {"host": "h"},
+        }
+
+        self.assertEqual(payload, record)
+        self.assertEqual(list(payload), list(record))
+        self.assertEqual(7, len(record))
+        self.assertEqual("2015-12-23T14:02:22.338776", record["timestamp"])
+        self.assertEqual({"host": "h"}, record.get("info"))
+        self.assertIsNone(record.get("stop_info"))
+        self.assertNotIn("duration_ns", record)
+        self.assertRaises(KeyError, record.__getitem__, "nope")
+
+    def test_optional_fields(self):
+        record = self._record(
+            duration_ns=0, stop_info={"etype": "E"}, local_root=True
+        )
+
+        self.assertNotIn("info", record)
+        self.assertEqual(0, record["duration_ns"])
+        self.assertEqual({"etype": "E"}, record["stop_info"])
+        self.assertIs(True, record["local_root"])
+        self.assertFalse(self._record().get("local_root"))
+
+    def test_copy(self):
+        record = self._record(info={"host": "h"}, duration_ns=5)
+        payload = record.copy()
+
+        self.assertIs(dict, type(payload))
+        self.assertEqual(dict(record), payload)
+        payload["project"] = "p"
+        self.assertNotIn("project", record)
+
+    def test_slots(self):
+        record = self._record()
+        self.assertFalse(hasattr(record, "__dict__"))
+        self.assertRaises(AttributeError, setattr, record, "project", "p")
+
+    def test_pickle(self):
+        record = self._record(info={"host": "h"})
+        self.assertEqual(record, pickle.loads(pickle.dumps(record)))  # noqa: S301
@@ -0,0 +1,129 @@
+# Copyright 2026 OpenStack Foundation.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+from unittest import mock
+
+import ddt
+
+from osprofiler import profiler
+from osprofiler import sampling
+from osprofiler.tests import test
+
+
+@ddt.ddt
+class SamplerTestCase(test.TestCase):
+    def test_defaults_sample_everything(self):
+        sampler = sampling.Sampler()
+        self.assertTrue(all(sampler.should_sample() for _ in range(100)))
+
+    def test_rate_zero(self):
+        sampler = sampling.Sampler(rate=0)
+        self.assertFalse(any(sampler.should_sample() for _ in range(100)))
+
+    @mock.patch("random.random")
+    def test_rate(self, mock_random):
+        sampler = sampling.Sampler(rate=0.3)
+        mock_random.return_value = 0.29
+        self.assertTrue(sampler.should_sample())
+        mock_random.return_value = 0.3
+        self.assertFalse(sampler.should_sample())
+
+    @ddt.data(-0.1, 1.5)
+    def test_invalid_rate(self, rate):
+        self.assertRaises(ValueError, sampling.Sampler, rate=rate)
+
+    def test_invalid_max_per_second(self):
+        self.assertRaises(ValueError, sampling.Sampler, max_per_second=-1)
+
+    @mock.patch("time.monotonic")
+    def test_max_per_second(self, mock_monotonic):
+        mock_monotonic.return_value = 100.0
+        sampler = sampling.Sampler(max_per_second=2)
+
+        self.assertEqual(
+            [True, True, False], [sampler.should_sample() for _ in range(3)]
+        )
+        mock_monotonic.return_value = 100.5
+        self.assertEqual(
+            [True, False], [sampler.should_sample() for _ in range(2)]
+        )
+        mock_monotonic.return_value = 110.0
+        self.assertEqual(
+            [True, True, False], [sampler.should_sample() for _ in range(3)]
+        )
+
+    def test_path_rates(self):
+        sampler = sampling.Sampler(
+            rate=1, path_rates="/healthcheck*:0, /v2.1/*:1,/*:0"
+        )
+        self.assertEqual(
+            [("/healthcheck*", 0), ("/v2.1/*", 1), ("/*", 0)],
+            sampler.path_rates,
+        )
+        self.assertFalse(sampler.should_sample("/healthcheck/status"))
+        self.assertTrue(sampler.should_sample("/v2.1/servers"))
+        self.assertFalse(sampler.should_sample("/v3/projects"))
+        self.assertTrue(sampler.should_sample())
+
+    def test_path_rates_mapping(self):
+        sampler = sampling.Sampler(rate=0, path_rates={"/servers*": "1"})
+        self.assertTrue(sampler.should_sample("/servers/1"))
+        self.assertFalse(sampler.should_sample("/images"))
+
+    @ddt.data("/healthcheck", "/healthcheck:2", ":0.5")
+    def test_invalid_path_rates(self, path_rates):
+        self.assertRaises(ValueError, sampling.Sampler, path_rates=path_rates)
+
+
+class SamplingModuleTestCase(test.TestCase):
+    def setUp(self):
+        super().setUp()
+        profiler.clean()
+        self.addCleanup(profiler.clean)
+        self.addCleanup(sampling.set, None)
+
+    def test_should_sample_without_sampler(self):
+        sampling.set(None)
+        self.assertIsNone(sampling.get())
+        self.assertIsNone(sampling.should_sample())
+
+    def test_should_sample(self):
+        sampler = sampling.Sampler(rate=0)
+        sampling.set(sampler)
+        self.assertIs(sampler, sampling.get())
+        self.assertIs(False, sampling.should_sample())
+
+    def test_profiler_init_uses_sampler(self):
+        sampling.set(sampling.Sampler(rate=0))
+        self.assertIs(False, profiler.init("secret").sampled)
+
+    def test_profiler_init_keeps_decision(self):
+        sampling.set(sampling.Sampler(rate=0))
+        self.assertIs(True, profiler.init("secret", sampled=True).sampled)
+
+    @mock.patch("osprofiler.profiler.notifier.notify")
+    def test_not_sampled_trace_is_not_sent(self, mock_notify):
+        @profiler.trace("traced")
+        def traced():
+            return 1
+
+        p = profiler.init("secret", base_id="1", parent_id="2", sampled=False)
+        with profiler.Trace("block"):
+            self.assertEqual(1, traced())
+        p.start("manual")
+        p.stop()
+
+        mock_notify.assert_not_called()
+        self.assertEqual(["1", "2"], list(p._trace_stack))
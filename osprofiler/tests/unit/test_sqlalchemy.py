@@ -19,6 +19,7 @@ from unittest import mock
 
 from osprofiler import sqlalchemy
 from osprofiler.tests import test
+from osprofiler import tracepoints
 
 
 class SqlalchemyTracingTestCase(test.TestCase):
@@ -30,6 +31,24 @@ class SqlalchemyTracingTestCase(test.TestCase):
         expected_info = {"db": {"statement": 2, "params": 3}}
         mock_profiler.start.assert_called_once_with("sql", info=expected_info)
 
+    @mock.patch("osprofiler.sqlalchemy.profiler")
+    def test_disabled_trace_point(self, mock_profiler):
+        self.addCleanup(tracepoints.set_disabled, [])
+        before = sqlalchemy._before_cursor_execute("sql")
+        after = sqlalchemy._after_cursor_execute()
+        context = mock.Mock(spec=[])
+        exception_context = mock.Mock(execution_context=context)
+
+        tracepoints.disable("osprofiler.sqlalchemy")
+        before(mock.MagicMock(), 1, 2, 3, context, 5)
+        # NOTE: Statements started while disabled are never traced.
+        tracepoints.enable("osprofiler.sqlalchemy")
+        after(mock.MagicMock(), 1, 2, 3, context, 5)
+        sqlalchemy.handle_error(exception_context)
+
+        mock_profiler.start.assert_not_called()
+        mock_profiler.stop.assert_not_called()
+
     @mock.patch("osprofiler.sqlalchemy.profiler")
     def test_after_execute(self, mock_profiler):
         handler = sqlalchemy._after_cursor_execute()
@@ -0,0 +1,244 @@
+# Copyright 2026 OpenStack Foundation.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+from concurrent import futures
+import threading
+from unittest import mock
+
+from osprofiler import profiler
+from osprofiler import stacksampler
+from osprofiler.tests import test
+
+
+def blocked(started, release):
+    started.set()
+    release.wait(5)
+
+
+class StackSamplerTestCase(test.TestCase):
+    def _sampler(self, **kwargs):
+        sampler = stacksampler.StackSampler(**kwargs)
+        self.addCleanup(sampler.shutdown)
+        return sampler
+
+    def test_sample(self):
+        # NOTE: A long interval, so that only explicit samples are taken.
+        sampler = self._sampler(interval=60)
+        prof = profiler._Profiler("secret", base_id="1", parent_id="2")
+        started, release = threading.Event(), threading.Event()
+
+        def run():
+            prof.start("rpc")
+            sampler.track(prof)
+            blocked(started, release)
+            prof.stop()
+
+        thread = threading.Thread(target=run)
+        thread.start()
+        self.addCleanup(thread.join)
+        self.addCleanup(release.set)
+        started.wait(5)
+
+        self.assertEqual(1, sampler.sample())
+        self.assertEqual(1, sampler.sample())
+        ((trace_id, stacks),) = prof._stacks.items()
+        self.assertEqual(prof._trace_stack[-1], trace_id)
+        ((stack, count),) = stacks.items()
+        self.assertEqual(2, count)
+        self.assertTrue(
+            stack.endswith(
+                "osprofiler.tests.unit.test_stacksampler:blocked;"
+                "threading:Event.wait;threading:Condition.wait"
+            ),
+            stack,
+        )
+
+    def test_untrack(self):
+        sampler = self._sampler(interval=60)
+        prof = profiler._Profiler("secret", base_id="1", parent_id="2")
+        prof.start("rpc")
+        sampler.track(prof)
+        sampler.untrack(profiler._Profiler("other"))
+        self.assertEqual(1, sampler.sample())
+
+        sampler.untrack(prof)
+        self.assertEqual(0, sampler.sample())
+
+    def test_exited_thread(self):
+        sampler = self._sampler(interval=60)
+        prof = profiler._Profiler("secret", base_id="1", parent_id="2")
+        prof.start("rpc")
+        thread = threading.Thread(target=sampler.track, args=(prof,))
+        thread.start()
+        thread.join()
+
+        self.assertEqual(0, sampler.sample())
+        self.assertEqual({}, sampler._profilers)
+
+    def test_max_depth_and_max_stacks(self):
+        sampler = self._sampler(interval=60, max_depth=2, max_stacks=1)
+        prof = profiler._Profiler("secret", base_id="1", parent_id="2")
+        prof.start("rpc")
+        sampler.track(prof)
+
+        def other_stack():
+            sampler.sample()
+
+        sampler.sample()
+        other_stack()
+        stacks = prof._stacks[prof.get_id()]
+        self.assertEqual(2, len(stacks))
+        self.assertEqual(1, stacks[stacksampler.TRUNCATED])
+        stack = next(iter(stacks))
+        self.assertEqual(2, len(stack.split(";")))
+        self.assertTrue(stack.endswith(":StackSampler.sample"))
+
+    def test_get_delay(self):
+        sampler = self._sampler(interval=0.01, max_overhead=0.01)
+
+        self.assertEqual(0.01, sampler.get_delay(0.00001))
+        self.assertAlmostEqual(0.5, sampler.get_delay(0.005))
+        sampler.max_overhead = 0
+        self.assertEqual(0.01, sampler.get_delay(0.005))
+
+    def test_invalid(self):
+        self.assertRaises(ValueError, stacksampler.StackSampler, interval=0)
+        self.assertRaises(
+            ValueError, stacksampler.StackSampler, max_overhead=2
+        )
+
+    def test_thread(self):
+        sampler = self._sampler(interval=0.001)
+        sampled = threading.Event()
+        prof = profiler._Profiler("secret", base_id="1", parent_id="2")
+        prof.start("rpc")
+
+        def sample():
+            sampled.set()
+            return 1
+
+        with mock.patch.object(sampler, "sample", side_effect=sample):
+            sampler.track(prof)
+            self.assertTrue(sampled.wait(5))
+            sampler.shutdown()
+            self.assertIsNotNone(sampler._thread)
+            self.assertFalse(sampler._thread.is_alive())
+
+    def test_after_fork(self):
+        sampler = self._sampler(interval=60)
+        prof = profiler._Profiler("secret", base_id="1", parent_id="2")
+        prof.start("rpc")
+        sampler.track(prof)
+        thread = sampler._thread
+        # NOTE: Stops the thread of the "parent" at the end of the test.
+        self.addCleanup(sampler._stop.set)
+
+        sampler._after_fork()
+        self.assertIsNone(sampler._thread)
+        self.assertEqual({}, sampler._profilers)
+
+        sampler.track(prof)
+        self.assertIsNotNone(sampler._thread)
+        self.assertIsNot(thread, sampler._thread)
+        self.assertEqual(1, sampler.sample())
+
+    def test_set(self):
+        self.addCleanup(stacksampler.set, None)
+        first = self._sampler()
+        second = self._sampler()
+
+        stacksampler.set(first)
+        self.assertIs(first, stacksampler.get())
+        with mock.patch.object(first, "shutdown") as mock_shutdown:
+            stacksampler.set(second)
+        mock_shutdown.assert_called_once_with()
+        self.assertIs(second, stacksampler.get())
+
+
+class ProfilerStackSamplingTestCase(test.TestCase):
+    @mock.patch("osprofiler.profiler.notifier.notify")
+    def test_stacks_in_stop_info(self, mock_notify):
+        sampler = stacksampler.StackSampler(interval=60)
+        self.addCleanup(sampler.shutdown)
+        stacksampler.set(sampler)
+        self.addCleanup(stacksampler.set, None)
+        prof = profiler._Profiler("secret", base_id="1", parent_id="2")
+
+        prof.start("wsgi")
+        self.assertIs(prof, sampler._profilers[threading.get_ident()])
+        prof.start("db")
+        sampler.sample()
+        prof.stop()
+        prof.stop()
+        sent = [call[0][0] for call in mock_notify.call_args_list]
+
+        self.assertEqual(
+            ["wsgi-start", "db-start", "db-stop", "wsgi-stop"],
+            [info["name"] for info in sent],
+        )
+        ((stack, count),) = sent[2]["info"]["stacks"].items()
+        self.assertEqual(1, count)
+        self.assertIn("test_stacks_in_stop_info", stack)
+        self.assertNotIn("stacks", sent[3]["info"])
+        self.assertEqual({}, prof._stacks)
+        self.assertEqual({}, sampler._profilers)
+
+    def test_unsampled_trace(self):
+        sampler = stacksampler.StackSampler(interval=60)
+        self.addCleanup(sampler.shutdown)
+        stacksampler.set(sampler)
+        self.addCleanup(stacksampler.set, None)
+        prof = profiler._Profiler(
+            "secret", base_id="1", parent_id="2", sampled=False
+        )
+
+        prof.start("wsgi")
+        self.assertEqual({}, sampler._profilers)
+        prof.stop()
+
+    @mock.patch("osprofiler.profiler.notifier.notify")
+    def test_executor_thread_untracked(self, mock_notify):
+        sampler = stacksampler.StackSampler(interval=60)
+        self.addCleanup(sampler.shutdown)
+        stacksampler.set(sampler)
+        self.addCleanup(stacksampler.set, None)
+        executor = futures.ThreadPoolExecutor(max_workers=1)
+        self.addCleanup(executor.shutdown)
+
+        forks = []
+
+        @profiler.trace("db")
+        def query():
+            forks.append(profiler.get())
+            sampler.sample()
+
+        profiler.init("secret", base_id="1", parent_id="2")
+        self.addCleanup(profiler.clean)
+        with profiler.Trace("wsgi"):
+            profiler.submit(executor, query).result()
+            prof = profiler.get()
+            self.assertEqual({threading.get_ident(): prof}, sampler._profilers)
+
+        sent = [call[0][0] for call in mock_notify.call_args_list]
+        self.assertEqual(
+            ["wsgi-start", "db-start", "db-stop", "wsgi-stop"],
+            [info["name"] for info in sent],
+        )
+        self.assertIn("stacks", sent[2]["info"])
+        self.assertIsNot(prof._stacks, forks[0]._stacks)  # type: ignore[union-attr]
+        self.assertEqual({}, sampler._profilers)
+        # NOTE: The idle pool thread isn't sampled anymore.
+        executor.submit(sampler.sample).result()
+        self.assertEqual({}, prof._stacks)  # type: ignore[union-attr]
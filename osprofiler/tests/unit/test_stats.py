@@ -0,0 +1,156 @@
+# Copyright 2026 OpenStack Foundation.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import gc
+import json
+import threading
+from unittest import mock
+
+import webob
+
+from osprofiler import stats
+from osprofiler.tests import test
+
+
+class Queue:
+    def __init__(self, size):
+        self.size = size
+
+    def qsize(self):
+        return self.size
+
+
+class HistogramTestCase(test.TestCase):
+    def test_observe(self):
+        histogram = stats.Histogram([1.0, 2.0])
+        for value in [0.5, 1.0, 1.5, 3.0, 4.0]:
+            histogram.observe(value)
+
+        self.assertEqual(
+            {
+                "buckets": [1.0, 2.0],
+                "counts": [2, 1, 2],
+                "count": 5,
+                "sum": 10.0,
+            },
+            histogram.to_dict(),
+        )
+
+
+class StatsTestCase(test.TestCase):
+    def test_counters_and_histograms(self):
+        registry = stats.Stats()
+        registry.incr("a")
+        registry.incr("a", 2)
+        registry.observe("h", 0.5)
+
+        snapshot = registry.snapshot()
+        self.assertEqual({"a": 3}, snapshot["counters"])
+        self.assertEqual(1, snapshot["histograms"]["h"]["count"])
+        self.assertEqual(0.5, snapshot["histograms"]["h"]["sum"])
+
+    def test_threads(self):
+        registry = stats.Stats()
+        registry.incr("a")
+        registry.observe("h", 0.5)
+        ready, proceed = threading.Event(), threading.Event()
+
+        def work():
+            registry.incr("a", 2)
+            registry.observe("h", 1.5)
+            ready.set()
+            proceed.wait()
+
+        thread = threading.Thread(target=work)
+        thread.start()
+        self.addCleanup(thread.join)
+        self.addCleanup(proceed.set)
+        ready.wait()
+
+        snapshot = registry.snapshot()
+        self.assertEqual({"a": 3}, snapshot["counters"])
+        self.assertEqual(2, snapshot["histograms"]["h"]["count"])
+        self.assertEqual(2.0, snapshot["histograms"]["h"]["sum"])
+
+        proceed.set()
+        thread.join()
+        gc.collect()
+        # NOTE: The values of the thread are kept when it exits.
+        self.assertEqual(snapshot, registry.snapshot())
+        self.assertEqual(1, len(registry._shards))
+
+    def test_updates_dont_lock(self):
+        registry = stats.Stats()
+        registry.incr("a")
+        registry._lock = mock.MagicMock()
+
+        registry.incr("a")
+        registry.observe("h", 0.5)
+        registry._lock.__enter__.assert_not_called()
+
+    def test_reset(self):
+        registry = stats.Stats()
+        registry.incr("a")
+        registry.observe("h", 0.5)
+        queue = Queue(3)
+        registry.register_gauge("depth", queue.qsize)
+
+        registry.reset()
+        self.assertEqual(
+            {"counters": {}, "histograms": {}, "gauges": {"depth": 3}},
+            registry.snapshot(),
+        )
+
+    def test_gauges_sum_live_objects(self):
+        registry = stats.Stats()
+        first, second = Queue(2), Queue(5)
+        registry.register_gauge("depth", first.qsize)
+        registry.register_gauge("depth", second.qsize)
+
+        self.assertEqual({"depth": 7}, registry.snapshot()["gauges"])
+        del second
+        self.assertEqual({"depth": 2}, registry.snapshot()["gauges"])
+        self.assertEqual(1, len(registry._gauges["depth"]))
+
+    @mock.patch("osprofiler.stats.__stats", new_callable=stats.Stats)
+    def test_module_functions(self, mock_stats):
+        stats.incr("events_emitted")
+        stats.observe("request_overhead", 0.001)
+
+        self.assertIs(mock_stats, stats.get())
+        snapshot = stats.snapshot()
+        self.assertEqual({"events_emitted": 1}, snapshot["counters"])
+        self.assertEqual(
+            1, snapshot["histograms"]["request_overhead"]["count"]
+        )
+
+
+class AppTestCase(test.TestCase):
+    @mock.patch("osprofiler.stats.__stats", new_callable=stats.Stats)
+    def test_app(self, mock_stats):
+        mock_stats.incr("events_emitted", 4)
+        app = stats.app_factory(None)
+
+        response = webob.Request.blank("/").get_response(app)
+        self.assertEqual(200, response.status_int)
+        self.assertEqual("application/json", response.content_type)
+        self.assertEqual(
+            {
+                "counters": {"events_emitted": 4},
+                "histograms": {},
+                "gauges": {},
+            },
+            json.loads(response.body),
+        )
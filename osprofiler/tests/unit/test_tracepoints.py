@@ -0,0 +1,99 @@
+# Copyright 2026 OpenStack Foundation.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import gc
+import os
+import signal
+import threading
+from unittest import mock
+
+from osprofiler.tests import test
+from osprofiler import tracepoints
+
+
+class TracePointsTestCase(test.TestCase):
+    def setUp(self):
+        super().setUp()
+        self.addCleanup(tracepoints.set_disabled, [])
+
+    def test_disable_by_name(self):
+        db = tracepoints.register("db", "nova.db.api.instance_get")
+        rpc = tracepoints.register("rpc", "nova.compute.rpcapi.build")
+
+        tracepoints.disable("db")
+        self.assertFalse(db.enabled)
+        self.assertTrue(rpc.enabled)
+        self.assertFalse(tracepoints.is_enabled("db"))
+        self.assertTrue(tracepoints.is_enabled("rpc"))
+
+        tracepoints.enable("db")
+        self.assertTrue(db.enabled)
+        self.assertTrue(tracepoints.is_enabled("db"))
+
+    def test_disable_by_qualname_and_pattern(self):
+        get = tracepoints.register("db", "nova.db.api.instance_get")
+        update = tracepoints.register("db", "nova.db.api.instance_update")
+        build = tracepoints.register("rpc", "nova.compute.rpcapi.build")
+
+        tracepoints.disable("nova.db.api.instance_get")
+        self.assertEqual(
+            [False, True, True], [get.enabled, update.enabled, build.enabled]
+        )
+
+        tracepoints.set_disabled(["nova.compute.*"])
+        self.assertEqual(
+            [True, True, False], [get.enabled, update.enabled, build.enabled]
+        )
+        self.assertEqual(["nova.compute.*"], tracepoints.get_disabled())
+
+    def test_register_disabled(self):
+        tracepoints.disable("db")
+        self.assertFalse(tracepoints.register("db", "a.b").enabled)
+        self.assertTrue(tracepoints.register("rpc", "a.b").enabled)
+
+    def test_get_trace_points(self):
+        db = tracepoints.register("db", "test_tracepoints.b")
+        rpc = tracepoints.register("rpc", "test_tracepoints.a")
+
+        trace_points = [
+            tp
+            for tp in tracepoints.get_trace_points()
+            if tp.qualname.startswith("test_tracepoints.")
+        ]
+        self.assertEqual([rpc, db], trace_points)
+        self.assertIn("enabled=True", repr(db))
+
+        del db, rpc, trace_points
+        gc.collect()
+        self.assertEqual(
+            [],
+            [
+                tp
+                for tp in tracepoints.get_trace_points()
+                if tp.qualname.startswith("test_tracepoints.")
+            ],
+        )
+
+    def test_reload_on_signal(self):
+        conf = mock.Mock()
+        reloaded = threading.Event()
+        conf.mutate_config_files.side_effect = reloaded.set
+        previous = signal.getsignal(signal.SIGUSR2)
+        self.addCleanup(signal.signal, signal.SIGUSR2, previous)
+
+        tracepoints.reload_on_signal(conf)
+        os.kill(os.getpid(), signal.SIGUSR2)
+
+        self.assertTrue(reloaded.wait(5))
@@ -16,6 +16,8 @@
 import base64
 import hashlib
 import hmac
+import os
+import time
 from unittest import mock
 import uuid
 
@@ -157,3 +159,85 @@ class UtilsTestCase(test.TestCase):
             pass
 
         self.assertEqual([], list(utils.itersubclasses(E)))
+
+    def test_timestamp_ns(self):
+        before = time.time_ns()
+        ts = utils.timestamp_ns()
+        self.assertIsInstance(ts, int)
+        self.assertLessEqual(ts, utils.timestamp_ns())
+        # Anchored to the wall clock.
+        self.assertLess(abs(ts - before), 10**9)
+
+    def test_format_timestamp(self):
+        self.assertEqual(
+            "2015-12-23T14:02:22.338776",
+            utils.format_timestamp(1450879342338776999),
+        )
+        self.assertEqual(
+            "1970-01-01T00:00:00.000000", utils.format_timestamp(0)
+        )
+
+    def test_parse_timestamp(self):
+        self.assertEqual(
+            1450879342338776000,
+            utils.parse_timestamp("2015-12-23T14:02:22.338776"),
+        )
+        self.assertEqual(
+            1450879342770000000,
+            utils.parse_timestamp("2015-12-23T14:02:22.77"),
+        )
+        ns = utils.timestamp_ns()
+        self.assertEqual(
+            ns // 1000 * 1000,
+            utils.parse_timestamp(utils.format_timestamp(ns)),
+        )
+
+    def test_generate_span_id(self):
+        ids = {utils.generate_span_id() for _ in range(1000)}
+        self.assertEqual(1000, len(ids))
+        span_id = ids.pop()
+        self.assertEqual(span_id, str(uuid.UUID(span_id)))
+        self.assertEqual(
+            int(span_id.replace("-", "")[16:], 16), utils.shorten_id(span_id)
+        )
+        # The per process prefix is shared.
+        self.assertEqual({span_id[:19]}, {other[:19] for other in ids})
+
+    @mock.patch.object(utils._span_id_random, "getrandbits")
+    def test_generate_span_id_never_zero(self, mock_getrandbits):
+        mock_getrandbits.return_value = 0
+        self.assertEqual(1, utils.shorten_id(utils.generate_span_id()))
+
+    def test_generate_span_id_after_fork(self):
+        read_fd, write_fd = os.pipe()
+        pid = os.fork()
+        if pid == 0:  # pragma: no cover
+            os.close(read_fd)
+            os.write(write_fd, utils.generate_span_id().encode())
+            os._exit(0)
+        os.close(write_fd)
+        os.waitpid(pid, 0)
+        with os.fdopen(read_fd) as f:
+            child_id = f.read()
+        parent_id = utils.generate_span_id()
+        self.assertNotEqual(child_id[:19], parent_id[:19])
+        self.assertNotEqual(child_id[19:], parent_id[19:])
+
+    @mock.patch("os.register_at_fork")
+    def test_register_at_fork(self, mock_register):
+        class Reinit:
+            calls = 0
+
+            def reinit(self):
+                Reinit.calls += 1
+
+        reinit = Reinit()
+        utils.register_at_fork(reinit.reinit)
+        after_in_child = mock_register.call_args[1]["after_in_child"]
+        after_in_child()
+        self.assertEqual(1, Reinit.calls)
+
+        # NOTE: The object isn't kept alive by the fork handler.
+        del reinit
+        after_in_child()
+        self.assertEqual(1, Reinit.calls)
@@ -15,10 +15,12 @@
 
 from unittest import mock
 
+import webob
 from webob import response as webob_response
 
 from osprofiler import _utils as utils
 from osprofiler import profiler
+from osprofiler import stats
 from osprofiler.tests import test
 from osprofiler import web
 
@@ -54,6 +56,46 @@ class WebTestCase(test.TestCase):
         self.assertEqual("key", trace_info.pop("hmac_key"))
         self.assertEqual({"parent_id": "z", "base_id": "y"}, trace_info)
 
+    def test_get_trace_id_headers_sampled(self):
+        profiler.init("key", base_id="y", parent_id="z", sampled=False)
+        headers = web.get_trace_id_headers()
+
+        trace_info = utils.signed_unpack(
+            headers["X-Trace-Info"], headers["X-Trace-HMAC"], ["key"]
+        )
+        assert trace_info is not None  # noqa: S101
+        self.assertIs(False, trace_info["sampled"])
+
+    def test_get_trace_id_headers_compatibility(self):
+        # NOTE: The keys of the trace info accepted by the releases without
+        #       sampling, they reject trace info with other keys.
+        old_keys = {"base_id", "hmac_key", "parent_id"}
+        middleware = web.WsgiMiddleware(mock.ANY, "key", enabled=True)
+        old_keys_patch = mock.patch.multiple(
+            web,
+            _REQUIRED_KEYS=("base_id", "hmac_key"),
+            _OPTIONAL_KEYS=("parent_id",),
+        )
+        for sampled, accepted in [(None, True), (True, True), (False, False)]:
+            profiler.clean()
+            profiler.init("key", base_id="y", parent_id="z", sampled=sampled)
+            headers = web.get_trace_id_headers()
+            trace_info = utils.signed_unpack(
+                headers["X-Trace-Info"], headers["X-Trace-HMAC"], ["key"]
+            )
+            self.assertIsNotNone(trace_info)
+            self.assertEqual(
+                accepted,
+                set(trace_info) <= old_keys,  # type: ignore[arg-type]
+            )
+            with old_keys_patch:
+                self.assertEqual(
+                    accepted, middleware._trace_is_valid(trace_info)
+                )
+            self.assertEqual(
+                "1" if sampled else None, headers.get("X-Trace-Sampled")
+            )
+
     @mock.patch("osprofiler.profiler.get")
     def test_get_trace_id_headers_no_profiler(self, mock_get_profiler):
         mock_get_profiler.return_value = False
@@ -197,7 +239,7 @@ class WebMiddlewareTestCase(test.TestCase):
         )
         self.assertEqual("yeah!", middleware(request))
         mock_profiler_init.assert_called_once_with(
-            hmac_key=hmac_key, base_id="1", parent_id="2"
+            hmac_key=hmac_key, base_id="1", parent_id="2", sampled=None
         )
 
     @mock.patch("osprofiler.web.profiler.init")
@@ -226,7 +268,7 @@ class WebMiddlewareTestCase(test.TestCase):
         )
         self.assertEqual("yeah!", middleware(request))
         mock_profiler_init.assert_called_once_with(
-            hmac_key=hmac_key, base_id="1", parent_id="2"
+            hmac_key=hmac_key, base_id="1", parent_id="2", sampled=None
         )
 
     @mock.patch("osprofiler.web.profiler.Trace")
@@ -254,7 +296,7 @@ class WebMiddlewareTestCase(test.TestCase):
         middleware = web.WsgiMiddleware(mock.ANY, hmac_key, enabled=True)
         self.assertEqual("yeah!", middleware(request))
         mock_profiler_init.assert_called_once_with(
-            hmac_key=hmac_key, base_id="1", parent_id="2"
+            hmac_key=hmac_key, base_id="1", parent_id="2", sampled=None
         )
         expected_info = {
             "request": {
@@ -299,8 +341,203 @@ class WebMiddlewareTestCase(test.TestCase):
         middleware = web.WsgiMiddleware(mock.ANY, enabled=True)
         self.assertEqual("yeah!", middleware(request))
         mock_profiler_init.assert_called_once_with(
-            hmac_key=hmac_key, base_id="1", parent_id="2"
+            hmac_key=hmac_key, base_id="1", parent_id="2", sampled=None
+        )
+
+    def _sampling_request(self, path, trace_data):
+        request = mock.MagicMock()
+        request.get_response.return_value = "yeah!"
+        request.path = path
+        pack = utils.signed_pack(trace_data, "secret")
+        request.headers = {"X-Trace-Info": pack[0], "X-Trace-HMAC": pack[1]}
+        return request
+
+    @mock.patch("osprofiler.web.profiler.init")
+    def test_wsgi_middleware_sampling_path_rates(self, mock_profiler_init):
+        middleware = web.WsgiMiddleware(
+            mock.ANY,
+            "secret",
+            enabled=True,
+            sampling_rate="1.0",
+            sampling_path_rates="/healthcheck*:0",
+        )
+        data = {"base_id": "1", "parent_id": "2"}
+
+        middleware(self._sampling_request("/healthcheck", data))
+        middleware(self._sampling_request("/servers", data))
+
+        self.assertEqual(
+            [False, True],
+            [c[1]["sampled"] for c in mock_profiler_init.call_args_list],
+        )
+
+    @mock.patch("osprofiler.web.profiler.init")
+    def test_wsgi_middleware_sampling_decision_propagated(
+        self, mock_profiler_init
+    ):
+        middleware = web.WsgiMiddleware(
+            mock.ANY, "secret", enabled=True, sampling_rate=0
+        )
+        data = {"base_id": "1", "parent_id": "2", "sampled": True}
+
+        middleware(self._sampling_request("/servers", data))
+
+        mock_profiler_init.assert_called_once_with(
+            hmac_key="secret", base_id="1", parent_id="2", sampled=True
+        )
+
+    @mock.patch("osprofiler.web.profiler.init")
+    def test_wsgi_middleware_sampled_header(self, mock_profiler_init):
+        middleware = web.WsgiMiddleware(
+            mock.ANY, "secret", enabled=True, sampling_rate=0
+        )
+        request = self._sampling_request(
+            "/servers", {"base_id": "1", "parent_id": "2"}
+        )
+        request.headers["X-Trace-Sampled"] = "1"
+
+        middleware(request)
+
+        mock_profiler_init.assert_called_once_with(
+            hmac_key="secret", base_id="1", parent_id="2", sampled=True
+        )
+
+    @mock.patch("osprofiler.web.profiler.init")
+    def test_wsgi_middleware_sampled_header_without_trace_info(
+        self, mock_profiler_init
+    ):
+        middleware = web.WsgiMiddleware(mock.ANY, "secret", enabled=True)
+        request = mock.MagicMock()
+        request.get_response.return_value = "yeah!"
+        request.headers = {"X-Trace-Sampled": "1"}
+
+        self.assertEqual("yeah!", middleware(request))
+        mock_profiler_init.assert_not_called()
+
+    @mock.patch("osprofiler.sampling.get")
+    @mock.patch("osprofiler.web.profiler.init")
+    def test_wsgi_middleware_global_sampler(
+        self, mock_profiler_init, mock_sampling_get
+    ):
+        sampler = mock_sampling_get.return_value
+        sampler.should_sample.return_value = False
+        middleware = web.WsgiMiddleware(mock.ANY, "secret", enabled=True)
+        data = {"base_id": "1", "parent_id": "2"}
+
+        middleware(self._sampling_request("/servers", data))
+
+        sampler.should_sample.assert_called_once_with("/servers")
+        mock_profiler_init.assert_called_once_with(
+            hmac_key="secret", base_id="1", parent_id="2", sampled=False
+        )
+
+    @mock.patch("osprofiler.stats.__stats", new_callable=stats.Stats)
+    def test_wsgi_middleware_request_overhead(self, mock_stats):
+        self.addCleanup(profiler.clean)
+        middleware = web.WsgiMiddleware(mock.ANY, "secret", enabled=True)
+        data = {"base_id": "1", "parent_id": "2"}
+
+        middleware(self._sampling_request("/servers", data))
+
+        histogram = mock_stats.snapshot()["histograms"]["request_overhead"]
+        self.assertEqual(1, histogram["count"])
+        self.assertGreater(histogram["sum"], 0.0)
+        self.assertIsNone(profiler.get())
+
+    @mock.patch("osprofiler.web.profiler.init")
+    def test_wsgi_middleware_invalid_sampled(self, mock_profiler_init):
+        request = self._sampling_request(
+            "/", {"base_id": "1", "parent_id": "2", "sampled": "yes"}
+        )
+        middleware = web.WsgiMiddleware(mock.ANY, "secret", enabled=True)
+
+        self.assertEqual("yeah!", middleware(request))
+        mock_profiler_init.assert_not_called()
+
+    @mock.patch("osprofiler.profiler.notifier.notify")
+    def test_wsgi_middleware_not_sampled(self, mock_notify):
+        pack = utils.signed_pack(
+            {"base_id": "1", "parent_id": "2", "sampled": False}, "secret"
+        )
+        headers = []
+
+        def app(environ, start_response):
+            headers.append(web.get_trace_id_headers())
+            return dummy_app(environ, start_response)
+
+        middleware = web.WsgiMiddleware(app, "secret", enabled=True)
+        request = webob.Request.blank(
+            "/path",
+            headers={"X-Trace-Info": pack[0], "X-Trace-HMAC": pack[1]},
+        )
+        request.get_response(middleware)
+
+        mock_notify.assert_not_called()
+        trace_info = utils.signed_unpack(
+            headers[0]["X-Trace-Info"], headers[0]["X-Trace-HMAC"], ["secret"]
+        )
+        assert trace_info is not None  # noqa: S101
+        self.assertIs(False, trace_info["sampled"])
+
+    @mock.patch("osprofiler.profiler.notifier.notify")
+    def test_wsgi_middleware_streaming_body(self, mock_notify):
+        hmac_key = "secret"
+        pack = utils.signed_pack({"base_id": "1", "parent_id": "2"}, hmac_key)
+        events = []
+        mock_notify.side_effect = lambda info: events.append(info["name"])
+
+        def streaming_app(environ, start_response):
+            start_response("200 OK", [("Content-Type", "text/plain")])
+
+            def body():
+                events.append("chunk")
+                yield b"a"
+                events.append("chunk")
+                yield b"b"
+
+            return body()
+
+        middleware = web.WsgiMiddleware(streaming_app, hmac_key, enabled=True)
+        request = webob.Request.blank(
+            "/path",
+            headers={"X-Trace-Info": pack[0], "X-Trace-HMAC": pack[1]},
+        )
+        app_iter = middleware(request.environ, mock.MagicMock())
+        self.assertEqual(["wsgi-start"], events)
+
+        self.assertEqual(b"ab", b"".join(app_iter))
+        app_iter.close()
+        self.assertEqual(["wsgi-start", "chunk", "chunk", "wsgi-stop"], events)
+        self.assertIsNone(profiler.get())
+
+    @mock.patch("osprofiler.profiler.notifier.notify")
+    def test_wsgi_middleware_streaming_body_error(self, mock_notify):
+        hmac_key = "secret"
+        pack = utils.signed_pack({"base_id": "1", "parent_id": "2"}, hmac_key)
+
+        def streaming_app(environ, start_response):
+            start_response("200 OK", [("Content-Type", "text/plain")])
+
+            def body():
+                yield b"a"
+                raise ValueError("broken body")
+
+            return body()
+
+        middleware = web.WsgiMiddleware(streaming_app, hmac_key, enabled=True)
+        request = webob.Request.blank(
+            "/path",
+            headers={"X-Trace-Info": pack[0], "X-Trace-HMAC": pack[1]},
         )
+        app_iter = middleware(request.environ, mock.MagicMock())
+        self.assertRaises(ValueError, list, app_iter)
+        app_iter.close()
+
+        self.assertEqual(2, mock_notify.call_count)
+        stop = mock_notify.call_args_list[1][0][0]
+        self.assertEqual("wsgi-stop", stop["name"])
+        self.assertEqual("ValueError", stop["info"]["etype"])
+        self.assertIsNone(profiler.get())
 
     def test_disable(self):
         web.disable()
@@ -0,0 +1,170 @@
+# Copyright 2026 OpenStack Foundation.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Registry of the trace points, to disable some of them at runtime.
+
+Functions traced with profiler.trace(), trace_cls() and TracedMeta and the
+sqlalchemy and requests integrations register their trace points here, keyed
+by the name of the trace point (e.g. "db") and by a qualified name (the
+qualified name of the traced function, e.g.
+"nova.compute.manager.ComputeManager.build_and_run_instance", or
+"osprofiler.sqlalchemy" and "osprofiler.requests" for the integrations).
+
+Disabled trace points are not recorded, their children are attached to their
+parent. Keys can be shell-style patterns:
+
+>>  tracepoints.disable("db", "nova.compute.manager.*")
+>>  tracepoints.enable("db")
+
+The ``[profiler] disabled_trace_points`` option sets them too, and is
+re-read when the configuration files are reloaded (e.g. on SIGHUP by
+oslo.service, or on the signal set with reload_on_signal()).
+"""
+
+from collections.abc import Iterable
+import fnmatch
+import signal
+import threading
+from typing import Any
+import weakref
+
+
+class TracePoint:
+    """A registered trace point, checked by the code recording it."""
+
+    __slots__ = ("name", "qualname", "enabled", "duration_ns", "__weakref__")
+
+    def __init__(self, name: str, qualname: str) -> None:
+        self.name = name
+        self.qualname = qualname
+        #: False while the trace point is disabled.
+        self.enabled = not _is_disabled(name, qualname)
+        #: Moving average of the duration of the recorded calls, only
+        #: measured while the aggregation of hot trace points is enabled
+        #: (see profiler.set_aggregation()).
+        self.duration_ns = 0.0
+
+    def observe(self, duration_ns: int) -> None:
+        """Adds the duration of a call to the moving average."""
+        if self.duration_ns:
+            self.duration_ns += (duration_ns - self.duration_ns) * 0.125
+        else:
+            self.duration_ns = float(duration_ns)
+
+    def __repr__(self) -> str:
+        return (
+            f"TracePoint({self.name!r}, {self.qualname!r}, "
+            f"enabled={self.enabled})"
+        )
+
+
+_lock = threading.Lock()
+_trace_points: "weakref.WeakSet[TracePoint]" = weakref.WeakSet()
+_disabled: frozenset[str] = frozenset()
+_patterns: tuple[str, ...] = ()
+
+
+def _is_disabled(name: str, qualname: str | None = None) -> bool:
+    if not _disabled:
+        return False
+    if name in _disabled or qualname in _disabled:
+        return True
+    for pattern in _patterns:
+        if fnmatch.fnmatchcase(name, pattern):
+            return True
+        if qualname is not None and fnmatch.fnmatchcase(qualname, pattern):
+            return True
+    return False
+
+
+def register(name: str, qualname: str) -> TracePoint:
+    """Registers a trace point.
+
+    :param name: name of the trace point, e.g. "db"
+    :param qualname: qualified name of the traced code
+    :returns: the TracePoint, whose ``enabled`` attribute is kept up to date
+    """
+    trace_point = TracePoint(name, qualname)
+    with _lock:
+        _trace_points.add(trace_point)
+        # NOTE: Disabled keys may have changed since it was created.
+        trace_point.enabled = not _is_disabled(name, qualname)
+    return trace_point
+
+
+def is_enabled(name: str) -> bool:
+    """Returns False if the trace points with this name are disabled."""
+    return not _is_disabled(name)
+
+
+def set_disabled(keys: Iterable[str]) -> None:
+    """Sets the keys of the disabled trace points, enables the others.
+
+    :param keys: names, qualified names or shell-style patterns of them
+    """
+    global _disabled, _patterns
+    with _lock:
+        _disabled = frozenset(key for key in keys if key)
+        _patterns = tuple(
+            key for key in _disabled if any(c in key for c in "*?[")
+        )
+        for trace_point in list(_trace_points):
+            trace_point.enabled = not _is_disabled(
+                trace_point.name, trace_point.qualname
+            )
+
+
+def get_disabled() -> list[str]:
+    """Returns the keys of the disabled trace points."""
+    return sorted(_disabled)
+
+
+def disable(*keys: str) -> None:
+    """Disables trace points, by name, qualified name or pattern."""
+    set_disabled(_disabled.union(keys))
+
+
+def enable(*keys: str) -> None:
+    """Enables trace points disabled with the same keys."""
+    set_disabled(_disabled.difference(keys))
+
+
+def get_trace_points() -> list[TracePoint]:
+    """Returns the registered trace points, sorted by qualified name."""
+    with _lock:
+        trace_points = list(_trace_points)
+    return sorted(trace_points, key=lambda tp: (tp.qualname, tp.name))
+
+
+def reload_on_signal(conf: Any, signum: int = signal.SIGUSR2) -> None:
+    """Reloads the mutable options of conf when the process gets a signal.
+
+    For services that don't run under oslo.service, which already does it on
+    SIGHUP. Must be called from the main thread.
+
+    :param conf: oslo.config ConfigOpts of the service
+    :param signum: signal to handle
+    """
+
+    def handler(signum: int, frame: Any) -> None:
+        # NOTE: Not in the signal handler, the interrupted code may hold
+        #       locks the reload needs (e.g. the logging ones).
+        threading.Thread(
+            target=conf.mutate_config_files,
+            name="osprofiler-reload",
+            daemon=True,
+        ).start()
+
+    signal.signal(signum, handler)
@@ -15,12 +15,18 @@
 
 from __future__ import annotations
 
+from collections.abc import Iterable, Iterator
+import contextlib
+import time
 from typing import Any, TypeGuard, TYPE_CHECKING
 
 import webob.dec
+import webob.response
 
 from osprofiler import _utils as utils
 from osprofiler import profiler
+from osprofiler import sampling
+from osprofiler import stats
 
 if TYPE_CHECKING:
     from _typeshed.wsgi import WSGIApplication
@@ -29,7 +35,7 @@ if TYPE_CHECKING:
 # Trace keys that are required or optional, any other
 # keys that are present will cause the trace to be rejected...
 _REQUIRED_KEYS = ("base_id", "hmac_key")
-_OPTIONAL_KEYS = ("parent_id",)
+_OPTIONAL_KEYS = ("parent_id", "sampled")
 
 #: Http header that will contain the needed traces data.
 X_TRACE_INFO = "X-Trace-Info"
@@ -37,14 +43,30 @@ X_TRACE_INFO = "X-Trace-Info"
 #: Http header that will contain the traces data hmac (that will be validated).
 X_TRACE_HMAC = "X-Trace-HMAC"
 
+#: Http header that tells the trace was sampled upstream.
+X_TRACE_SAMPLED = "X-Trace-Sampled"
+
 
 def get_trace_id_headers() -> dict[str, str]:
     """Adds the trace id headers (and any hmac) into provided dictionary."""
     p = profiler.get()
     if p and p.hmac_key:
-        data = {"base_id": p.get_base_id(), "parent_id": p.get_id()}
+        data: dict[str, Any] = {
+            "base_id": p.get_base_id(),
+            "parent_id": p.get_id(),
+        }
+        # NOTE: Propagate the sampling decision, so that downstream services
+        #       don't take their own. Services running older releases reject
+        #       trace info with unknown keys: they don't trace the requests
+        #       of unsampled traces, as intended, but the decision to sample
+        #       a trace is sent in a separate header they ignore.
+        if p.sampled is False:
+            data["sampled"] = False
         pack = utils.signed_pack(data, p.hmac_key)
-        return {X_TRACE_INFO: pack[0].decode(), X_TRACE_HMAC: pack[1] or ""}
+        headers = {X_TRACE_INFO: pack[0].decode(), X_TRACE_HMAC: pack[1] or ""}
+        if p.sampled:
+            headers[X_TRACE_SAMPLED] = "1"
+        return headers
     return {}
 
 
@@ -77,6 +99,9 @@ class WsgiMiddleware:
         application: WSGIApplication,
         hmac_keys: str | None = None,
         enabled: bool = False,
+        sampling_rate: float | str | None = None,
+        sampling_max_per_second: float | str | None = None,
+        sampling_path_rates: str | None = None,
         **kwargs: Any,
     ) -> None:
         """Initialize middleware with api-paste.ini arguments.
@@ -88,6 +113,16 @@ class WsgiMiddleware:
                     by only those who knows this key which helps
                     avoid DDOS.
         :enabled: This middleware can be turned off fully if enabled is False.
+        :sampling_rate: Probability (0.0 - 1.0) of recording a trace that
+                        does not carry a sampling decision yet.
+        :sampling_max_per_second: Maximum number of traces recorded per
+                                  second by this middleware.
+        :sampling_path_rates: Per path sampling rates in the
+                              "<pattern>:<rate>[,<pattern>:<rate>...]"
+                              format, e.g. "/healthcheck*:0".
+                              If none of the sampling arguments is set, the
+                              sampler configured with
+                              osprofiler.sampling.set() is used.
         :kwargs: Other keyword arguments.
                  NOTE(tovin07): Currently, this `kwargs` is not used at all.
                  It's here to avoid some extra keyword arguments in local_conf
@@ -97,6 +132,17 @@ class WsgiMiddleware:
         self.name = "wsgi"
         self.enabled = enabled
         self.hmac_keys = utils.split(hmac_keys or "")
+        self.sampler: sampling.Sampler | None = None
+        if (
+            sampling_rate is not None
+            or sampling_max_per_second is not None
+            or sampling_path_rates is not None
+        ):
+            self.sampler = sampling.Sampler(
+                rate=float(sampling_rate if sampling_rate is not None else 1),
+                max_per_second=float(sampling_max_per_second or 0),
+                path_rates=sampling_path_rates,
+            )
 
     @classmethod
     def factory(
@@ -117,6 +163,8 @@ class WsgiMiddleware:
             return False
         if trace_keys.difference(_REQUIRED_KEYS + _OPTIONAL_KEYS):
             return False
+        if not isinstance(trace_info.get("sampled", False), bool):
+            return False
         return True
 
     @webob.dec.wsgify
@@ -131,6 +179,7 @@ class WsgiMiddleware:
         ):
             return request.get_response(self.application)
 
+        started = time.perf_counter()
         trace_info = utils.signed_unpack(
             request.headers.get(X_TRACE_INFO),
             request.headers.get(X_TRACE_HMAC),
@@ -140,10 +189,21 @@ class WsgiMiddleware:
         if not self._trace_is_valid(trace_info):
             return request.get_response(self.application)
 
+        sampled = trace_info.get("sampled")
+        if sampled is None and request.headers.get(X_TRACE_SAMPLED) == "1":
+            # NOTE: Only honoured with valid trace info, which is enough to
+            #       get the request traced without a sampler.
+            sampled = True
+        if sampled is None:
+            sampler = self.sampler or sampling.get()
+            if sampler is not None:
+                sampled = sampler.should_sample(request.path)
+
         profiler.init(
             hmac_key=trace_info["hmac_key"],
             base_id=trace_info.get("base_id"),
             parent_id=trace_info.get("parent_id"),
+            sampled=sampled,
         )
         info = {
             "request": {
@@ -153,8 +213,49 @@ class WsgiMiddleware:
                 "scheme": request.scheme,
             }
         }
+        setup_time = time.perf_counter() - started
+        with contextlib.ExitStack() as stack:
+            stack.callback(profiler.clean)
+            stack.callback(_record_overhead, setup_time)
+            stack.enter_context(profiler.Trace(self.name, info=info))
+            response = request.get_response(self.application)
+            if isinstance(response, webob.response.Response) and not (
+                isinstance(response.app_iter, (list, tuple))
+            ):
+                # NOTE: Streaming body, keep the trace point open until the
+                #       server has sent it and closed the iterator.
+                response.app_iter = _TracedAppIter(
+                    response.app_iter, stack.pop_all()
+                )
+            return response
+
+
+def _record_overhead(setup_time: float) -> None:
+    prof = profiler.get()
+    if prof is not None:
+        stats.observe("request_overhead", setup_time + prof.get_overhead())
+
+
+class _TracedAppIter:
+    """Response body iterator that finishes the wsgi trace point on close."""
+
+    def __init__(
+        self, app_iter: Iterable[bytes], exit_stack: contextlib.ExitStack
+    ) -> None:
+        self._app_iter = app_iter
+        self._exit_stack = exit_stack
+
+    def __iter__(self) -> Iterator[bytes]:
+        try:
+            yield from self._app_iter
+        except Exception as ex:
+            self._exit_stack.__exit__(type(ex), ex, ex.__traceback__)
+            raise
+
+    def close(self) -> None:
         try:
-            with profiler.Trace(self.name, info=info):
-                return request.get_response(self.application)
+            close = getattr(self._app_iter, "close", None)
+            if close is not None:
+                close()
         finally:
-            profiler.clean()
+            self._exit_stack.close()
@@ -0,0 +1,357 @@
+# Copyright 2026 OpenStack Foundation.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Benchmark the overhead of the osprofiler hot paths.
+
+Measures the calls per second and the memory allocated per call of
+profiler.start()/stop(), trace(), trace_cls(), TracedMeta,
+WsgiMiddleware.__call__() and _utils.signed_pack()/signed_unpack(), each in
+three states:
+
+* disabled - no profiler initialized and the middleware disabled
+* noop - profiler initialized, notifications sent to the no-op notifier
+* memory - profiler initialized, notifications sent to a driver that keeps
+  them in memory as dicts
+
+The import_* benchmarks measure the import time of a synthetic module of 500
+classes of 10 methods, undecorated (plain), decorated with trace_cls() or
+created by TracedMeta, eagerly or lazily. Their source is compiled once, so
+only the execution of the module body is measured.
+
+Results can be saved as a baseline and compared with later runs, the command
+then fails if a benchmark is slower or allocates more than the threshold.
+Baselines are only meaningful on the machine and interpreter they were
+saved with.
+
+Usage:
+  python tools/benchmark.py --save baseline.json
+  python tools/benchmark.py --compare baseline.json [--threshold 0.2]
+                            [--alloc-threshold 0.05]
+
+Other options: [--number N] [--repeat R] [--filter PATTERN]
+
+"tox -e benchmark -- <options>" runs it in a virtualenv.
+"""
+
+import argparse
+import collections
+import fnmatch
+import functools
+import json
+import statistics
+import sys
+import timeit
+import tracemalloc
+
+import webob
+
+from osprofiler import _utils as utils
+from osprofiler.drivers import base
+from osprofiler import notifier
+from osprofiler import profiler
+from osprofiler import web
+
+STATES = ("disabled", "noop", "memory")
+
+HMAC_KEY = "secret"
+
+# NOTE: Number of calls whose allocations are measured, the median is kept.
+ALLOC_SAMPLES = 50
+
+# NOTE: Allocation growth always tolerated, so that a regression isn't
+#       reported for a benchmark allocating a few bytes when the interpreter
+#       resizes one of its internal buffers.
+ALLOC_SLACK = 64
+
+IMPORT_CLASSES = 500
+IMPORT_METHODS = 10
+IMPORT_DECORATIONS = {
+    "plain": "",
+    "trace_cls": "@profiler.trace_cls('bench')\n",
+    "trace_cls_lazy": "@profiler.trace_cls('bench', lazy=True)\n",
+    "traced_meta": "",
+    "traced_meta_lazy": "",
+}
+
+
+class MemoryDriver(base.Driver):
+    """Driver that keeps the last notifications in memory."""
+
+    def __init__(
+        self, connection_str, project=None, service=None, host=None, **kwargs
+    ):
+        super().__init__(
+            connection_str, project=project, service=service, host=host
+        )
+        self.events = collections.deque(maxlen=10000)
+
+    @classmethod
+    def get_name(cls):
+        return "benchmark"
+
+    def notify(self, info, **kwargs):
+        # NOTE: Like other drivers, convert the notification to a dict.
+        self.events.append(info.copy())
+
+
+@profiler.trace("bench")
+def traced(a, b=None):
+    return a
+
+
+@profiler.trace_cls("bench")
+class TracedCls:
+    def method(self, a, b=None):
+        return a
+
+
+class TracedMetaCls(metaclass=profiler.TracedMeta):
+    __trace_args__ = {"name": "bench"}
+
+    def method(self, a, b=None):
+        return a
+
+
+def wsgi_app(environ, start_response):
+    start_response("200 OK", [("Content-Type", "text/plain")])
+    return [b"ok"]
+
+
+def enter_state(state):
+    """Sets the profiler, notifier and middleware up for a state."""
+    profiler.clean()
+    if state == "disabled":
+        web.disable()
+        notifier.set(notifier._noop_notifier)
+        return
+    web.enable(HMAC_KEY)
+    if state == "memory":
+        notifier.set(base.get_driver("benchmark://").notify)
+    else:
+        notifier.set(notifier._noop_notifier)
+    profiler.init(HMAC_KEY)
+
+
+def start_stop():
+    profiler.start("bench")
+    profiler.stop()
+
+
+def make_benchmarks(state):
+    """Returns the benchmarked callables for a state, by name."""
+    traced_obj = TracedCls()
+    meta_obj = TracedMetaCls()
+    middleware = web.WsgiMiddleware(wsgi_app)
+    headers = web.get_trace_id_headers() if state != "disabled" else {}
+    environ = webob.Request.blank("/v2/servers", headers=headers).environ
+
+    def wsgi():
+        middleware(dict(environ), lambda status, headers: None)
+        if state != "disabled":
+            # NOTE: The middleware cleans the profiler after the request.
+            profiler.init(HMAC_KEY)
+
+    data = {"base_id": "1", "parent_id": "2"}
+    packed, hmac_data = utils.signed_pack(data, HMAC_KEY)
+    return {
+        "start_stop": start_stop,
+        "trace": lambda: traced(1, b=2),
+        "trace_cls": lambda: traced_obj.method(1, b=2),
+        "traced_meta": lambda: meta_obj.method(1, b=2),
+        "wsgi": wsgi,
+        "signed_pack": lambda: utils.signed_pack(data, HMAC_KEY),
+        "signed_unpack": lambda: utils.signed_unpack(
+            packed, hmac_data, [HMAC_KEY]
+        ),
+    }
+
+
+def make_module_source(decoration):
+    """Returns the source of a module of traced classes."""
+    lines = [
+        "from osprofiler import profiler",
+        "class Meta(metaclass=profiler.TracedMeta):",
+        "    __trace_args__ = {'name': 'bench'}",
+        "class LazyMeta(metaclass=profiler.TracedMeta):",
+        "    __trace_args__ = {'name': 'bench', 'lazy': True}",
+    ]
+    base = {"traced_meta": "Meta", "traced_meta_lazy": "LazyMeta"}.get(
+        decoration, "object"
+    )
+    for i in range(IMPORT_CLASSES):
+        lines.append(
+            f"{IMPORT_DECORATIONS[decoration]}class Manager{i}({base}):"
+        )
+        for j in range(IMPORT_METHODS):
+            lines.append(f"    def method{j}(self, a, b=None):")
+            lines.append("        return a")
+    return "\n".join(lines) + "\n"
+
+
+def make_import_benchmarks():
+    """Returns the import benchmarks, by name."""
+    benchmarks = {}
+    for decoration in IMPORT_DECORATIONS:
+        code = compile(make_module_source(decoration), "<bench>", "exec")
+        benchmarks[f"import_{decoration}"] = functools.partial(
+            exec, code, {"__name__": "bench"}
+        )
+    return benchmarks
+
+
+def measure(stmt, number, repeat, alloc_samples=ALLOC_SAMPLES):
+    best = min(timeit.repeat(stmt, number=number, repeat=repeat)) / number
+    samples = []
+    tracemalloc.start()
+    try:
+        stmt()
+        for _ in range(alloc_samples):
+            before = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+            stmt()
+            samples.append(tracemalloc.get_traced_memory()[1] - before)
+    finally:
+        tracemalloc.stop()
+    return {
+        "calls_per_sec": 1 / best,
+        "alloc_bytes": statistics.median(samples),
+    }
+
+
+def run(number, repeat, pattern):
+    results = {}
+    for state in STATES:
+        enter_state(state)
+        for name, stmt in make_benchmarks(state).items():
+            key = f"{name}/{state}"
+            if not fnmatch.fnmatchcase(key, pattern):
+                continue
+            enter_state(state)
+            results[key] = measure(stmt, number, repeat)
+    enter_state("disabled")
+    for name, stmt in make_import_benchmarks().items():
+        key = f"{name}/{IMPORT_CLASSES}"
+        if fnmatch.fnmatchcase(key, pattern):
+            # NOTE: An import is slow enough to be timed on its own.
+            results[key] = measure(stmt, 1, repeat * 2, alloc_samples=3)
+    return results
+
+
+def find_regressions(results, baseline, threshold, alloc_threshold):
+    regressions = []
+    for key, result in results.items():
+        base_result = baseline.get(key)
+        if base_result is None:
+            continue
+        min_rate = base_result["calls_per_sec"] * (1 - threshold)
+        if result["calls_per_sec"] < min_rate:
+            regressions.append(
+                f"{key}: {result['calls_per_sec']:.0f} calls/s, baseline "
+                f"{base_result['calls_per_sec']:.0f} calls/s"
+            )
+        max_alloc = base_result["alloc_bytes"] * (1 + alloc_threshold)
+        if result["alloc_bytes"] > max_alloc + ALLOC_SLACK:
+            regressions.append(
+                f"{key}: {result['alloc_bytes']:.0f} bytes/call, baseline "
+                f"{base_result['alloc_bytes']:.0f} bytes/call"
+            )
+    return regressions
+
+
+def report(results, baseline):
+    print(
+        f"{'benchmark':<28} {'calls/s':>12} {'bytes/call':>11} "
+        f"{'vs baseline':>12}"
+    )
+    for key, result in results.items():
+        change = ""
+        if key in baseline:
+            ratio = result["calls_per_sec"] / baseline[key]["calls_per_sec"]
+            change = f"{(ratio - 1) * 100:+.1f}%"
+        print(
+            f"{key:<28} {result['calls_per_sec']:>12.0f} "
+            f"{result['alloc_bytes']:>11.0f} {change:>12}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--number", type=int, default=20000, help="calls per timing run"
+    )
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=5,
+        help="timing runs, the fastest one is kept",
+    )
+    parser.add_argument(
+        "--filter",
+        default="*",
+        help="only run the <benchmark>/<state> matching "
+        "this shell-style pattern, e.g. 'trace*'",
+    )
+    parser.add_argument(
+        "--save", metavar="FILE", help="save the results as a baseline"
+    )
+    parser.add_argument(
+        "--compare",
+        metavar="FILE",
+        help="compare the results with a saved baseline",
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.2,
+        help="fraction by which a benchmark may be slower than the "
+        "baseline (default: 0.2)",
+    )
+    parser.add_argument(
+        "--alloc-threshold",
+        type=float,
+        help="fraction by which a benchmark may allocate more than the "
+        "baseline (default: --threshold). Allocations don't depend on the "
+        "load of the machine, so this can be much lower than --threshold",
+    )
+    args = parser.parse_args()
+
+    baseline = {}
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+
+    results = run(args.number, args.repeat, args.filter)
+    report(results, baseline)
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+
+    alloc_threshold = args.alloc_threshold
+    if alloc_threshold is None:
+        alloc_threshold = args.threshold
+    regressions = find_regressions(
+        results, baseline, args.threshold, alloc_threshold
+    )
+    if regressions:
+        print("\nRegressions:")
+        for regression in regressions:
+            print(f"  {regression}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,65 @@
+# Copyright 2026 OpenStack Foundation.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Measure how many spans per second the profiler can record.
+
+Every span is a profiler.start()/profiler.stop() pair sent to a no-op
+notifier, measured once per trace point id generator.
+
+Usage: python tools/span_throughput.py [--spans N] [--repeat R]
+"""
+
+import argparse
+import time
+
+from osprofiler import notifier
+from osprofiler import profiler
+
+
+def spans_per_second(spans, repeat):
+    best = None
+    for _ in range(repeat):
+        profiler.clean()
+        profiler.init("secret")
+        started = time.perf_counter()
+        for _ in range(spans):
+            profiler.start("bench")
+            profiler.stop()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    profiler.clean()
+    return spans / best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--spans", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    notifier.set(lambda info, context=None: None)
+    results = {}
+    for name in profiler.ID_GENERATORS:
+        profiler.set_id_generator(name)
+        results[name] = spans_per_second(args.spans, args.repeat)
+    profiler.set_id_generator("uuid")
+
+    print(f"{'id generator':<14} {'spans/s':>12} {'speedup':>8}")
+    for name, rate in results.items():
+        print(f"{name:<14} {rate:>12.0f} {rate / results['uuid']:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
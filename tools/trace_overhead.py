@@ -0,0 +1,102 @@
+# Copyright 2026 OpenStack Foundation.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Measure the per call overhead of osprofiler trace decorators.
+
+Compares a plain function call with calls of the same function wrapped by
+``profiler.trace`` and ``profiler.trace_cls`` while profiling is disabled
+(no profiler initialized) and enabled (with a no-op notifier).
+
+The "wrapper" case is a bare ``*args, **kwargs`` wrapper, the least any
+decorator costs. With profiling disabled the traced calls should cost the
+same plus a context variable lookup, i.e. a few tens of nanoseconds.
+
+Usage: python tools/trace_overhead.py [--number N] [--repeat R]
+"""
+
+import argparse
+import timeit
+
+from osprofiler import notifier
+from osprofiler import profiler
+
+
+def plain(a, b=None):
+    return a
+
+
+def wrapper(*args, **kwargs):
+    return plain(*args, **kwargs)
+
+
+@profiler.trace("bench")
+def traced(a, b=None):
+    return a
+
+
+@profiler.trace_cls("bench")
+class Traced:
+    def method(self, a, b=None):
+        return a
+
+
+def bench(stmt, number, repeat):
+    best = min(timeit.repeat(stmt, number=number, repeat=repeat))
+    return best / number * 1e9
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--number", type=int, default=200000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    obj = Traced()
+    cases = [
+        ("plain call", lambda: plain(1, b=2)),
+        ("wrapper", lambda: wrapper(1, b=2)),
+        ("trace", lambda: traced(1, b=2)),
+        ("trace_cls", lambda: obj.method(1, b=2)),
+    ]
+
+    notifier.set(lambda info, context=None: None)
+    results = []
+    profiler.clean()
+    for label, stmt in cases:
+        results.append(
+            (label, "disabled", bench(stmt, args.number, args.repeat))
+        )
+    profiler.init("secret")
+    for label, stmt in cases[2:]:
+        results.append(
+            (label, "enabled", bench(stmt, args.number, args.repeat))
+        )
+    profiler.clean()
+
+    baseline = results[0][2]
+    wrapper_ns = results[1][2]
+    print(
+        f"{'case':<12} {'profiler':<10} {'ns/call':>10} {'overhead':>10}"
+        f" {'vs wrapper':>10}"
+    )
+    for label, mode, ns in results:
+        print(
+            f"{label:<12} {mode:<10} {ns:>10.1f} {ns - baseline:>10.1f}"
+            f" {ns - wrapper_ns:>10.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()